@@ -14,11 +14,114 @@ class Settings(BaseSettings):
     video_storage_path: str = "./videos"
     max_file_size: int = 20 * 1024 * 1024  # 20MB
 
+    # Storage Layout (how files are arranged under the video and upload directories)
+    storage_layout: str = "sharded"  # "sharded" (ab/<id>, ab/cd/<id>, ...) or "flat"; the other layout stays readable (manage.py migrate-layout)
+    storage_shard_depth: int = 1  # Prefix directory levels, two id characters each: 1 = 256 dirs, 2 = 65536 (run migrate-layout after changing)
+
+    # Uploaded Image Storage (content-addressed)
+    upload_storage_path: str = "./uploads"
+    upload_db_path: str = "./data/uploads.db"
+    upload_cache_bytes: int = 64 * 1024 * 1024  # In-memory LRU of image bytes
+
     # AI Model Configuration
     video_model: str = "veo-3.1-generate-preview"  # Veo 3.1 for video generation
     chat_model: str = "gemini-2.0-flash-exp"  # Gemini for chat
     optimize_model: str = "gemini-2.0-flash-exp"  # Gemini for prompt optimization
 
+    gemini_max_concurrency: int = 8  # Concurrent upstream calls per Gemini model
+
+    # Prompt Optimization Cache
+    optimize_cache_ttl: int = 60 * 60  # Seconds an optimized prompt is reused
+    optimize_cache_bytes: int = 8 * 1024 * 1024  # Size budget per model
+
+    # Chat Sessions (server-side conversation history)
+    chat_session_max: int = 1000  # Sessions kept in memory (least recently used evicted)
+    chat_session_ttl: int = 60 * 60  # Idle seconds before a session expires
+    chat_session_token_budget: int = 8000  # Estimated history tokens before old turns are compacted
+
+    # Generation Job Queue (admission control in front of the Veo API)
+    max_concurrent_operations: int = 10  # Jobs submitted or running upstream at once
+    queue_backoff_initial: float = 5.0  # First pause after a 429 / RESOURCE_EXHAUSTED (seconds)
+    queue_backoff_max: float = 300.0  # Backoff ceiling while quota stays exhausted
+    queue_default_run_seconds: float = 90.0  # Assumed upstream run time until one is measured
+
+    # Background Operation Poller
+    poller_tick_seconds: float = 1.0  # How often the poller looks for due operations
+    poll_interval_min: float = 5.0  # First refresh delay after submit (seconds)
+    poll_interval_max: float = 30.0  # Backoff ceiling for long-running operations
+    poll_backoff_factor: float = 1.5  # Interval multiplier after each unfinished refresh
+    poll_batch_size: int = 20  # Operations refreshed concurrently per batch
+    poll_max_errors: int = 5  # Consecutive refresh failures before an operation fails
+    status_event_heartbeat: float = 5.0  # Seconds between elapsed-time pushes to status watchers
+
+    # Blocking SDK Call Thread Pools
+    submit_workers: int = 4  # Concurrent generate_videos calls
+    poll_workers: int = 8  # Concurrent operations.get calls
+    download_workers: int = 4  # Concurrent video downloads (peak download memory is this x download_chunk_size)
+
+    # Video Downloads (streamed to a .part file, then renamed into place)
+    download_chunk_size: int = 1024 * 1024  # Bytes read and written per step
+    download_max_attempts: int = 5  # Tries per video; each retry resumes from the last written byte
+    download_timeout: float = 60.0  # Seconds without data before an attempt is abandoned
+    faststart_enabled: bool = True  # Move the moov box ahead of mdat so playback starts without fetching the tail
+
+    # Gallery Derivatives (poster image + short preview clip per video)
+    derivatives_enabled: bool = True  # Skipped automatically when the extractor is unavailable
+    derivative_extractor: str = "ffmpeg"  # Registered name or "package.module:Class" FrameExtractor
+    ffmpeg_path: str = "ffmpeg"  # Binary used by the ffmpeg extractor
+    derivative_workers: int = 2  # Processes encoding derivatives
+    derivative_timeout: float = 120.0  # Seconds allowed per ffmpeg invocation
+    poster_format: str = "webp"  # "webp" or "jpg"
+    poster_width: int = 480  # Poster width in pixels (height keeps aspect ratio)
+    poster_offset: float = 1.0  # Seconds into the video the poster frame is taken from
+    preview_seconds: float = 4.0  # Length of the preview clip
+    preview_width: int = 320  # Preview clip width in pixels
+    preview_bitrate: str = "300k"  # Preview clip video bitrate (no audio)
+
+    # Storage Retention (background GC; GET /api/storage/gc reports what it would remove)
+    gc_enabled: bool = True  # Run collections in the background (the report works either way)
+    gc_interval: float = 60 * 60  # Seconds between collections
+    access_flush_interval: float = 60.0  # Seconds between batched writes of video play times
+    upload_ttl: int = 7 * 24 * 60 * 60  # Seconds uploaded images are kept (0 keeps them forever)
+    video_storage_max_bytes: int = 0  # Budget for videos + posters/previews; 0 = unlimited
+    video_min_age: int = 7 * 24 * 60 * 60  # Videos younger than this are never evicted
+    temp_file_ttl: int = 24 * 60 * 60  # Age before orphaned sidecars/metadata and stray temp files are swept
+
+    # Operation Journal (durable operation state across restarts)
+    operation_journal_path: str = "./data/operations.db"
+    journal_flush_interval: float = 0.2  # Seconds between batched journal writes
+    journal_retention: int = 24 * 60 * 60  # Keep finished operations for 24h
+
+    # Generation Result Cache (opt-in: identical requests reuse an existing video)
+    generation_cache_enabled: bool = False
+    generation_cache_ttl: int = 7 * 24 * 60 * 60  # Seconds a finished video can be reused
+    generation_cache_max_entries: int = 10000
+
+    # Video Metadata Store (SQLite, replaces per-video JSON sidecars)
+    metadata_db_path: str = "./data/videos.db"
+
+    # Video Catalog Index
+    catalog_rescan_interval: float = 30.0  # Seconds between out-of-band change checks
+
+    # Shared State (multi-worker deployments)
+    shared_state_backend: str = "local"  # "local" (single worker), "sqlite" or "redis"
+    shared_state_path: str = "./data/shared_state.db"  # sqlite backend
+    redis_url: str = "redis://localhost:6379/0"  # redis backend
+    leader_lease_ttl: float = 15.0  # Seconds a worker stays leader without renewing
+    shared_state_sync_interval: float = 1.0  # Seconds between checks of other workers' changes
+    shared_log_max_entries: int = 10000  # Newest entries kept per shared log (redis backend)
+
+    # Logging
+    log_level: str = "INFO"  # Level for the app.* loggers
+    log_format: str = "json"  # "json" (one object per line) or "text"
+    access_log_enabled: bool = True  # One structured record per HTTP request
+    log_sample_rate: float = 1.0  # Fraction of non-error requests logged (errors always are)
+    log_route_levels: str = ""  # Per-route access log levels, e.g. "/api/health=DEBUG,/api/video-status=DEBUG"
+    server_timing_enabled: bool = True  # Add a Server-Timing header to responses
+
+    # Metrics
+    metrics_enabled: bool = True  # Record latency histograms and expose GET /metrics
+
     class Config:
         # Look for .env file in backend directory
         env_file = str(Path(__file__).parent.parent / ".env")
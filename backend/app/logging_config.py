@@ -0,0 +1,109 @@
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+from datetime import datetime, timezone
+from app.config import get_settings
+
+settings = get_settings()
+
+REDACTED = "[REDACTED]"
+GOOGLE_API_KEY_PATTERN = re.compile(r"AIza[0-9A-Za-z_\-]{20,}")
+MIN_REDACTED_KEY_LENGTH = 8  # Shorter placeholder keys would mangle ordinary text
+
+
+def redact(text: str) -> str:
+    """
+    Remove the configured Gemini API key (and anything shaped like a Google API key)
+    """
+    key = settings.gemini_api_key
+    if key and len(key) >= MIN_REDACTED_KEY_LENGTH and key in text:
+        text = text.replace(key, REDACTED)
+    return GOOGLE_API_KEY_PATTERN.sub(REDACTED, text)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg, structured fields, exc
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return redact(json.dumps(payload, default=str))
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable lines for local development (same redaction as JSON)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname:7} {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return redact(line)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records with minimal work on the calling thread
+
+    Only the message is merged and the traceback rendered (both need the
+    caller's objects); JSON encoding, redaction and the stdout write all
+    happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Route the "app" logger hierarchy through a non-blocking queue to stdout
+
+    Returns:
+        The started QueueListener; stop() it on shutdown to flush
+    """
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.log_level.upper())
+    logger.handlers = [_QueueHandler(log_queue)]
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    return listener
+
+
+def parse_route_levels(spec: str) -> list:
+    """
+    Parse "path-prefix=LEVEL,..." into [(prefix, level)], longest prefix first
+    """
+    levels = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, level = item.partition("=")
+        levels.append((prefix.strip(), logging.getLevelName(level.strip().upper())))
+    return sorted(levels, key=lambda item: len(item[0]), reverse=True)
@@ -1,10 +1,30 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.video_routes import router as video_router
+from app.services.video_service import video_service
+from app.services.executor import blocking_executor
+from app.services.video_catalog import video_catalog
+from app.services.metadata_store import metadata_store
+from app.services.upload_store import upload_store
+from app.services.video_downloader import video_downloader
+from app.services.derivatives import derivative_service
+from app.services.storage_gc import storage_gc
+from app.services.ai_clients import ai_clients
+from app.services.prompt_optimizer import OPTIMIZER_SYSTEM_INSTRUCTION
+from app.services.shared_state import shared_state, leader_election
+from app.services.chat_assistant import CHAT_SYSTEM_INSTRUCTION, chat_sessions
+from app.services.prompt_optimizer import prompt_optimizer
+from app.services.metrics import metrics
+from app.logging_config import setup_logging
+from app.middleware import RequestLoggingMiddleware
 from app.config import get_settings
-import time
+import asyncio
+import logging
 
 settings = get_settings()
+log_listener = setup_logging()
+logger = logging.getLogger(__name__)
 
 # Create FastAPI application
 app = FastAPI(
@@ -35,43 +55,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """
-    Log all incoming requests with details for debugging
-    """
-    start_time = time.time()
-
-    # Log incoming request
-    print(f"\n{'='*60}")
-    print(f"[INCOMING REQUEST]")
-    print(f"{'='*60}")
-    print(f"Method: {request.method}")
-    print(f"Path: {request.url.path}")
-    print(f"Client: {request.client.host if request.client else 'Unknown'}")
-    print(f"Origin: {request.headers.get('origin', 'No Origin header')}")
-    print(f"User-Agent: {request.headers.get('user-agent', 'Unknown')[:50]}...")
-
-    # Process request
-    try:
-        response = await call_next(request)
-
-        # Log response
-        process_time = (time.time() - start_time) * 1000
-        print(f"\n[RESPONSE]")
-        print(f"Status: {response.status_code}")
-        print(f"Time: {process_time:.2f}ms")
-        print(f"{'='*60}\n")
-
-        return response
-
-    except Exception as e:
-        # Log error
-        print(f"\n[REQUEST ERROR]")
-        print(f"Error: {type(e).__name__}: {str(e)}")
-        print(f"{'='*60}\n")
-        raise
+# Structured access log + Server-Timing (replaces the old print-based middleware)
+app.add_middleware(RequestLoggingMiddleware)
 
 # Include API routes
 app.include_router(video_router)
@@ -91,75 +76,138 @@ async def root():
         "endpoints": {
             "upload_image": "POST /api/upload-image",
             "generate_video": "POST /api/generate-video",
+            "generate_batch": "POST /api/generate-videos/batch",
+            "batch_status": "GET /api/batches/{batch_id}",
             "check_status": "GET /api/video-status/{operation_id}",
+            "status_events": "GET /api/video-status/{operation_id}/events",
+            "status_socket": "WS /api/video-status/ws",
             "list_videos": "GET /api/videos",
             "get_video": "GET /api/videos/{video_id}",
+            "video_poster": "GET /api/videos/{video_id}/poster",
+            "video_preview": "GET /api/videos/{video_id}/preview",
             "delete_video": "DELETE /api/videos/{video_id}",
             "library": "GET /api/library",
             "toggle_visibility": "PATCH /api/videos/{video_id}/visibility",
+            "storage_gc_report": "GET /api/storage/gc",
+            "cache_stats": "GET /api/cache-stats",
             "models_info": "GET /api/models",
             "optimize_prompt": "POST /api/optimize-prompt",
-            "chat": "POST /api/chat"
+            "chat": "POST /api/chat",
+            "chat_stream": "POST /api/chat/stream",
+            "chat_sessions": "POST /api/chat/sessions",
+            "metrics": "GET /metrics"
         },
         "status": "running"
     }
 
 
+def _operation_counts():
+    counts = {}
+    for op_data in video_service.operations.values():
+        counts[op_data["status"]] = counts.get(op_data["status"], 0) + 1
+    return [((status,), count) for status, count in sorted(counts.items())]
+
+
+def _cache_lookups():
+    optimize = prompt_optimizer.stats()["models"].values()
+    caches = {
+        "generation": video_service.cache_counters,
+        "uploads": upload_store.cache_stats(),
+        "optimize": {
+            "hits": sum(stats["hits"] for stats in optimize),
+            "misses": sum(stats["misses"] for stats in optimize)
+        },
+        "chat_sessions": chat_sessions.stats(),
+    }
+    return [
+        ((name, result), stats[result])
+        for name, stats in caches.items()
+        for result in ("hits", "misses")
+    ]
+
+
+# State that already exists in memory is read at scrape time, not recorded per event
+metrics.callback(
+    "veo_operations", "Generation operations held in memory by status", _operation_counts, labelnames=("status",)
+)
+metrics.callback(
+    "veo_generation_queue_depth", "Jobs waiting in the generation queue", lambda: [((), len(video_service.queue))]
+)
+metrics.callback(
+    "veo_cache_lookups_total", "Cache lookups by cache and result", _cache_lookups,
+    kind="counter", labelnames=("cache", "result")
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus text exposition of this worker's metrics
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 async def startup_event():
     """
     Startup event - Log application start and validate configuration
     """
-    print("\n" + "=" * 80)
-    print("  CLEVERCREATOR.AI API STARTING")
-    print("=" * 80)
-
-    # Server Configuration
-    print(f"\n[SERVER CONFIGURATION]")
-    print(f"   Host: {settings.backend_host}")
-    print(f"   Port: {settings.backend_port}")
-    print(f"   API Docs: http://{settings.backend_host}:{settings.backend_port}/docs")
-    print(f"   API Root: http://{settings.backend_host}:{settings.backend_port}/")
-
-    # API Key Validation
-    print(f"\n[API KEY VALIDATION]")
+    logger.info("CleverCreator.ai API starting", extra={"fields": {
+        "host": settings.backend_host,
+        "port": settings.backend_port,
+        "video_model": settings.video_model,
+        "chat_model": settings.chat_model,
+        "optimize_model": settings.optimize_model,
+    }})
+
+    # The key itself is never logged, only whether it is configured
     if settings.gemini_api_key:
-        print(f"   [OK] Gemini API Key: Present (length: {len(settings.gemini_api_key)})")
-        print(f"   API Key prefix: {settings.gemini_api_key[:15]}...")
+        logger.info("Gemini API key present")
     else:
-        print(f"   [ERROR] Gemini API Key is MISSING!")
-        print(f"   Please set GEMINI_API_KEY in backend/.env")
-
-    # AI Models Configuration
-    print(f"\n[AI MODELS CONFIGURATION]")
-    print(f"   Video Generation: {settings.video_model}")
-    print(f"   Chat Assistant:   {settings.chat_model}")
-    print(f"   Prompt Optimizer: {settings.optimize_model}")
-
-    # Storage Configuration
-    print(f"\n[STORAGE CONFIGURATION]")
-    print(f"   Video Storage Path: {settings.video_storage_path}")
-    print(f"   Max File Size: {settings.max_file_size / (1024*1024):.1f} MB")
-
-    # CORS Configuration
-    print(f"\n[CORS CONFIGURATION]")
-    print(f"   Allowed Origins:")
-    print(f"     - http://localhost:5173 (standard Vite)")
-    print(f"     - http://localhost:5175 (nuclear reset)")
-    print(f"     - http://172.26.160.1:5173")
-    print(f"     - http://172.26.160.1:5175")
-    print(f"   Regex Pattern: Supports all local network IPs on ports 5173, 5175, 9001, 9005")
-
-    # Registered API Routes
-    print(f"\n[REGISTERED API ROUTES]")
-    for route in app.routes:
-        if hasattr(route, 'methods') and hasattr(route, 'path'):
-            methods = ', '.join(route.methods)
-            print(f"   {methods:10} {route.path}")
-
-    print("\n" + "=" * 80)
-    print("  [OK] BACKEND READY - Waiting for requests...")
-    print("=" * 80 + "\n")
+        logger.error("Gemini API key is missing; set GEMINI_API_KEY in backend/.env")
+
+    # Build shared AI clients now; the upstream warm-up lookup runs in the background
+    warm_models = [
+        (settings.chat_model, CHAT_SYSTEM_INSTRUCTION),
+        (settings.optimize_model, OPTIMIZER_SYSTEM_INSTRUCTION),
+    ]
+    for model_name, system_instruction in warm_models:
+        ai_clients.model(model_name, system_instruction)
+    app.state.ai_warmup = asyncio.create_task(asyncio.to_thread(ai_clients.warm, warm_models))
+
+    # Content-addressed upload store (adopts legacy uploads on first run)
+    adopted = upload_store.open()
+
+    # Open the metadata store (importing legacy JSON sidecars once), then index videos
+    metadata_store.open()
+    imported = metadata_store.import_sidecars(video_service.storage_path)
+    indexed = video_catalog.load()
+    video_catalog.start_watcher()
+
+    # Replay the operation journal, then start the background poller and dispatcher
+    resumed = video_service.restore_operations()
+    if settings.derivatives_enabled and not derivative_service.enabled:
+        logger.warning("Derivative extractor %r unavailable; posters and previews are disabled", settings.derivative_extractor)
+    purged_partials = video_downloader.purge_stale(settings.journal_retention)
+    video_service.start_poller()
+    video_service.start_dispatcher()
+    storage_gc.start()
+
+    logger.info("Backend ready", extra={"fields": {
+        "video_storage_path": settings.video_storage_path,
+        "legacy_uploads_adopted": adopted,
+        "sidecars_imported": imported,
+        "videos_indexed": indexed,
+        "operations_resumed": resumed,
+        "stale_partial_downloads_removed": purged_partials,
+        "jobs_queued": len(video_service.queue),
+        "max_concurrent_operations": settings.max_concurrent_operations,
+        "shared_state_backend": settings.shared_state_backend,
+        "role": ("leader" if leader_election.is_leader else "follower") if shared_state.shared else None,
+        "routes": sum(1 for route in app.routes if hasattr(route, "methods")),
+    }})
 
 
 @app.on_event("shutdown")
@@ -167,4 +215,16 @@ async def shutdown_event():
     """
     Shutdown event - Cleanup
     """
-    print("Shutting down CleverCreator.ai API...")
+    await video_service.stop_dispatcher()
+    await video_service.stop_poller()
+    await video_catalog.stop_watcher()
+    await storage_gc.stop()
+    blocking_executor.shutdown()
+    video_downloader.close()
+    derivative_service.shutdown()
+    video_service.close_journal()
+    video_service.close_shared_state()
+    metadata_store.close()
+    upload_store.close()
+    logger.info("CleverCreator.ai API shut down")
+    log_listener.stop()
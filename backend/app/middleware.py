@@ -0,0 +1,126 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.config import get_settings
+from app.logging_config import parse_route_levels
+from app.services.metrics import http_request_seconds
+
+settings = get_settings()
+
+_timings = ContextVar("server_timings", default=None)
+
+
+@contextmanager
+def timed(name: str):
+    """
+    Time a phase of the current request for its Server-Timing header
+
+    A no-op outside a request or when server timing is disabled.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, (time.perf_counter() - start) * 1000))
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware writing one structured access-log record per request
+    and the per-route latency histogram
+
+    - Level per route prefix (log_route_levels); 5xx and unhandled errors
+      are always logged at ERROR
+    - Successful requests are sampled at log_sample_rate
+    - Adds a Server-Timing header: total handler time ("app") plus any
+      phases recorded with timed()
+    - Observes veo_http_request_duration_seconds labelled by route template
+      (not raw path, so video ids do not explode label cardinality)
+    - Passes requests straight through when all three features are disabled
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("app.access")
+        self.access_log = settings.access_log_enabled
+        self.server_timing = settings.server_timing_enabled
+        self.metrics = settings.metrics_enabled
+        self.sample_rate = settings.log_sample_rate
+        self.route_levels = parse_route_levels(settings.log_route_levels)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.access_log or self.server_timing or self.metrics):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = [] if self.server_timing else None
+        token = _timings.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if timings is not None:
+                    phases = [f"app;dur={(time.perf_counter() - start) * 1000:.1f}"]
+                    phases += [f"{name};dur={duration:.1f}" for name, duration in timings]
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", ", ".join(phases).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            if self.metrics:
+                self._observe(scope, 500, start)
+            if self.access_log:
+                self._log(scope, 500, start, error=e)
+            raise
+        finally:
+            _timings.reset(token)
+
+        if self.metrics:
+            self._observe(scope, status_code, start)
+        if self.access_log:
+            self._log(scope, status_code, start)
+
+    def _observe(self, scope, status_code: int, start: float):
+        # The router stores the matched route in the (shared) scope
+        route = scope.get("route")
+        template = getattr(route, "path", None) or "unmatched"
+        http_request_seconds.labels(scope["method"], template, status_code).observe(time.perf_counter() - start)
+
+    def _route_level(self, path: str) -> int:
+        for prefix, level in self.route_levels:
+            if path.startswith(prefix):
+                return level
+        return logging.INFO
+
+    def _log(self, scope, status_code: int, start: float, error: Exception = None):
+        path = scope["path"]
+        if error is not None or status_code >= 500:
+            level = logging.ERROR
+        else:
+            level = self._route_level(path)
+            if not self.logger.isEnabledFor(level):
+                return
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return
+
+        client = scope.get("client")
+        fields = {
+            "method": scope["method"],
+            "path": path,
+            "status": status_code,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "client": client[0] if client else None,
+        }
+        if error is not None:
+            fields["error"] = f"{type(error).__name__}: {error}"
+        self.logger.log(level, "request", extra={"fields": fields})
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -26,6 +26,7 @@ class VideoGenerationRequest(BaseModel):
     resolution: Resolution = Resolution.P720
     duration: Duration = Duration.EIGHT
     aspect_ratio: AspectRatio = AspectRatio.LANDSCAPE
+    priority: int = Field(0, ge=0, le=10)  # Higher priority jobs are dispatched first
 
 
 class VideoGenerationResponse(BaseModel):
@@ -33,11 +34,46 @@ class VideoGenerationResponse(BaseModel):
     status: str = "processing"
 
 
+class BatchGenerationRequest(BaseModel):
+    items: List[VideoGenerationRequest] = Field(..., min_length=1, max_length=500)
+
+
+class BatchGenerationResponse(BaseModel):
+    batch_id: str
+    total: int
+    operation_ids: List[str]
+
+
+class BatchItemStatus(BaseModel):
+    index: int
+    operation_id: str
+    done: bool
+    status: str
+    video_url: Optional[str] = None
+    error: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    created_at: float
+    total: int
+    queued: int
+    processing: int
+    completed: int
+    failed: int
+    done: bool
+    progress: float  # Finished items / total
+    items: List[BatchItemStatus]
+
+
 class VideoStatusResponse(BaseModel):
     done: bool
     status: str
     video_url: Optional[str] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None  # Set while the job waits for an upstream slot
+    estimated_start_at: Optional[float] = None  # Epoch seconds
 
 
 class PromptOptimizationRequest(BaseModel):
@@ -55,9 +91,22 @@ class PromptOptimizationResponse(BaseModel):
 
 class ChatMessage(BaseModel):
     message: str = Field(..., max_length=2000)
-    conversation_history: Optional[list] = None
+    session_id: Optional[str] = None  # Continue a server-side session
+    session: bool = False  # Start a server-side session (opt-in; the default is stateless)
+    conversation_history: Optional[list] = None  # Stateless mode: full history sent by the client
 
 
 class ChatResponse(BaseModel):
     response: str
-    conversation_history: list
+    session_id: Optional[str] = None
+    conversation_history: Optional[list] = None  # Only echoed back in stateless mode
+
+
+class ChatSessionRequest(BaseModel):
+    conversation_history: Optional[list] = None  # Optional seed history
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    turns: int
+    compacted_turns: int
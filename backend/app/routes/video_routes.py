@@ -1,77 +1,171 @@
 import os
 import uuid
 import json
+import base64
+import hashlib
 import asyncio
-from pathlib import Path
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+import contextlib
+import logging
+import time
+from typing import Optional
+import aiofiles
+import aiofiles.os
+from fastapi import APIRouter, HTTPException, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from app.models import (
     VideoGenerationRequest,
     VideoGenerationResponse,
     VideoStatusResponse,
+    BatchGenerationRequest,
+    BatchGenerationResponse,
+    BatchStatusResponse,
     PromptOptimizationRequest,
     PromptOptimizationResponse,
     ChatMessage,
-    ChatResponse
+    ChatResponse,
+    ChatSessionRequest,
+    ChatSessionResponse,
+    Resolution,
+    AspectRatio,
+    Duration
 )
 from app.services.video_service import video_service
+from app.services.executor import blocking_executor
+from app.services.video_downloader import video_downloader
+from app.services.derivatives import derivative_service
+from app.services.video_catalog import video_catalog
+from app.services.metadata_store import metadata_store
+from app.services.media_response import VideoFileResponse
+from app.services.upload_store import upload_store
+from app.services.multipart_upload import MultipartFileReader, MalformedUpload, UploadTooLarge, MULTIPART_OVERHEAD
+from app.services.storage_gc import storage_gc
+from app.services.prompt_optimizer import prompt_optimizer
+from app.services.ai_clients import ai_clients
+from app.services.event_bus import status_events, StatusSubscription, is_terminal
+from app.services.shared_state import leader_election
+from app.services.chat_assistant import CHAT_SYSTEM_INSTRUCTION, to_gemini_history, stream_chat_reply, chat_sessions
+from app.services.metrics import gemini_request_seconds, gemini_first_token_seconds
+from app.middleware import timed
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["video"])
 
-# Temporary storage for uploaded images
-UPLOAD_DIR = Path("./uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Accepted image formats, identified by their leading magic bytes
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+}
+SIGNATURE_BYTES = max(len(signature) for signature in IMAGE_SIGNATURES)
+
+
+def _detect_image_extension(head: bytes) -> Optional[str]:
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+# The body is parsed by MultipartFileReader, so describe the form for the docs
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {"file": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+}
 
 
-@router.post("/upload-image", response_model=dict)
-async def upload_image(file: UploadFile = File(...)):
+@router.post("/upload-image", response_model=dict, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_image(request: Request):
     """
     Upload and validate image file
 
-    - Accepts PNG or JPEG images
-    - Maximum file size: 20MB
+    - Accepts PNG or JPEG images (checked by magic bytes, not Content-Type)
+    - Maximum file size: 20MB, enforced while the body is still arriving
+      (bodies declaring a larger Content-Length are rejected with 413
+      before any of it is read)
+    - The multipart body is parsed incrementally from the request stream
+      and the file field written to a temp file, renamed into place atomically
+    - Identical images are stored once (content-addressed by SHA-256)
     - Returns image_id for use in video generation
     """
 
-    # Validate file type
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(
-            status_code=400,
-            detail="File must be an image (PNG or JPEG)"
-        )
-
-    # Read file contents
-    contents = await file.read()
-
-    # Validate file size
-    if len(contents) > settings.max_file_size:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds {settings.max_file_size / 1024 / 1024}MB limit"
-        )
-
     # Generate unique image ID
     image_id = str(uuid.uuid4())
+    tmp_path = upload_store.temp_path(image_id)
 
-    # Determine file extension
-    file_extension = "jpg"
-    if file.filename:
-        ext = file.filename.split(".")[-1].lower()
-        if ext in ["png", "jpg", "jpeg"]:
-            file_extension = ext
+    digest = hashlib.sha256()
+    size = 0
+    file_extension = None
+    head = b""  # File bytes held back until the type can be detected
+    upload = MultipartFileReader(request, "file", settings.max_file_size + MULTIPART_OVERHEAD)
+
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            async for chunk in upload.chunks():
+                if not chunk:
+                    continue
+
+                # Validate file type once the longest signature has arrived,
+                # however small the body's first chunks are
+                if file_extension is None:
+                    head += chunk
+                    if len(head) < SIGNATURE_BYTES:
+                        continue
+                    chunk, head = head, b""
+                    file_extension = _detect_image_extension(chunk)
+                    if file_extension is None:
+                        raise HTTPException(
+                            status_code=400,
+                            detail="File must be an image (PNG or JPEG)"
+                        )
+
+                # Validate file size as soon as the limit is crossed
+                size += len(chunk)
+                if size > settings.max_file_size:
+                    raise UploadTooLarge(f"File exceeds {settings.max_file_size} bytes")
+
+                digest.update(chunk)
+                await out.write(chunk)
+
+        if file_extension is None:
+            raise HTTPException(
+                status_code=400,
+                detail="File must be an image (PNG or JPEG)"
+            )
 
-    # Save file temporarily
-    image_path = UPLOAD_DIR / f"{image_id}.{file_extension}"
+        # Atomically move the finished upload into its content-addressed blob
+        await asyncio.to_thread(
+            upload_store.add, image_id, tmp_path, digest.hexdigest(), file_extension, size
+        )
 
-    with open(image_path, "wb") as f:
-        f.write(contents)
+    except BaseException as e:
+        try:
+            await aiofiles.os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        # Stopped reading: whatever is left of the body is never received
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds {settings.max_file_size / 1024 / 1024}MB limit"
+            )
+        if isinstance(e, MalformedUpload):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
 
     return {
         "image_id": image_id,
-        "filename": file.filename,
-        "size": len(contents),
+        "filename": upload.filename,
+        "size": size,
+        "sha256": digest.hexdigest(),
         "message": "Image uploaded successfully"
     }
 
@@ -84,38 +178,34 @@ async def generate_video(request: VideoGenerationRequest):
     - Image is optional - can generate from prompt only
     - If image_id provided, uses it to guide video generation
     - Accepts prompt and optional parameters
+    - Jobs are queued and dispatched by priority, then FIFO, within the
+      upstream concurrency limit; quota errors are retried with backoff
     - Returns operation_id for polling status
     - Video generation takes 11 seconds to 6 minutes
     """
 
-    # Handle optional image
-    image_path = None
-    if request.image_id:
-        # Find uploaded image
-        image_files = list(UPLOAD_DIR.glob(f"{request.image_id}.*"))
-
-        if not image_files:
-            raise HTTPException(
-                status_code=404,
-                detail="Image not found. Please upload image first using /api/upload-image"
-            )
-
-        image_path = str(image_files[0])
+    # Handle optional image (O(1) index lookup)
+    if request.image_id and upload_store.resolve(request.image_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Image not found. Please upload image first using /api/upload-image"
+        )
 
     # Start video generation
     try:
         operation_id = await video_service.generate_video(
-            image_path=image_path,
+            image_id=request.image_id,
             prompt=request.prompt,
             negative_prompt=request.negative_prompt,
             resolution=request.resolution.value,
             duration=request.duration.value,
-            aspect_ratio=request.aspect_ratio.value
+            aspect_ratio=request.aspect_ratio.value,
+            priority=request.priority
         )
 
         return VideoGenerationResponse(
             operation_id=operation_id,
-            status="processing"
+            status=video_service.operations[operation_id]["status"]
         )
 
     except Exception as e:
@@ -125,12 +215,79 @@ async def generate_video(request: VideoGenerationRequest):
         )
 
 
+@router.post("/generate-videos/batch", response_model=BatchGenerationResponse)
+async def generate_video_batch(request: BatchGenerationRequest):
+    """
+    Start a batch of video generations in one request
+
+    - Accepts up to 500 VideoGenerationRequest items
+    - All items are validated before any is queued (unknown image_ids
+      reject the whole batch)
+    - Items share the generation queue, so they are submitted concurrently
+      within the upstream concurrency limit
+    - Returns a batch_id for GET /api/batches/{batch_id}
+    """
+
+    # Validate the whole batch up front
+    missing = sorted({
+        item.image_id for item in request.items
+        if item.image_id and upload_store.resolve(item.image_id) is None
+    })
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Images not found: {', '.join(missing)}. Please upload images first using /api/upload-image"
+        )
+
+    try:
+        batch_id = await video_service.generate_batch([
+            {
+                "image_id": item.image_id,
+                "prompt": item.prompt,
+                "negative_prompt": item.negative_prompt,
+                "resolution": item.resolution.value,
+                "duration": item.duration.value,
+                "aspect_ratio": item.aspect_ratio.value,
+                "priority": item.priority
+            }
+            for item in request.items
+        ])
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch generation failed: {str(e)}"
+        )
+
+    operation_ids = video_service.batches[batch_id]["operation_ids"]
+    return BatchGenerationResponse(
+        batch_id=batch_id,
+        total=len(operation_ids),
+        operation_ids=operation_ids
+    )
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(batch_id: str):
+    """
+    Aggregated status of a batch
+
+    - Counts of queued, processing, completed and failed items
+    - done=true once every item has finished; progress is the finished fraction
+    - Per-item status, video_url, error and queue position in one payload
+    """
+    result = await video_service.batch_status(batch_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return BatchStatusResponse(**result)
+
+
 @router.get("/video-status/{operation_id}", response_model=VideoStatusResponse)
 async def get_video_status(operation_id: str):
     """
     Check video generation status
 
-    - Poll this endpoint every 10 seconds
+    - Answered from memory; a background poller refreshes operations upstream
+    - Queued jobs report queue_position and estimated_start_at
     - Returns done=true when video is ready
     - Provides video_url when complete
     - May return error if generation failed
@@ -147,13 +304,103 @@ async def get_video_status(operation_id: str):
         )
 
 
+@router.get("/video-status/{operation_id}/events")
+async def stream_video_status(operation_id: str, request: Request):
+    """
+    Push video generation status as Server-Sent Events
+
+    - Sends the current status immediately, then every state change
+    - Progress events repeat every status_event_heartbeat seconds with elapsed time
+    - The completed or failed event is sent exactly once, then the stream closes
+    - Fed by the background poller; watchers never trigger upstream calls
+    - On workers other than the leader, updates arrive with the heartbeat
+    """
+    # Subscribe before the first snapshot so no transition is missed
+    subscription = status_events.subscribe(operation_id)
+    event = await video_service.status_event(operation_id)
+    if event["event"] == "not_found":
+        status_events.close(subscription)
+        raise HTTPException(status_code=404, detail="Operation not found")
+
+    async def event_generator():
+        nonlocal event
+        try:
+            while True:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+                if event["done"]:
+                    return
+                if await request.is_disconnected():
+                    return
+                event = await subscription.next(timeout=settings.status_event_heartbeat)
+                if event is None:
+                    event = await video_service.status_event(operation_id)
+        finally:
+            status_events.close(subscription)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.websocket("/video-status/ws")
+async def video_status_socket(websocket: WebSocket):
+    """
+    Multiplexed status updates for many operations over one WebSocket
+
+    - Client sends {"subscribe": [operation_id, ...]} or {"unsubscribe": [...]}
+    - Each subscribed id gets its current status right away, then every
+      state change; heartbeats carry elapsed time for running operations
+    - Finished operations are unsubscribed after their final event
+    """
+    await websocket.accept()
+    subscription = StatusSubscription()
+
+    async def push_events():
+        # Only this task writes to the socket
+        while True:
+            event = await subscription.next(timeout=settings.status_event_heartbeat)
+            events = [event] if event is not None else [
+                await video_service.status_event(operation_id) for operation_id in list(subscription.operation_ids)
+            ]
+            for event in events:
+                await websocket.send_json(event)
+                if is_terminal(event):
+                    status_events.unsubscribe(event["operation_id"], subscription)
+
+    pusher = asyncio.create_task(push_events())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            for operation_id in message.get("unsubscribe") or []:
+                status_events.unsubscribe(operation_id, subscription)
+            for operation_id in message.get("subscribe") or []:
+                status_events.subscribe(operation_id, subscription)
+                subscription.deliver(await video_service.status_event(operation_id))
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        pusher.cancel()
+        status_events.close(subscription)
+
+
 @router.get("/videos/{video_id}")
-async def get_video(video_id: str):
+async def get_video(video_id: str, request: Request, v: Optional[str] = Query(None)):
     """
     Retrieve generated video file
 
     - Downloads the generated video
-    - Supports video streaming and range requests
+    - Supports single and multi-range requests (206) with If-Range
+    - Answers If-None-Match / If-Modified-Since with 304
+    - With v set to the listing's version the response is cacheable for a
+      year (immutable); otherwise caches revalidate on every use, since a
+      remux (manage.py remux-videos) rewrites the file in place
     - Returns MP4 file with audio
     """
 
@@ -166,68 +413,175 @@ async def get_video(video_id: str):
             detail="Video not found. It may have been deleted or the ID is invalid."
         )
 
+    # Last play time drives LRU eviction under the storage budget
+    storage_gc.record_access(video_id)
+
     # Return video file with proper media type
-    return FileResponse(
-        path=video_path,
-        media_type="video/mp4",
-        filename=f"generated_video_{video_id}.mp4"
-    )
+    try:
+        return VideoFileResponse(
+            path=video_path,
+            request_headers=request.headers,
+            media_type="video/mp4",
+            filename=f"generated_video_{video_id}.mp4",
+            versioned=True,
+            version=v
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Video not found. It may have been deleted or the ID is invalid."
+        )
 
 
-@router.get("/videos")
-async def list_videos():
+async def _serve_derivative(video_id: str, kind: str, request: Request, version: Optional[str]):
     """
-    List all generated videos
+    Serve a poster or preview clip, scheduling it if it does not exist yet
 
-    - Returns list of all videos with metadata
-    - Includes video ID, filename, size, creation time, and prompt information
+    Derivatives are regenerated in place (manage.py backfill-derivatives
+    --force), so like videos they are only immutable at the URL of their
+    current version.
     """
-    import json
-    video_dir = Path(settings.video_storage_path)
-    videos = []
-
-    if video_dir.exists():
-        for video_file in video_dir.glob("*.mp4"):
-            stat = video_file.stat()
-            video_id = video_file.stem
-
-            # Load metadata if exists
-            metadata_path = video_dir / f"{video_id}.json"
-            metadata = None
-            if metadata_path.exists():
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                except:
-                    metadata = None
-
-            video_data = {
-                "id": video_id,
-                "filename": video_file.name,
-                "size": stat.st_size,
-                "created_at": stat.st_ctime,
-                "modified_at": stat.st_mtime
-            }
+    video_path = video_service.get_video_path(video_id)
+    if not video_path.exists():
+        raise HTTPException(status_code=404, detail="Video not found")
 
-            # Add metadata if available
-            if metadata:
-                video_data["prompt"] = metadata.get("prompt")
-                video_data["negative_prompt"] = metadata.get("negative_prompt")
-                video_data["resolution"] = metadata.get("resolution")
-                video_data["duration"] = metadata.get("duration")
-                video_data["aspect_ratio"] = metadata.get("aspect_ratio")
-                video_data["has_image"] = metadata.get("has_image", False)
-                video_data["is_public"] = metadata.get("is_public", False)
+    derivative_path = derivative_service.path(video_id, kind)
+    try:
+        return VideoFileResponse(
+            path=derivative_path,
+            request_headers=request.headers,
+            media_type=derivative_service.media_type(kind),
+            kind=kind,
+            versioned=True,
+            version=version
+        )
+    except FileNotFoundError:
+        video_service.schedule_derivatives(video_id)
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not generated yet")
 
-            videos.append(video_data)
 
-    # Sort by creation time, newest first
-    videos.sort(key=lambda x: x['created_at'], reverse=True)
+@router.get("/videos/{video_id}/poster")
+async def get_video_poster(video_id: str, request: Request, v: Optional[str] = Query(None)):
+    """
+    Poster image for gallery tiles (WebP or JPEG, poster_width wide)
+
+    - Generated after download; a missing poster is scheduled and 404 returned
+    - With v set to the listing's poster_version the response is cacheable
+      for a year (immutable); otherwise caches revalidate (ETag), since
+      backfill-derivatives --force rewrites the poster in place
+    """
+    return await _serve_derivative(video_id, "poster", request, v)
+
+
+@router.get("/videos/{video_id}/preview")
+async def get_video_preview(video_id: str, request: Request, v: Optional[str] = Query(None)):
+    """
+    Short, silent, low-bitrate preview clip for gallery hover playback
+
+    - Generated after download; a missing clip is scheduled and 404 returned
+    - Supports range requests like the full video
+    - Immutable only at the listing's preview_version (v), like the poster
+    """
+    return await _serve_derivative(video_id, "preview", request, v)
+
+
+def _encode_cursor(cursor: tuple) -> str:
+    created_at, video_id = cursor
+    return base64.urlsafe_b64encode(f"{created_at!r}|{video_id}".encode()).decode().rstrip("=")
+
+
+def _decode_cursor(value: str) -> tuple:
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        created_at, video_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return float(created_at), video_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against a strong ETag
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
-    return {
-        "videos": videos,
-        "count": len(videos)
-    }
+
+def _catalog_page(request: Request, public_only: bool, filters: dict, cursor: Optional[str],
+                  limit: int, created_from: Optional[float], created_to: Optional[float]) -> Response:
+    """
+    Serve one page of the catalog with a strong ETag
+
+    The ETag is derived from the catalog's contents and the request URL,
+    so an unchanged page is answered with 304 before the catalog is
+    queried, by whichever worker receives the revalidation.
+    """
+    query_hash = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:12]
+    etag = f'"{video_catalog.etag}-{query_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    videos, next_cursor = video_catalog.query(
+        public_only=public_only,
+        filters={field: value for field, value in filters.items() if value is not None},
+        cursor=_decode_cursor(cursor) if cursor else None,
+        limit=limit,
+        created_from=created_from,
+        created_to=created_to
+    )
+
+    return JSONResponse(
+        content={
+            "videos": videos,
+            "count": len(videos),
+            "next_cursor": _encode_cursor(next_cursor) if next_cursor else None
+        },
+        headers=headers
+    )
+
+
+@router.get("/videos")
+async def list_videos(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    is_public: Optional[bool] = None,
+    resolution: Optional[Resolution] = None,
+    aspect_ratio: Optional[AspectRatio] = None,
+    duration: Optional[Duration] = None,
+    has_image: Optional[bool] = None,
+    created_from: Optional[float] = None,
+    created_to: Optional[float] = None
+):
+    """
+    List generated videos
+
+    - Returns a page of videos with metadata, newest first
+    - Includes video ID, filename, size, creation time, and prompt information
+    - Pass next_cursor back as cursor to get the following page
+    - Filters: is_public, resolution, aspect_ratio, duration, has_image, created_from/created_to (Unix time)
+    - Sends a strong ETag; unchanged pages return 304 Not Modified
+    - Served from the in-memory catalog index
+    """
+    return _catalog_page(
+        request,
+        public_only=False,
+        filters={
+            "is_public": is_public,
+            "resolution": resolution.value if resolution else None,
+            "aspect_ratio": aspect_ratio.value if aspect_ratio else None,
+            "duration": duration.value if duration else None,
+            "has_image": has_image
+        },
+        cursor=cursor,
+        limit=limit,
+        created_from=created_from,
+        created_to=created_to
+    )
 
 
 @router.delete("/videos/{video_id}")
@@ -235,7 +589,7 @@ async def delete_video(video_id: str):
     """
     Delete a generated video
 
-    - Permanently removes the video file and metadata from storage
+    - Permanently removes the video file, its metadata, poster and preview clip
     - Returns success status
     """
     video_path = video_service.get_video_path(video_id)
@@ -247,76 +601,61 @@ async def delete_video(video_id: str):
         )
 
     try:
-        video_path.unlink()  # Delete the video file
-
-        # Also delete metadata file if exists
-        metadata_path = Path(settings.video_storage_path) / f"{video_id}.json"
-        if metadata_path.exists():
-            metadata_path.unlink()
-
-        return {
-            "success": True,
-            "message": f"Video {video_id} deleted successfully"
-        }
+        deleted = await asyncio.to_thread(video_service.delete_video, video_id)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete video: {str(e)}"
         )
 
+    # Another request may have deleted it since the check above
+    if not deleted:
+        raise HTTPException(
+            status_code=404,
+            detail="Video not found"
+        )
+
+    return {
+        "success": True,
+        "message": f"Video {video_id} deleted successfully"
+    }
+
 
 @router.get("/library")
-async def get_public_library():
+async def get_public_library(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    resolution: Optional[Resolution] = None,
+    aspect_ratio: Optional[AspectRatio] = None,
+    duration: Optional[Duration] = None,
+    has_image: Optional[bool] = None,
+    created_from: Optional[float] = None,
+    created_to: Optional[float] = None
+):
     """
-    Get all public videos (Community Library)
+    Get public videos (Community Library)
 
     - Returns only videos marked as public
     - Includes video metadata, prompts, and parameters
-    - Sorted by creation time, newest first
-    """
-    import json
-    video_dir = Path(settings.video_storage_path)
-    public_videos = []
-
-    if video_dir.exists():
-        for video_file in video_dir.glob("*.mp4"):
-            stat = video_file.stat()
-            video_id = video_file.stem
-
-            # Load metadata if exists
-            metadata_path = video_dir / f"{video_id}.json"
-            if metadata_path.exists():
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-
-                    # Only include public videos
-                    if metadata.get("is_public", False):
-                        video_data = {
-                            "id": video_id,
-                            "filename": video_file.name,
-                            "size": stat.st_size,
-                            "created_at": stat.st_ctime,
-                            "modified_at": stat.st_mtime,
-                            "prompt": metadata.get("prompt"),
-                            "negative_prompt": metadata.get("negative_prompt"),
-                            "resolution": metadata.get("resolution"),
-                            "duration": metadata.get("duration"),
-                            "aspect_ratio": metadata.get("aspect_ratio"),
-                            "has_image": metadata.get("has_image", False),
-                            "is_public": True
-                        }
-                        public_videos.append(video_data)
-                except:
-                    pass
-
-    # Sort by creation time, newest first
-    public_videos.sort(key=lambda x: x['created_at'], reverse=True)
-
-    return {
-        "videos": public_videos,
-        "count": len(public_videos)
-    }
+    - Sorted by creation time, newest first, paginated with cursor/limit
+    - Same filters and ETag handling as GET /api/videos
+    - Served from the in-memory catalog index
+    """
+    return _catalog_page(
+        request,
+        public_only=True,
+        filters={
+            "resolution": resolution.value if resolution else None,
+            "aspect_ratio": aspect_ratio.value if aspect_ratio else None,
+            "duration": duration.value if duration else None,
+            "has_image": has_image
+        },
+        cursor=cursor,
+        limit=limit,
+        created_from=created_from,
+        created_to=created_to
+    )
 
 
 @router.patch("/videos/{video_id}/visibility")
@@ -328,39 +667,29 @@ async def toggle_video_visibility(video_id: str, is_public: bool):
     - Public videos appear in the community library
     - Private videos only appear in My Videos
     """
-    import json
-    video_dir = Path(settings.video_storage_path)
-    metadata_path = video_dir / f"{video_id}.json"
+    try:
+        # Single-row UPDATE in the metadata store
+        updated = metadata_store.set_public(video_id, is_public)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to update visibility: {str(e)}"
+        )
 
-    if not metadata_path.exists():
+    if not updated:
         raise HTTPException(
             status_code=404,
             detail="Video metadata not found"
         )
 
-    try:
-        # Read existing metadata
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-
-        # Update visibility
-        metadata["is_public"] = is_public
+    video_catalog.set_public(video_id, is_public)
 
-        # Write back to file
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
-
-        return {
-            "success": True,
-            "video_id": video_id,
-            "is_public": is_public,
-            "message": f"Video is now {'public' if is_public else 'private'}"
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to update visibility: {str(e)}"
-        )
+    return {
+        "success": True,
+        "video_id": video_id,
+        "is_public": is_public,
+        "message": f"Video is now {'public' if is_public else 'private'}"
+    }
 
 
 @router.get("/health")
@@ -370,11 +699,66 @@ async def health_check():
 
     - Verifies API is running
     - Returns status information
+    - Reports queue depth and saturation of the SDK thread pools
+    - Reports streamed downloads: completed, resumed, bytes, partial files
+    - Reports the poster / preview clip pipeline
+    - Reports storage GC runs and reclaimed bytes
+    - Reports shared AI client state and per-model concurrency headroom
+    - Reports status push watchers and event fan-out
+    - Reports the generation queue: depth, running upstream, quota backoff
+    - Reports the shared state backend and whether this worker is the leader
     """
     return {
         "status": "healthy",
         "service": "CleverCreator.ai Video Generation API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "executor": blocking_executor.stats(),
+        "downloads": video_downloader.stats(),
+        "derivatives": derivative_service.stats(),
+        "storage_gc": storage_gc.stats(),
+        "ai_clients": ai_clients.stats(),
+        "status_events": status_events.stats(),
+        "generation_queue": {
+            **video_service.queue.stats(),
+            "running_upstream": video_service.running_upstream(),
+            "max_concurrent_operations": settings.max_concurrent_operations
+        },
+        "shared_state": {
+            "backend": settings.shared_state_backend,
+            **leader_election.stats()
+        }
+    }
+
+
+@router.get("/storage/gc")
+async def get_storage_gc_report(limit: int = Query(100, ge=0, le=1000)):
+    """
+    Dry-run report of the storage garbage collector
+
+    - Lists what the next collection would remove, per policy: expired
+      uploads, unreferenced upload blobs, stale temp files, orphaned
+      sidecars / metadata / derivatives, and LRU-evicted private videos
+    - Reports count and bytes per category, plus up to `limit` items each
+    - Includes current usage and the configured policies; removes nothing
+    """
+    return await storage_gc.collect(dry_run=True, limit=limit)
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Cache statistics
+
+    - Generation result cache: hits, misses, coalesced submissions
+    - Uploaded image byte cache: hit rate and memory use
+    - Prompt optimization cache: per-model hit rate and coalesced calls
+    - Chat sessions: live sessions, evictions, token budget
+    """
+    return {
+        "generation": video_service.cache_stats(),
+        "uploads": upload_store.cache_stats(),
+        "optimize": prompt_optimizer.stats(),
+        "chat_sessions": chat_sessions.stats()
     }
 
 
@@ -421,111 +805,85 @@ async def optimize_prompt(request: PromptOptimizationRequest):
     - Uses AI to enhance prompt with cinematic details
     - Returns optimized prompt for better video generation
     - Considers mood, camera style, audio style, and additional details
+    - Identical requests are served from cache or share one in-flight Gemini call
     """
-    import google.generativeai as genai
-    import traceback
-
-    print("\n" + "=" * 60)
-    print("OPTIMIZE ENDPOINT HIT")
-    print("=" * 60)
-    print(f"Request received at /api/optimize-prompt")
-    print(f"Original prompt: {request.original_prompt[:100]}...")
-    print(f"Prompt length: {len(request.original_prompt)} characters")
-    print(f"Additional details: {request.additional_details[:50] if request.additional_details else 'None'}...")
-    print(f"Mood: {request.mood}")
-    print(f"Camera style: {request.camera_style}")
-    print(f"Audio style: {request.audio_style}")
-    print(f"API Key present: {bool(settings.gemini_api_key)}")
-    print(f"API Key length: {len(settings.gemini_api_key) if settings.gemini_api_key else 0}")
+    logger.debug("Optimize prompt", extra={"fields": {
+        "prompt_chars": len(request.original_prompt),
+        "mood": request.mood,
+        "camera_style": request.camera_style,
+        "audio_style": request.audio_style,
+        "model": settings.optimize_model,
+    }})
 
     try:
-        # Configure Gemini API
-        print(f"\nConfiguring Gemini API...")
-        genai.configure(api_key=settings.gemini_api_key)
-        print(f"API configured successfully")
-        print(f"Using model: {settings.optimize_model}")
-
-        # Create model with system instruction
-        print(f"Creating Gemini model...")
-        model = genai.GenerativeModel(
-            model_name=settings.optimize_model,
-            system_instruction="""You are an expert video generation prompt engineer specializing in Google Veo 3.1.
-Your task is to enhance video prompts to maximize quality and cinematic appeal.
-
-Guidelines:
-1. Enhance prompts with vivid, specific details about:
-   - Subject description and appearance
-   - Actions and movements
-   - Visual style and aesthetics
-   - Camera angles, movements, and framing
-   - Lighting and atmosphere
-   - Audio elements and soundscape
-   - Color palette and mood
-
-2. Keep prompts under 4096 characters (Veo 3.1 maximum)
-3. Be specific and descriptive
-4. Use cinematic language
-5. Focus on visual and audio details that Veo 3.1 can generate
-6. Maintain the original intent while enhancing quality
-7. Incorporate user's additional requirements seamlessly
-
-Return ONLY the optimized prompt, nothing else."""
+        # Cached, coalesced Gemini call
+        with timed("gemini"):
+            optimized = await prompt_optimizer.optimize(request)
+
+        return PromptOptimizationResponse(
+            optimized_prompt=optimized,
+            original_prompt=request.original_prompt
         )
-        print(f"Model created successfully")
 
-        # Build user context
-        user_context_parts = [f"Original prompt: {request.original_prompt}"]
+    except Exception as e:
+        logger.exception("Prompt optimization failed")
 
-        if request.additional_details:
-            user_context_parts.append(f"Additional requirements: {request.additional_details}")
-        if request.mood:
-            user_context_parts.append(f"Desired mood/tone: {request.mood}")
-        if request.camera_style:
-            user_context_parts.append(f"Camera style: {request.camera_style}")
-        if request.audio_style:
-            user_context_parts.append(f"Audio style: {request.audio_style}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Optimization failed: {type(e).__name__}: {str(e)}"
+        )
 
-        user_context = "\n\n".join(user_context_parts)
-        full_prompt = user_context + "\n\nEnhance this prompt for optimal Veo 3.1 video generation:"
 
-        print(f"\nSending request to Gemini...")
-        print(f"Full prompt length: {len(full_prompt)} characters")
+def _resolve_chat_session(request: ChatMessage):
+    """
+    Session for a chat request, or None in stateless mode
 
-        # Generate optimized prompt using Gemini
-        response = model.generate_content(full_prompt)
+    A session is only created when the client asks for one (session=true),
+    so clients that send neither session_id nor history stay stateless.
+    Raises 404 for an unknown or expired session_id so the client can
+    start a new session (optionally seeded via POST /api/chat/sessions).
+    """
+    if request.session_id:
+        session = chat_sessions.get(request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found or expired")
+        return session
+    if request.session:
+        return chat_sessions.create(request.conversation_history)
+    return None
 
-        print(f"Gemini response received")
 
-        optimized = response.text.strip()
-        print(f"Optimized prompt length: {len(optimized)} characters")
-        print(f"Response preview: {optimized[:100]}...")
+def _start_chat(model, request: ChatMessage, session):
+    # Session history is already stored in Gemini format
+    if session is not None:
+        return model.start_chat(history=list(session.history))
+    return model.start_chat(history=to_gemini_history(request.conversation_history or []))
 
-        # Ensure it's within Veo 3.1 character limit
-        if len(optimized) > 4096:
-            optimized = optimized[:4093] + "..."
-            print("Truncated to 4096 characters")
 
-        print("Optimization complete!")
+@router.post("/chat/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(request: ChatSessionRequest = None):
+    """
+    Start a server-side chat session
 
-        return PromptOptimizationResponse(
-            optimized_prompt=optimized,
-            original_prompt=request.original_prompt
-        )
+    - Optional conversation_history seeds the session (e.g. to resume after expiry)
+    - Seed history over the token budget is compacted immediately
+    """
+    session = chat_sessions.create(request.conversation_history if request else None)
+    return ChatSessionResponse(
+        session_id=session.id,
+        turns=session.turns,
+        compacted_turns=session.compacted_turns
+    )
 
-    except Exception as e:
-        print("\n" + "=" * 60)
-        print("OPTIMIZE ERROR OCCURRED")
-        print("=" * 60)
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        print(f"Full traceback:")
-        print(traceback.format_exc())
-        print("=" * 60)
 
-        raise HTTPException(
-            status_code=500,
-            detail=f"Optimization failed: {type(e).__name__}: {str(e)}"
-        )
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """
+    Discard a chat session and its history
+    """
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"success": True, "session_id": session_id}
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -535,67 +893,40 @@ async def chat_with_ai(request: ChatMessage):
 
     - Conversational interface with Gemini
     - Helps brainstorm video ideas, refine prompts, answer questions
-    - Maintains conversation history for context
-    - Returns AI response and updated conversation history
+    - Session mode: send session_id, or session=true to start a session
+      (seeded with conversation_history if given); only the new reply and
+      session_id are returned
+    - Stateless mode (default): send conversation_history, or nothing for a
+      new conversation; the updated history is returned
     """
-    import google.generativeai as genai
-    import traceback
-
-    print("\n" + "=" * 60)
-    print("CHAT ENDPOINT HIT")
-    print("=" * 60)
-    print(f"Request received at /api/chat")
-    print(f"Message: {request.message[:100]}...")
-    print(f"History length: {len(request.conversation_history) if request.conversation_history else 0}")
+    session = _resolve_chat_session(request)
+    logger.debug("Chat message", extra={"fields": {
+        "message_chars": len(request.message),
+        "session_id": session.id if session else None,
+        "history_turns": session.turns if session else len(request.conversation_history or []),
+    }})
 
     try:
-        # Configure Gemini API
-        genai.configure(api_key=settings.gemini_api_key)
-
-        # Create Gemini model with system instruction
-        model = genai.GenerativeModel(
-            model_name=settings.chat_model,
-            system_instruction="""You are a helpful AI assistant specializing in video generation with Google Veo 3.1.
-
-Your role:
-- Help users brainstorm creative video ideas
-- Refine and improve video prompts for better results
-- Answer questions about Veo 3.1 capabilities
-- Suggest improvements to prompts (camera angles, lighting, mood, audio, etc.)
-- Be concise but helpful
-- Focus on actionable, specific advice
-
-Veo 3.1 capabilities:
-- Generates 8-second videos at 720p or 1080p
-- Supports 16:9 and 9:16 aspect ratios
-- Can work with or without reference images
-- Generates native audio with the video
-- Best results with detailed, cinematic descriptions
-
-When users ask for prompt suggestions, provide them in a clear, formatted way that they can easily copy."""
-        )
-
-        # Build conversation history for Gemini chat
-        history = []
-        if request.conversation_history:
-            for msg in request.conversation_history:
-                history.append({
-                    "role": msg["role"],
-                    "parts": [msg["content"]]
-                })
+        async with session.lock if session else contextlib.nullcontext():
+            # Shared, pre-built Gemini model
+            model = ai_clients.model(settings.chat_model, CHAT_SYSTEM_INSTRUCTION)
+            chat = _start_chat(model, request, session)
 
-        # Start chat with history
-        chat = model.start_chat(history=history)
+            # Send message and get response (bounded per model, off the event loop)
+            with timed("gemini"):
+                async with ai_clients.limit(settings.chat_model):
+                    started = time.perf_counter()
+                    response = await asyncio.to_thread(chat.send_message, request.message)
+                    gemini_request_seconds.labels(settings.chat_model, "chat").observe(time.perf_counter() - started)
 
-        # Send message and get response
-        response = chat.send_message(request.message)
+            ai_response = response.text.strip()
 
-        ai_response = response.text.strip()
+            if session is not None:
+                chat_sessions.record_turn(session, request.message, ai_response)
+                return ChatResponse(response=ai_response, session_id=session.id)
 
         # Build updated conversation history
-        messages = []
-        if request.conversation_history:
-            messages.extend(request.conversation_history)
+        messages = list(request.conversation_history or [])
         messages.append({"role": "user", "content": request.message})
         messages.append({"role": "model", "content": ai_response})
 
@@ -605,14 +936,7 @@ When users ask for prompt suggestions, provide them in a clear, formatted way th
         )
 
     except Exception as e:
-        print("\n" + "=" * 60)
-        print("CHAT ERROR OCCURRED")
-        print("=" * 60)
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        print(f"Full traceback:")
-        print(traceback.format_exc())
-        print("=" * 60)
+        logger.exception("Chat failed")
 
         raise HTTPException(
             status_code=500,
@@ -627,76 +951,47 @@ async def chat_with_ai_stream(request: ChatMessage):
 
     Returns Server-Sent Events (SSE) stream with:
     - Thinking steps
-    - Action details
+    - Content chunks, forwarded as soon as Gemini produces them
     - Final response
+
+    Session mode (session_id sent, or session=true to start one) starts
+    with a 'session' event carrying the session_id; the reply is added to
+    the server-side history once complete. Otherwise the request is
+    stateless and uses conversation_history as sent.
+
+    Upstream consumption stops as soon as the client disconnects.
     """
-    import google.generativeai as genai
+    session = _resolve_chat_session(request)
 
     async def event_generator():
         try:
+            if session is not None:
+                yield f"data: {json.dumps({'type': 'session', 'content': session.id})}\n\n"
+
             # Send initial thinking step
             yield f"data: {json.dumps({'type': 'thinking', 'content': 'Analyzing your question...'})}\n\n"
-            await asyncio.sleep(0.3)
-
-            # Configure Gemini API
-            yield f"data: {json.dumps({'type': 'action', 'content': 'Connecting to Gemini AI...'})}\n\n"
-            genai.configure(api_key=settings.gemini_api_key)
-            await asyncio.sleep(0.2)
-
-            # Create model
-            yield f"data: {json.dumps({'type': 'action', 'content': 'Loading video generation knowledge base...'})}\n\n"
-            model = genai.GenerativeModel(
-                model_name=settings.chat_model,
-                system_instruction="""You are a helpful AI assistant specializing in video generation with Google Veo 3.1.
-
-Your role:
-- Help users brainstorm creative video ideas
-- Refine and improve video prompts for better results
-- Answer questions about Veo 3.1 capabilities
-- Suggest improvements to prompts (camera angles, lighting, mood, audio, etc.)
-- Be concise but helpful
-- Focus on actionable, specific advice
-
-Veo 3.1 capabilities:
-- Generates 8-second videos at 720p or 1080p
-- Supports 16:9 and 9:16 aspect ratios
-- Can work with or without reference images
-- Generates native audio with the video
-- Best results with detailed, cinematic descriptions
-
-When users ask for prompt suggestions, provide them in a clear, formatted way that they can easily copy."""
-            )
-            await asyncio.sleep(0.2)
-
-            # Build conversation history
-            history = []
-            if request.conversation_history:
-                yield f"data: {json.dumps({'type': 'action', 'content': f'Loading {len(request.conversation_history)} previous messages...'})}\n\n"
-                for msg in request.conversation_history:
-                    history.append({
-                        "role": msg["role"],
-                        "parts": [msg["content"]]
-                    })
-                await asyncio.sleep(0.2)
-
-            # Start chat
-            yield f"data: {json.dumps({'type': 'thinking', 'content': 'Processing your request...'})}\n\n"
-            chat = model.start_chat(history=history)
-            await asyncio.sleep(0.3)
-
-            # Send message with streaming
-            yield f"data: {json.dumps({'type': 'action', 'content': 'Generating response...'})}\n\n"
-            await asyncio.sleep(0.3)
-
-            # Stream the response
-            response = chat.send_message(request.message, stream=True)
-
-            full_response = ""
-            for chunk in response:
-                if chunk.text:
-                    full_response += chunk.text
-                    yield f"data: {json.dumps({'type': 'content', 'content': chunk.text})}\n\n"
-                    await asyncio.sleep(0.05)  # Small delay for smooth streaming
+
+            async with session.lock if session else contextlib.nullcontext():
+                # Shared, pre-built Gemini model
+                model = ai_clients.model(settings.chat_model, CHAT_SYSTEM_INSTRUCTION)
+                chat = _start_chat(model, request, session)
+
+                yield f"data: {json.dumps({'type': 'action', 'content': 'Generating response...'})}\n\n"
+
+                # Stream the response without blocking the event loop
+                full_response = ""
+                async with ai_clients.limit(settings.chat_model):
+                    started = time.perf_counter()
+                    async for text in stream_chat_reply(chat, request.message):
+                        if not full_response:
+                            gemini_first_token_seconds.labels(settings.chat_model).observe(time.perf_counter() - started)
+                        full_response += text
+                        yield f"data: {json.dumps({'type': 'content', 'content': text})}\n\n"
+
+                    gemini_request_seconds.labels(settings.chat_model, "chat_stream").observe(time.perf_counter() - started)
+
+                if session is not None:
+                    chat_sessions.record_turn(session, request.message, full_response.strip())
 
             # Send completion
             yield f"data: {json.dumps({'type': 'done', 'content': full_response})}\n\n"
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import google.generativeai as genai
+import logging
+from google import genai as genai_sdk
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class AIClientManager:
+    """
+    Process-wide Gemini and Veo clients, created once and reused
+
+    google.generativeai is configured a single time so its transport (and
+    the HTTP/2 connection behind it) stays alive across requests, and
+    GenerativeModel handles are cached per (model name, system
+    instruction). Each model also gets a concurrency limit
+    (gemini_max_concurrency) so one busy feature cannot exhaust quota for
+    the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured = False
+        self._video_client = None
+        self._models = {}  # (model_name, system_instruction) -> GenerativeModel
+        self._limits = {}  # model_name -> asyncio.Semaphore
+
+    @property
+    def video_client(self) -> genai_sdk.Client:
+        """
+        Shared google.genai client used for Veo video generation
+        """
+        with self._lock:
+            if self._video_client is None:
+                self._video_client = genai_sdk.Client(api_key=settings.gemini_api_key)
+            return self._video_client
+
+    def model(self, model_name: str, system_instruction: str = None) -> genai.GenerativeModel:
+        """
+        Return the cached GenerativeModel for (model_name, system_instruction)
+        """
+        key = (model_name, system_instruction)
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=settings.gemini_api_key)
+                self._configured = True
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+                self._models[key] = model
+            return model
+
+    def limit(self, model_name: str) -> asyncio.Semaphore:
+        """
+        Semaphore bounding concurrent upstream calls to one model
+
+        Usage: async with ai_clients.limit(model_name): ...
+        """
+        semaphore = self._limits.get(model_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+            self._limits[model_name] = semaphore
+        return semaphore
+
+    def warm(self, models: list) -> None:
+        """
+        Build clients and model handles ahead of the first request
+
+        Blocking. Also looks each model up once so the upstream connection
+        is established before traffic arrives; failures are reported but
+        not fatal.
+
+        Args:
+            models: (model_name, system_instruction) pairs to pre-build
+        """
+        self.video_client
+        for model_name, system_instruction in models:
+            self.model(model_name, system_instruction)
+        for model_name in {model_name for model_name, _ in models}:
+            try:
+                genai.get_model(f"models/{model_name}", request_options={"timeout": 10, "retry": None})
+            except Exception as e:
+                logger.warning("Warm-up lookup for %s failed: %s: %s", model_name, type(e).__name__, e)
+
+    def stats(self) -> dict:
+        return {
+            "configured": self._configured,
+            "cached_models": len(self._models),
+            "limits": {
+                model_name: {
+                    "max_concurrency": settings.gemini_max_concurrency,
+                    "available": semaphore._value,
+                }
+                for model_name, semaphore in self._limits.items()
+            },
+        }
+
+
+# Singleton instance
+ai_clients = AIClientManager()
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by total size, with optional TTL
+
+    Each entry carries a size (bytes, or any other unit); the least
+    recently used entries are evicted once the total exceeds max_size.
+    When ttl is set, entries older than ttl seconds are treated as missing.
+    """
+
+    def __init__(self, max_size: int, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[2] is not None and item[2] <= time.monotonic():
+                self._remove_locked(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size: int = 1, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if size > self.max_size:
+                return
+            self._remove_locked(key)
+            self._entries[key] = (value, size, expires_at)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._remove_locked(key)
+            return default if item is None else item[0]
+
+    def _remove_locked(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+        return item
+
+    def __contains__(self, key):
+        # Membership test; does not touch recency or hit/miss counters
+        item = self._entries.get(key)
+        return item is not None and (item[2] is None or item[2] > time.monotonic())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class _Flight:
+    """One in-flight call: the task running it and how many callers await it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution
+
+    The first caller for a key starts the coroutine as its own task;
+    every caller, the first included, awaits that task (or its exception).
+    A caller being cancelled (a client disconnecting) only stops its own
+    wait: the call keeps running for the others, and is cancelled once no
+    caller is left waiting for it.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> _Flight
+        self.shared = 0  # Calls that piggy-backed on an in-flight call
+
+    async def do(self, key, fn):
+        """
+        Run `await fn()` once per in-flight key and return its result
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda task: self._forget(key, flight))
+        else:
+            self.shared += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up; later callers start a fresh call
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key, flight: _Flight):
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
@@ -0,0 +1,265 @@
+import asyncio
+import concurrent.futures
+import threading
+import uuid
+from app.config import get_settings
+from app.services.cache import LRUCache
+
+settings = get_settings()
+
+
+CHAT_SYSTEM_INSTRUCTION = """You are a helpful AI assistant specializing in video generation with Google Veo 3.1.
+
+Your role:
+- Help users brainstorm creative video ideas
+- Refine and improve video prompts for better results
+- Answer questions about Veo 3.1 capabilities
+- Suggest improvements to prompts (camera angles, lighting, mood, audio, etc.)
+- Be concise but helpful
+- Focus on actionable, specific advice
+
+Veo 3.1 capabilities:
+- Generates 8-second videos at 720p or 1080p
+- Supports 16:9 and 9:16 aspect ratios
+- Can work with or without reference images
+- Generates native audio with the video
+- Best results with detailed, cinematic descriptions
+
+When users ask for prompt suggestions, provide them in a clear, formatted way that they can easily copy."""
+
+
+def to_gemini_history(conversation_history: list) -> list:
+    """
+    Convert [{"role", "content"}] messages into Gemini chat history entries
+    """
+    return [
+        {"role": msg["role"], "parts": [msg["content"]]}
+        for msg in conversation_history or []
+    ]
+
+
+_STREAM_DONE = object()
+
+
+async def stream_chat_reply(chat, message: str, max_buffered: int = 32):
+    """
+    Forward a Gemini streaming reply to async code token by token
+
+    The synchronous SDK stream is consumed on a worker thread that hands
+    each chunk to a bounded asyncio.Queue, so the event loop never blocks
+    and a slow client applies backpressure (the producer waits while the
+    queue is full). When the consumer goes away (client disconnect
+    cancels the generator) the producer stops pulling from upstream.
+
+    Args:
+        chat: Gemini ChatSession
+        message: User message to send
+        max_buffered: Chunks buffered before the producer blocks
+
+    Yields:
+        Text chunks as soon as upstream produces them
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def hand_off(item) -> bool:
+        # Blocking put from the worker thread; gives up once the consumer is gone
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        try:
+            for chunk in chat.send_message(message, stream=True):
+                if stop.is_set():
+                    return
+                text = chunk.text
+                if text and not hand_off(text):
+                    return
+        except Exception as e:
+            if not stop.is_set():
+                hand_off(e)
+            return
+        if not stop.is_set():
+            hand_off(_STREAM_DONE)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Never leave the producer blocked on a full queue
+        while not queue.empty():
+            queue.get_nowait()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token) used for history budgets
+    """
+    return len(text) // 4 + 1
+
+
+class ChatSession:
+    """
+    Server-side conversation state for one chat session
+
+    History is kept in Gemini chat format so it is handed to start_chat
+    as-is on every turn. Turns are serialized per session by `lock`.
+    """
+
+    SUMMARY_PREFIX = "Summary of the earlier conversation (older turns were compacted):"
+    SUMMARY_ACK = "Understood."
+    TRUNCATED_MARK = " [truncated]"
+    EXCERPT_CHARS = 200
+
+    def __init__(self, session_id: str, history: list = None):
+        self.id = session_id
+        self.lock = asyncio.Lock()
+        self.history = []  # [{"role": "user" | "model", "parts": [text]}]
+        self.tokens = 0
+        self.turns = 0
+        self.compacted_turns = 0
+        self._excerpts = []  # One line per compacted turn, oldest first
+        for entry in to_gemini_history(history):
+            self._append(entry["role"], entry["parts"][0])
+
+    def _append(self, role: str, text: str):
+        self.history.append({"role": "model" if role == "assistant" else role, "parts": [text]})
+        self.tokens += estimate_tokens(text)
+
+    def add_turn(self, message: str, reply: str, token_budget: int):
+        """
+        Record a completed exchange and compact old turns over the budget
+        """
+        self._append("user", message)
+        self._append("model", reply)
+        self.turns += 1
+        self.compact(token_budget)
+
+    def compact(self, token_budget: int):
+        """
+        Fold the oldest turns into a short summary until history fits the budget
+
+        The newest exchange is always kept verbatim, or truncated when it
+        alone is over the budget. The summary itself is limited to a
+        quarter of the budget; the oldest excerpts go first. tokens is
+        recomputed from the summary plus the turns that are kept.
+        """
+        if self.tokens <= token_budget:
+            return
+
+        turns = self.history[2:] if self._excerpts else self.history
+        kept_tokens = sum(estimate_tokens(entry["parts"][0]) for entry in turns)
+        summary_budget = token_budget // 4
+        while len(turns) > 2 and kept_tokens + self._summary_tokens() > token_budget:
+            user, model = turns[0], turns[1]
+            kept_tokens -= estimate_tokens(user["parts"][0]) + estimate_tokens(model["parts"][0])
+            turns = turns[2:]
+            self._excerpts.append(
+                f"- User: {user['parts'][0][:self.EXCERPT_CHARS]} | "
+                f"Assistant: {model['parts'][0][:self.EXCERPT_CHARS]}"
+            )
+            self.compacted_turns += 1
+            while len(self._excerpts) > 1 and estimate_tokens("\n".join(self._excerpts)) > summary_budget:
+                self._excerpts.pop(0)
+
+        if kept_tokens + self._summary_tokens() > token_budget:
+            turns = self._truncate(turns, token_budget - self._summary_tokens())
+        self.history = self._summary_entries() + turns
+        self.tokens = sum(estimate_tokens(entry["parts"][0]) for entry in self.history)
+
+    def _summary_entries(self) -> list:
+        if not self._excerpts:
+            return []
+        return [
+            {"role": "user", "parts": ["\n".join([self.SUMMARY_PREFIX] + self._excerpts)]},
+            {"role": "model", "parts": [self.SUMMARY_ACK]},
+        ]
+
+    def _summary_tokens(self) -> int:
+        return sum(estimate_tokens(entry["parts"][0]) for entry in self._summary_entries())
+
+    def _truncate(self, turns: list, allowed: int) -> list:
+        """
+        Cut the kept entries' text so together they fit in allowed tokens
+
+        Shorter entries are sized first, so a short message keeps its text
+        and the long reply gets whatever it leaves.
+        """
+        truncated = list(turns)
+        remaining = allowed
+        by_size = sorted(range(len(turns)), key=lambda index: estimate_tokens(turns[index]["parts"][0]))
+        for position, index in enumerate(by_size):
+            share = remaining // (len(turns) - position)
+            text = turns[index]["parts"][0]
+            if estimate_tokens(text) > share:
+                text = text[:max(0, share * 4 - 1 - len(self.TRUNCATED_MARK))] + self.TRUNCATED_MARK
+                truncated[index] = {**turns[index], "parts": [text]}
+            remaining -= estimate_tokens(text)
+        return truncated
+
+
+class ChatSessionStore:
+    """
+    Bounded in-memory store of chat sessions with LRU and idle-TTL eviction
+
+    Clients send only a session_id and the new message; the server keeps
+    the history. Every access refreshes the session's idle timeout.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float, token_budget: int):
+        self.token_budget = token_budget
+        self._sessions = LRUCache(max_sessions, ttl=ttl)
+        self.created = 0
+
+    def create(self, history: list = None) -> ChatSession:
+        """
+        Start a session, optionally seeded with [{"role", "content"}] history
+        """
+        session = ChatSession(uuid.uuid4().hex, history)
+        session.compact(self.token_budget)
+        self._sessions.put(session.id, session)
+        self.created += 1
+        return session
+
+    def get(self, session_id: str):
+        """
+        Return the live session (refreshing its idle timeout) or None
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.put(session_id, session)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id) is not None
+
+    def record_turn(self, session: ChatSession, message: str, reply: str):
+        session.add_turn(message, reply, self.token_budget)
+
+    def stats(self) -> dict:
+        stats = self._sessions.stats()
+        stats["created"] = self.created
+        stats["token_budget"] = self.token_budget
+        return stats
+
+
+chat_sessions = ChatSessionStore(
+    max_sessions=settings.chat_session_max,
+    ttl=settings.chat_session_ttl,
+    token_budget=settings.chat_session_token_budget,
+)
@@ -0,0 +1,255 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from app.config import get_settings
+from app.services.storage_layout import layout_for
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+POSTER_MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+
+class FrameExtractor:
+    """
+    Interface for producing gallery derivatives from a stored MP4
+
+    Implementations run inside the derivative process pool, so they must
+    be importable by module path and construct without arguments beyond
+    the options dict. Each method writes exactly the destination file.
+    """
+
+    name = None
+
+    def __init__(self, options: dict):
+        self.options = options
+
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def poster(self, source: Path, destination: Path):
+        raise NotImplementedError
+
+    def preview(self, source: Path, destination: Path):
+        raise NotImplementedError
+
+
+class FFmpegExtractor(FrameExtractor):
+    """
+    Posters and preview clips from a local ffmpeg binary
+    """
+
+    name = "ffmpeg"
+
+    def available(self) -> bool:
+        return shutil.which(self.options["ffmpeg_path"]) is not None
+
+    def poster(self, source: Path, destination: Path):
+        quality = ["-quality", "80"] if destination.suffix == ".webp" else ["-q:v", "4"]
+        scale = ["-vf", f"scale={self.options['poster_width']}:-2"]
+        # Seek a little way in to skip black lead-in frames; clips shorter than that use frame 0
+        for offset in (self.options["poster_offset"], 0):
+            self._run(["-ss", str(offset), "-i", str(source), "-frames:v", "1", *scale, *quality, str(destination)])
+            if destination.exists() and destination.stat().st_size:
+                return
+        raise RuntimeError(f"ffmpeg produced no poster frame for {source.name}")
+
+    def preview(self, source: Path, destination: Path):
+        bitrate = self.options["preview_bitrate"]
+        self._run([
+            "-i", str(source),
+            "-t", str(self.options["preview_seconds"]),
+            "-an",
+            "-vf", f"scale={self.options['preview_width']}:-2",
+            "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+            "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate,
+            "-movflags", "+faststart",
+            str(destination)
+        ])
+
+    def _run(self, arguments: list):
+        subprocess.run(
+            [self.options["ffmpeg_path"], "-v", "error", "-y", *arguments],
+            check=True,
+            capture_output=True,
+            timeout=self.options["timeout"]
+        )
+
+
+EXTRACTORS = {FFmpegExtractor.name: FFmpegExtractor}
+
+
+def load_extractor(spec: str, options: dict) -> FrameExtractor:
+    """
+    Build an extractor from a registered name or a "package.module:Class" path
+    """
+    if spec in EXTRACTORS:
+        return EXTRACTORS[spec](options)
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)(options)
+
+
+def render_derivatives(spec: str, options: dict, source: str, directory: str, kinds: tuple) -> dict:
+    """
+    Produce derivatives for one video (runs in a pool process)
+
+    Every output is written to a temporary name and renamed into place,
+    so readers never see a half-written poster or clip.
+
+    Returns:
+        kind -> file name for each derivative produced
+    """
+    extractor = load_extractor(spec, options)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    produced = {}
+    for kind in kinds:
+        final = directory / derivative_name(kind, options["poster_format"])
+        temporary = final.with_name(f".tmp-{os.getpid()}-{final.name}")
+        try:
+            getattr(extractor, kind)(Path(source), temporary)
+            os.replace(temporary, final)
+        finally:
+            temporary.unlink(missing_ok=True)
+        produced[kind] = final.name
+    return produced
+
+
+def derivative_name(kind: str, poster_format: str) -> str:
+    return f"poster.{poster_format}" if kind == "poster" else "preview.mp4"
+
+
+class DerivativeService:
+    """
+    Post-download stage producing gallery posters and preview clips
+
+    Work runs in a process pool (spawned, so no locks are inherited from
+    the server's threads) behind a pluggable FrameExtractor. Outputs live
+    in videos/.derivatives/<video_id>/ (sharded like the videos), which
+    the catalog never scans.
+    Requests for the same video while one is in flight share it.
+    """
+
+    kinds = ("poster", "preview")
+
+    def __init__(self, storage_path: Path):
+        self.root = Path(storage_path) / ".derivatives"
+        self.layout = layout_for(self.root, directories=True)
+        self.options = {
+            "ffmpeg_path": settings.ffmpeg_path,
+            "poster_format": settings.poster_format,
+            "poster_width": settings.poster_width,
+            "poster_offset": settings.poster_offset,
+            "preview_seconds": settings.preview_seconds,
+            "preview_width": settings.preview_width,
+            "preview_bitrate": settings.preview_bitrate,
+            "timeout": settings.derivative_timeout,
+        }
+        self.extractor = load_extractor(settings.derivative_extractor, self.options)
+        self.available = self.extractor.available()
+        self._pool = None
+        self._pending = {}  # video_id -> asyncio.Task
+        self._failures = set()  # Not retried on demand until restart (backfill still retries)
+        self.generated = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.derivatives_enabled and self.available
+
+    def directory(self, video_id: str) -> Path:
+        return self.layout.locate(video_id)
+
+    def path(self, video_id: str, kind: str) -> Path:
+        return self.directory(video_id) / derivative_name(kind, settings.poster_format)
+
+    def media_type(self, kind: str) -> str:
+        return POSTER_MEDIA_TYPES.get(settings.poster_format, "image/webp") if kind == "poster" else "video/mp4"
+
+    def missing(self, video_id: str) -> tuple:
+        return tuple(kind for kind in self.kinds if not self.path(video_id, kind).exists())
+
+    def schedule(self, video_id: str, source: Path):
+        """
+        Generate a video's missing derivatives in the background (event loop only)
+
+        Returns:
+            The in-flight task, or None if there is nothing to do
+        """
+        if not self.enabled or video_id in self._failures:
+            return None
+        task = self._pending.get(video_id)
+        if task is not None:
+            return task
+        kinds = self.missing(video_id)
+        if not kinds:
+            return None
+        task = asyncio.create_task(self._generate(video_id, source, kinds))
+        self._pending[video_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(video_id, None))
+        return task
+
+    async def _generate(self, video_id: str, source: Path, kinds: tuple):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor(),
+                render_derivatives,
+                settings.derivative_extractor, self.options, str(source), str(self.directory(video_id)), kinds
+            )
+            self.generated += 1
+        except Exception as e:
+            self.failed += 1
+            self._failures.add(video_id)
+            logger.warning("Derivatives for %s failed: %s: %s", video_id, type(e).__name__, e)
+
+    def submit(self, video_id: str, source: Path, force: bool = False):
+        """
+        Queue generation outside the event loop (maintenance commands)
+
+        Returns:
+            concurrent.futures.Future of render_derivatives, or None if
+            nothing is missing
+        """
+        kinds = self.kinds if force else self.missing(video_id)
+        if not kinds:
+            return None
+        return self._executor().submit(
+            render_derivatives,
+            settings.derivative_extractor, self.options, str(source), str(self.directory(video_id)), kinds
+        )
+
+    def remove(self, video_id: str):
+        shutil.rmtree(self.directory(video_id), ignore_errors=True)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "extractor": settings.derivative_extractor,
+            "in_flight": len(self._pending),
+            "generated": self.generated,
+            "failed": self.failed
+        }
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.derivative_workers),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+
+# Global derivative pipeline instance
+derivative_service = DerivativeService(Path(settings.video_storage_path))
@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict
+
+
+def is_terminal(event: dict) -> bool:
+    """
+    True for the last event an operation will ever produce
+    """
+    return bool(event["done"]) or event["event"] == "not_found"
+
+
+class StatusSubscription:
+    """
+    One watcher's inbox of status events (SSE stream or WebSocket)
+
+    The inbox holds at most one undelivered event per operation: each
+    event carries the full current status, so a newer event replaces a
+    pending one for the same operation. When a slow watcher of many
+    operations falls behind, the oldest pending progress event is dropped
+    to stay within max_pending. Terminal events (done, failed, not found)
+    are never dropped or replaced by progress, since a watcher waiting on
+    them would otherwise wait forever.
+    """
+
+    def __init__(self, max_pending: int = 32):
+        self.max_pending = max_pending
+        self._pending = OrderedDict()  # operation_id -> latest undelivered event
+        self._ready = asyncio.Event()
+        self.operation_ids = set()
+        self.dropped = 0
+
+    def deliver(self, event: dict):
+        operation_id = event["operation_id"]
+        previous = self._pending.get(operation_id)
+        if previous is not None:
+            # Collapse onto the pending event, keeping its place in line
+            if is_terminal(previous) and not is_terminal(event):
+                return
+            self._pending[operation_id] = event
+            self.dropped += 1
+            return
+
+        if len(self._pending) >= self.max_pending:
+            oldest_progress = next((key for key, queued in self._pending.items() if not is_terminal(queued)), None)
+            if oldest_progress is not None:
+                del self._pending[oldest_progress]
+                self.dropped += 1
+            # Otherwise every pending event is terminal: grow rather than lose one
+        self._pending[operation_id] = event
+        self._ready.set()
+
+    async def next(self, timeout: float = None):
+        """
+        Wait for the next event
+
+        Returns:
+            Event dict, or None if nothing arrived within timeout
+        """
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        _, event = self._pending.popitem(last=False)
+        return event
+
+
+class StatusEventBus:
+    """
+    In-process fan-out of operation status events
+
+    VideoGenerationService publishes one event per state change (the
+    background poller does the only upstream refresh); every watcher of
+    that operation receives it, so watchers cost no upstream calls.
+    Publishing and subscribing happen on the event loop only.
+    """
+
+    def __init__(self):
+        self._watchers = {}  # operation_id -> set of StatusSubscription
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, operation_id: str, subscription: StatusSubscription = None) -> StatusSubscription:
+        """
+        Route an operation's events to a subscription (created if not given)
+        """
+        subscription = subscription or StatusSubscription()
+        self._watchers.setdefault(operation_id, set()).add(subscription)
+        subscription.operation_ids.add(operation_id)
+        return subscription
+
+    def unsubscribe(self, operation_id: str, subscription: StatusSubscription):
+        watchers = self._watchers.get(operation_id)
+        if watchers is not None:
+            watchers.discard(subscription)
+            if not watchers:
+                del self._watchers[operation_id]
+        subscription.operation_ids.discard(operation_id)
+
+    def close(self, subscription: StatusSubscription):
+        """
+        Drop every subscription of a watcher that went away
+        """
+        for operation_id in list(subscription.operation_ids):
+            self.unsubscribe(operation_id, subscription)
+
+    def publish(self, event: dict) -> int:
+        """
+        Deliver an event to every watcher of event["operation_id"]
+
+        Returns:
+            Number of watchers that received it
+        """
+        self.published += 1
+        watchers = self._watchers.get(event["operation_id"], ())
+        for subscription in watchers:
+            subscription.deliver(event)
+        self.delivered += len(watchers)
+        return len(watchers)
+
+    def stats(self) -> dict:
+        subscriptions = {s for watchers in self._watchers.values() for s in watchers}
+        return {
+            "watched_operations": len(self._watchers),
+            "watchers": len(subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(s.dropped for s in subscriptions)
+        }
+
+
+# Global bus instance
+status_events = StatusEventBus()
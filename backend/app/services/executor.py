@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class _Lane:
+    """One bounded thread pool plus the counters needed to report its load"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"genai-{name}")
+        self.lock = threading.Lock()
+        self.queued = 0  # Submitted but waiting for a free worker
+        self.active = 0  # Currently running on a worker
+        self.completed = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "saturation": round(self.active / self.max_workers, 3),
+            }
+
+
+class BlockingCallExecutor:
+    """
+    Runs synchronous google-genai SDK calls off the event loop
+
+    Each lane (submit, poll, download) has its own bounded thread pool, so a
+    burst of slow downloads can never starve status refreshes or new
+    submissions, and none of them can stall the event loop.
+    """
+
+    def __init__(self, limits: dict):
+        self._lanes = {name: _Lane(name, max_workers) for name, max_workers in limits.items()}
+
+    async def run(self, lane: str, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the given lane's thread pool and await the result
+
+        Args:
+            lane: Lane name ("submit", "poll" or "download")
+            fn: Blocking callable
+
+        Returns:
+            Whatever fn returns; exceptions raised by fn propagate to the caller
+        """
+        pool_lane = self._lanes[lane]
+
+        def call():
+            with pool_lane.lock:
+                pool_lane.queued -= 1
+                pool_lane.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with pool_lane.lock:
+                    pool_lane.active -= 1
+                    pool_lane.completed += 1
+
+        def uncount_if_cancelled(done):
+            # Cancelled before it started (caller cancelled, or shutdown with
+            # cancel_futures=True), so call() never ran to take it off the queue
+            if done.cancelled():
+                with pool_lane.lock:
+                    pool_lane.queued -= 1
+
+        with pool_lane.lock:
+            pool_lane.queued += 1
+        try:
+            future = pool_lane.pool.submit(call)
+        except RuntimeError:
+            # Already shut down
+            with pool_lane.lock:
+                pool_lane.queued -= 1
+            raise
+        future.add_done_callback(uncount_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        """
+        Queue depth and saturation (active / max_workers) for every lane
+        """
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+    def shutdown(self):
+        """
+        Stop accepting work; running calls are allowed to finish and queued
+        ones are cancelled (and leave the queued count)
+        """
+        for lane in self._lanes.values():
+            lane.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+blocking_executor = BlockingCallExecutor({
+    "submit": settings.submit_workers,
+    "poll": settings.poll_workers,
+    "download": settings.download_workers,
+})
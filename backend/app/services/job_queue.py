@@ -0,0 +1,172 @@
+import bisect
+import heapq
+import itertools
+import re
+import time
+
+
+def is_quota_error(error: Exception) -> bool:
+    """
+    True for upstream rate-limit / quota errors (HTTP 429, RESOURCE_EXHAUSTED)
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return True
+    text = f"{getattr(error, 'status', '')} {error}"
+    return "RESOURCE_EXHAUSTED" in text or re.search(r"\b429\b", text) is not None
+
+
+class GenerationQueue:
+    """
+    Admission queue for video generation jobs
+
+    Jobs are ordered by priority (higher first), then FIFO. The queue is
+    kept as a bisect-sorted list of (-priority, seq, operation_id) keys, so
+    a job's position is a binary search. When upstream reports quota
+    exhaustion the whole queue is throttled with exponential backoff, since
+    the quota is project-wide; the first successful submit resets it.
+    """
+
+    def __init__(self, backoff_initial: float, backoff_max: float, backoff_factor: float = 2.0):
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.backoff_factor = backoff_factor
+        self._order = []  # Sorted (-priority, seq, operation_id)
+        self._keys = {}  # operation_id -> key
+        self._seq = itertools.count()
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.throttled_count = 0
+        self.avg_run_seconds = None  # Moving average of upstream run time
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, operation_id):
+        return operation_id in self._keys
+
+    def push(self, operation_id: str, priority: int = 0, seq: int = None):
+        """
+        Enqueue a job; pass seq back in to keep its original FIFO slot on retry
+        """
+        if operation_id in self._keys:
+            return
+        key = (-priority, next(self._seq) if seq is None else seq, operation_id)
+        self._keys[operation_id] = key
+        bisect.insort(self._order, key)
+
+    def pop(self):
+        """
+        Remove and return (operation_id, seq) of the next job, or None
+        """
+        if not self._order:
+            return None
+        _, seq, operation_id = self._order.pop(0)
+        del self._keys[operation_id]
+        return operation_id, seq
+
+    def remove(self, operation_id: str) -> bool:
+        key = self._keys.pop(operation_id, None)
+        if key is None:
+            return False
+        del self._order[bisect.bisect_left(self._order, key)]
+        return True
+
+    def position(self, operation_id: str):
+        """
+        1-based position in the queue, or None if not queued
+        """
+        key = self._keys.get(operation_id)
+        if key is None:
+            return None
+        return bisect.bisect_left(self._order, key) + 1
+
+    def throttled(self, now: float = None) -> bool:
+        return (now or time.time()) < self.blocked_until
+
+    def throttle(self) -> float:
+        """
+        Back off after a quota error
+
+        Returns:
+            Seconds until the queue dispatches again
+        """
+        self.backoff = min(
+            self.backoff * self.backoff_factor if self.backoff else self.backoff_initial,
+            self.backoff_max
+        )
+        self.blocked_until = time.time() + self.backoff
+        self.throttled_count += 1
+        return self.backoff
+
+    def note_success(self):
+        self.backoff = 0.0
+
+    def record_run_time(self, seconds: float):
+        """
+        Fold a finished operation's upstream run time into the ETA estimate
+        """
+        if self.avg_run_seconds is None:
+            self.avg_run_seconds = seconds
+        else:
+            self.avg_run_seconds = 0.8 * self.avg_run_seconds + 0.2 * seconds
+
+    def estimate_start(self, operation_id: str, running_since: list, slots: int, default_run_seconds: float):
+        """
+        Estimated epoch time at which a queued job will be submitted
+
+        Simulates the slots: running operations free theirs after the
+        average run time, then queued jobs ahead of this one take slots in
+        order. Quota backoff delays everything until it expires.
+
+        Args:
+            operation_id: Queued job
+            running_since: Submit times of operations currently running upstream
+            slots: Maximum concurrent upstream operations
+            default_run_seconds: Run time assumed before any operation finished
+        """
+        position = self.position(operation_id)
+        if position is None:
+            return None
+        *_, start = self._simulate_starts(position, running_since, slots, default_run_seconds)
+        return start
+
+    def snapshot(self, running_since: list, slots: int, default_run_seconds: float) -> dict:
+        """
+        Position and estimated start of every queued job (one simulation pass)
+
+        Returns:
+            operation_id -> [position, estimated_start_at]
+        """
+        starts = self._simulate_starts(len(self._order), running_since, slots, default_run_seconds)
+        return {
+            operation_id: [index + 1, start]
+            for index, ((_, _, operation_id), start) in enumerate(zip(self._order, starts))
+        }
+
+    def _simulate_starts(self, count: int, running_since: list, slots: int, default_run_seconds: float):
+        """
+        Start times of the first `count` queued jobs, in queue order
+        """
+        run_seconds = self.avg_run_seconds or default_run_seconds
+        start = max(time.time(), self.blocked_until)
+
+        slots = max(1, slots)
+        free_at = [max(start, since + run_seconds) for since in sorted(running_since)[:slots]]
+        free_at += [start] * (slots - len(free_at))
+        heapq.heapify(free_at)
+        starts = []
+        for _ in range(count):
+            slot_free = heapq.heappop(free_at)
+            starts.append(slot_free)
+            heapq.heappush(free_at, slot_free + run_seconds)
+        return starts
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._order),
+            "throttled": self.throttled(),
+            "backoff_seconds": self.backoff,
+            "throttle_events": self.throttled_count,
+            "avg_run_seconds": self.avg_run_seconds
+        }
@@ -0,0 +1,262 @@
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.services.metrics import video_bytes_served
+
+
+# Content at a versioned URL (or a write-once file) never changes, so let browsers keep it
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Files that may be rewritten in place (remuxed videos) are stored but revalidated on use
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+MAX_RANGES = 16  # More ranges than this are answered with the full file
+
+
+def parse_range_header(value: str, size: int):
+    """
+    Parse a bytes Range header into a sorted list of merged (start, end) pairs
+
+    End offsets are inclusive, as in Content-Range.
+
+    Returns:
+        List of ranges, [] if no range is satisfiable, or None if the header
+        is malformed (in which case it must be ignored)
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        start_text, dash, end_text = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if start_text == "":
+                # Suffix range: the last N bytes
+                length = int(end_text)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(start_text)
+                end = int(end_text) if end_text else size - 1
+                if end < start and end_text:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    # Merge overlapping or adjacent ranges
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def file_version(stat_result: os.stat_result) -> str:
+    """
+    Version of a file's content: changes whenever it is rewritten
+
+    Used as the strong ETag and as the ?v= query parameter of versioned URLs.
+    """
+    return f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+
+
+class VideoFileResponse(Response):
+    """
+    File response for media with full HTTP caching semantics
+
+    - Strong ETag and Last-Modified; long-lived immutable Cache-Control for
+      write-once files, and for files that can be rewritten in place only
+      when the URL names the current version (otherwise caches revalidate,
+      so they never keep or splice ranges of bytes that were replaced)
+    - If-None-Match / If-Modified-Since answered with 304
+    - Single and multi-range requests (206, multipart/byteranges), If-Range
+      and 416 for unsatisfiable ranges
+    - Zero-copy body via the ASGI http.response.zerocopysend extension when
+      the server advertises it, otherwise chunked reads in a worker thread
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: Path,
+        request_headers,
+        media_type: str = "video/mp4",
+        filename: str = None,
+        kind: str = "video",
+        versioned: bool = False,
+        version: str = None
+    ):
+        self.path = Path(path)
+        self.bytes_served = video_bytes_served.labels(kind)
+        self.request_headers = request_headers
+        self.media_type = media_type
+        self.background = None
+        self.status_code = 200
+        self.ranges = None
+
+        stat_result = os.stat(self.path)
+        self.size = stat_result.st_size
+        self.version = file_version(stat_result)
+        self.etag = f'"{self.version}"'
+        self.last_modified = int(stat_result.st_mtime)
+        # versioned: the file can be rewritten in place, so only the URL of
+        # the current version (?v=) may be cached as immutable
+        immutable = not versioned or version == self.version
+
+        headers = {
+            "accept-ranges": "bytes",
+            "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "etag": self.etag,
+            "last-modified": formatdate(self.last_modified, usegmt=True),
+        }
+        if filename:
+            if quote(filename) != filename:
+                headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+            else:
+                headers["content-disposition"] = f'attachment; filename="{filename}"'
+        self.init_headers(headers)
+        self._evaluate_request()
+
+    def _evaluate_request(self):
+        """
+        Decide between 304, 416, 206 and 200 from the request headers
+        """
+        if self._not_modified():
+            self.status_code = 304
+            return
+
+        range_header = self.request_headers.get("range")
+        if not range_header or not self._if_range_matches():
+            self._set_full_body()
+            return
+
+        ranges = parse_range_header(range_header, self.size)
+        if ranges is None or len(ranges) > MAX_RANGES:
+            self._set_full_body()
+            return
+        if not ranges:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{self.size}"
+            self.headers["content-length"] = "0"
+            return
+
+        self.status_code = 206
+        self.ranges = ranges
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers["content-type"] = self.media_type
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            self.boundary = uuid.uuid4().hex
+            self.headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+            self.headers["content-length"] = str(
+                sum(len(self._part_header(start, end)) + end - start + 1 for start, end in ranges)
+                + len(self._closing_boundary())
+            )
+
+    def _set_full_body(self):
+        self.status_code = 200
+        self.headers["content-type"] = self.media_type
+        self.headers["content-length"] = str(self.size)
+
+    def _not_modified(self) -> bool:
+        if_none_match = self.request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison, as RFC 9110 requires for If-None-Match
+            return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+        if_modified_since = self.request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _if_range_matches(self) -> bool:
+        if_range = self.request_headers.get("if-range")
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == self.etag
+        try:
+            return self.last_modified == int(parsedate_to_datetime(if_range).timestamp())
+        except (TypeError, ValueError):
+            return False
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"\r\n--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.size}\r\n\r\n"
+        ).encode()
+
+    def _closing_boundary(self) -> bytes:
+        return f"\r\n--{self.boundary}--\r\n".encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope["method"].upper() == "HEAD" or self.status_code in (304, 416) or self.size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        segments = self.ranges or [(0, self.size - 1)]
+        multipart = len(segments) > 1
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for start, end in segments:
+                if multipart:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                more_after = multipart or (start, end) != segments[-1]
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": more_after,
+                    })
+                    self.bytes_served.inc(end - start + 1)
+                else:
+                    await self._send_chunks(file, start, end, more_after, send)
+            if multipart:
+                await send({"type": "http.response.body", "body": self._closing_boundary(), "more_body": False})
+
+    async def _send_chunks(self, file, start: int, end: int, more_after: bool, send: Send):
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({
+                "type": "http.response.body",
+                "body": chunk,
+                "more_body": remaining > 0 or more_after,
+            })
+            self.bytes_served.inc(len(chunk))
+        if remaining > 0 and not more_after:
+            # File shrank underneath us; close the body cleanly
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from app.config import get_settings
+
+settings = get_settings()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    prompt TEXT,
+    negative_prompt TEXT,
+    resolution TEXT,
+    duration INTEGER,
+    aspect_ratio TEXT,
+    has_image INTEGER NOT NULL DEFAULT 0,
+    is_public INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos (created_at);
+CREATE INDEX IF NOT EXISTS idx_videos_public ON videos (is_public, created_at);
+CREATE INDEX IF NOT EXISTS idx_videos_resolution ON videos (resolution);
+CREATE INDEX IF NOT EXISTS idx_videos_aspect_ratio ON videos (aspect_ratio);
+
+-- Last time each video was watched, kept apart from the metadata row so a
+-- put() (INSERT OR REPLACE) never resets it
+CREATE TABLE IF NOT EXISTS video_access (
+    video_id TEXT PRIMARY KEY,
+    last_accessed_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Metadata keys stored in their own columns; anything else goes into `extra`
+COLUMNS = (
+    "video_id",
+    "filename",
+    "prompt",
+    "negative_prompt",
+    "resolution",
+    "duration",
+    "aspect_ratio",
+    "has_image",
+    "is_public",
+    "created_at",
+)
+
+
+class VideoMetadataStore:
+    """
+    SQLite catalog of video metadata (replaces the per-video JSON sidecars)
+
+    Every read and update is an indexed single-row statement, and
+    visibility changes are a single UPDATE, so concurrent toggles cannot
+    clobber each other the way read-modify-write of a sidecar could.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        """
+        Open the database and create the schema if needed
+        """
+        if self._conn is not None:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def put(self, metadata: dict):
+        """
+        Insert or replace one video's metadata
+
+        Args:
+            metadata: Dict with at least video_id, filename and created_at
+        """
+        row = self._to_row(metadata)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO videos ({', '.join(COLUMNS)}, extra) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?)",
+                row
+            )
+
+    def get(self, video_id: str):
+        """
+        Return one video's metadata as a dict, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)}, extra FROM videos WHERE video_id = ?",
+                (video_id,)
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def all(self) -> list:
+        """
+        Return metadata for every video, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)}, extra FROM videos ORDER BY created_at DESC"
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def set_public(self, video_id: str, is_public: bool) -> bool:
+        """
+        Update a video's visibility
+
+        Returns:
+            False if the video has no metadata row
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE videos SET is_public = ? WHERE video_id = ?",
+                (int(is_public), video_id)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, video_id: str) -> bool:
+        """
+        Remove one video's metadata
+
+        Returns:
+            False if there was nothing to remove
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM video_access WHERE video_id = ?", (video_id,))
+        return cursor.rowcount > 0
+
+    def record_access(self, accessed: dict) -> int:
+        """
+        Store last-access times in one transaction
+
+        Times only move forward, so workers flushing out of order cannot
+        roll a video's last access back.
+
+        Args:
+            accessed: video_id -> access timestamp
+
+        Returns:
+            Number of videos updated
+        """
+        if not accessed:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO video_access (video_id, last_accessed_at) VALUES (?, ?) "
+                    "ON CONFLICT (video_id) DO UPDATE "
+                    "SET last_accessed_at = MAX(last_accessed_at, excluded.last_accessed_at)",
+                    list(accessed.items())
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(accessed)
+
+    def last_access(self) -> dict:
+        """
+        Return video_id -> last recorded access time
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT video_id, last_accessed_at FROM video_access").fetchall())
+
+    def import_sidecars(self, directory: Path, force: bool = False) -> int:
+        """
+        Import legacy {video_id}.json sidecars into the store
+
+        Runs once per database unless force is set; rows that already exist
+        are left untouched, so re-running is harmless.
+
+        Args:
+            directory: Directory containing the sidecars
+            force: Import even if a previous import was recorded
+
+        Returns:
+            Number of sidecars imported
+        """
+        if not force and self._info("sidecars_imported"):
+            return 0
+
+        rows = []
+        for metadata_path in Path(directory).glob("*.json"):
+            metadata = self.read_sidecar(metadata_path)
+            if metadata is not None:
+                rows.append(self._to_row(metadata))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO videos ({', '.join(COLUMNS)}, extra) "
+                    f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?)",
+                    rows
+                )
+                imported = self._conn.total_changes - before
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_info (key, value) VALUES ('sidecars_imported', '1')"
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return imported
+
+    def export_sidecars(self, directory: Path) -> int:
+        """
+        Write every row back out as a {video_id}.json sidecar
+
+        Each file is written to a temp name and renamed into place.
+
+        Returns:
+            Number of sidecars written
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        exported = 0
+        for metadata in self.all():
+            metadata_path = directory / f"{metadata['video_id']}.json"
+            tmp_path = metadata_path.with_suffix(".json.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(tmp_path, metadata_path)
+            exported += 1
+        return exported
+
+    @staticmethod
+    def read_sidecar(metadata_path: Path):
+        """
+        Parse one legacy sidecar into a metadata dict, or None if unusable
+        """
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(metadata, dict):
+            return None
+
+        video_id = metadata.get("video_id") or metadata_path.stem
+        if not metadata.get("created_at"):
+            metadata["created_at"] = metadata_path.stat().st_mtime
+        return {
+            **metadata,
+            "video_id": video_id,
+            "filename": metadata.get("filename") or f"{video_id}.mp4",
+        }
+
+    def _info(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM store_info WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _to_row(self, metadata: dict) -> tuple:
+        extra = {key: value for key, value in metadata.items() if key not in COLUMNS}
+        return (
+            metadata["video_id"],
+            metadata.get("filename") or f"{metadata['video_id']}.mp4",
+            metadata.get("prompt"),
+            metadata.get("negative_prompt"),
+            metadata.get("resolution"),
+            metadata.get("duration"),
+            metadata.get("aspect_ratio"),
+            int(bool(metadata.get("has_image", False))),
+            int(bool(metadata.get("is_public", False))),
+            metadata["created_at"],
+            json.dumps(extra),
+        )
+
+    def _from_row(self, row: tuple) -> dict:
+        metadata = dict(zip(COLUMNS, row[:-1]))
+        metadata["has_image"] = bool(metadata["has_image"])
+        metadata["is_public"] = bool(metadata["is_public"])
+        metadata.update(json.loads(row[-1]))
+        return metadata
+
+
+# Singleton instance
+metadata_store = VideoMetadataStore(settings.metadata_db_path)
@@ -0,0 +1,290 @@
+import bisect
+import math
+import threading
+from threading import get_ident
+from app.config import get_settings
+
+settings = get_settings()
+
+# Latency buckets (seconds) covering fast API calls through multi-minute Veo runs
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = tuple(float(1 << shift) for shift in range(16, 31, 2))  # 64 KiB .. 1 GiB
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    """
+    Lock-free counter: each thread increments its own shard
+
+    Only the owning thread ever writes a shard, so updates are never lost
+    without taking a lock; a scrape sums the shards.
+    """
+
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = {}  # thread id -> [value]
+
+    def inc(self, amount: float = 1):
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards.setdefault(get_ident(), [0])
+        shard[0] += amount
+
+    @property
+    def value(self):
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+
+class _HistogramChild:
+    """
+    Lock-free histogram: per-thread shards of bucket counts plus sum
+    """
+
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds: tuple):
+        self._bounds = bounds
+        self._shards = {}  # thread id -> per-bucket counts (last is +Inf), then sum
+
+    def observe(self, value: float):
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards.setdefault(get_ident(), [0] * (len(self._bounds) + 1) + [0.0])
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """
+        (per-bucket counts, sum) summed over every thread's shard
+        """
+        totals = [0] * (len(self._bounds) + 2)
+        for shard in list(self._shards.values()):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals[:-1], totals[-1]
+
+
+class _NullChild:
+    """
+    Every child of a metric in a disabled registry: recording is a no-op
+    """
+
+    __slots__ = ()
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+
+_NULL_CHILD = _NullChild()
+
+
+class _Metric:
+    """
+    Base for labelled metrics
+
+    Children are created once per label combination and cached. Recording
+    takes no lock: it costs a dict lookup for the calling thread's shard,
+    a bisect for histograms and an in-place list increment.
+    """
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), enabled: bool = True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.enabled = enabled
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            if not self.enabled:
+                return _NULL_CHILD
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS,
+                 enabled: bool = True):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames, enabled)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, values, child):
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter whose samples are read from existing state at scrape time
+
+    The callback returns [(label_values_tuple, value)]; nothing is
+    recorded on the hot path.
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: tuple, callback):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metric registry rendered in the Prometheus text format
+
+    Pure Python with no I/O: metrics can be created, observed and
+    rendered in isolation, without a server or network access. In a
+    disabled registry every counter and histogram child is a no-op, so
+    recording sites cost nothing and need no checks of their own.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, self.enabled))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets, self.enabled))
+
+    def callback(self, name: str, documentation: str, callback, kind: str = "gauge", labelnames: tuple = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, kind, labelnames, callback))
+
+    def render(self) -> str:
+        """
+        Text exposition format (version 0.0.4) of every registered metric
+
+        A failing callback only drops its own metric from the scrape.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the pipeline metrics recorded on the hot paths
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+
+http_request_seconds = metrics.histogram(
+    "veo_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+veo_submit_seconds = metrics.histogram(
+    "veo_upstream_submit_duration_seconds", "Latency of the Veo generate_videos call", ("outcome",)
+)
+queue_wait_seconds = metrics.histogram(
+    "veo_queue_wait_seconds", "Time a job waited in the generation queue before it was submitted"
+)
+operation_seconds = metrics.histogram(
+    "veo_operation_duration_seconds", "Time from upstream submit to completion or failure", ("outcome",)
+)
+download_seconds = metrics.histogram(
+    "veo_download_duration_seconds", "Time to download and store a finished video"
+)
+download_bytes = metrics.histogram(
+    "veo_download_size_bytes", "Size of downloaded videos", buckets=SIZE_BUCKETS
+)
+video_bytes_served = metrics.counter(
+    "veo_video_bytes_served_total",
+    "Media bytes sent to clients by kind: video (GET /api/videos/{video_id}), poster or preview (derivatives)",
+    ("kind",)
+)
+gemini_request_seconds = metrics.histogram(
+    "veo_gemini_request_duration_seconds",
+    "Gemini call latency by operation: optimize (prompt cache misses only), chat, chat_stream (until the last token)",
+    ("model", "operation")
+)
+gemini_first_token_seconds = metrics.histogram(
+    "veo_gemini_time_to_first_token_seconds", "Time from sending a streaming chat message to its first token", ("model",)
+)
+gc_removed = metrics.counter(
+    "veo_gc_removed_total", "Files and records removed by storage GC", ("category",)
+)
+gc_reclaimed_bytes = metrics.counter(
+    "veo_gc_reclaimed_bytes_total", "Disk space reclaimed by storage GC", ("category",)
+)
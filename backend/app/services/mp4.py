@@ -0,0 +1,327 @@
+import functools
+import hashlib
+import os
+import struct
+from pathlib import Path
+
+# Boxes on the path from moov to the chunk offset tables; everything else is kept byte-for-byte
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+MAX_MOOV_BYTES = 64 * 1024 * 1024  # moov is held in memory while rewriting; larger files are left alone
+
+
+class Mp4Error(Exception):
+    """
+    The file is not an MP4 layout this module understands
+    """
+
+
+class Box:
+    """
+    One box of an in-memory moov tree
+
+    Containers keep their children; leaves keep their original bytes
+    (header included) unless they are rewritten.
+    """
+
+    def __init__(self, box_type: bytes, raw: bytes = None, children: list = None):
+        self.type = box_type
+        self.raw = raw
+        self.children = children
+
+    @property
+    def payload(self) -> bytes:
+        return self.raw[_header_size(self.raw):]
+
+    def find(self, *path: bytes):
+        """
+        Yield descendants matching a path of box types
+        """
+        head, *rest = path
+        for child in self.children or ():
+            if child.type == head:
+                if rest:
+                    yield from child.find(*rest)
+                else:
+                    yield child
+
+    def serialize(self) -> bytes:
+        if self.children is None:
+            return self.raw
+        body = b"".join(child.serialize() for child in self.children)
+        return _box_header(self.type, len(body)) + body
+
+
+def _reports_malformed(function):
+    # Short or inconsistent box payloads surface from struct; callers only handle Mp4Error
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except (struct.error, IndexError) as e:
+            raise Mp4Error(f"Malformed MP4: {e}") from e
+    return wrapper
+
+
+def _box_header(box_type: bytes, body_size: int) -> bytes:
+    if body_size + 8 <= 0xFFFFFFFF:
+        return struct.pack(">I4s", body_size + 8, box_type)
+    return struct.pack(">I4sQ", 1, box_type, body_size + 16)
+
+
+def _header_size(raw: bytes) -> int:
+    return 16 if struct.unpack_from(">I", raw)[0] == 1 else 8
+
+
+def _parse_header(header: bytes, offset: int, limit: int):
+    """
+    (type, header size, box size) of a box starting at offset
+
+    Args:
+        header: At least the first 16 bytes of the box (fewer at end of data)
+        offset: Position of the box in its parent (or file)
+        limit: End of the parent (or file); the box must fit before it
+    """
+    if len(header) < 8:
+        raise Mp4Error(f"Truncated box header at byte {offset}")
+    size, box_type = struct.unpack_from(">I4s", header)
+    header_size = 8
+    if size == 1:
+        if len(header) < 16:
+            raise Mp4Error(f"Truncated box header at byte {offset}")
+        size = struct.unpack_from(">Q", header, 8)[0]
+        header_size = 16
+    elif size == 0:
+        size = limit - offset
+    if size < header_size or offset + size > limit:
+        raise Mp4Error(f"Invalid {box_type!r} box size {size} at byte {offset}")
+    return box_type, header_size, size
+
+
+def parse_tree(raw: bytes) -> Box:
+    """
+    Parse a box (normally moov) into a tree, descending only into CONTAINER_BOXES
+    """
+    box_type, header_size, size = _parse_header(raw[:16], 0, len(raw))
+    if box_type not in CONTAINER_BOXES:
+        return Box(box_type, raw=raw[:size])
+    children = []
+    offset = header_size
+    while offset < size:
+        _, _, child_size = _parse_header(raw[offset:offset + 16], offset, size)
+        children.append(parse_tree(raw[offset:offset + child_size]))
+        offset += child_size
+    return Box(box_type, children=children)
+
+
+def top_level_boxes(file) -> list:
+    """
+    [(type, offset, size)] of the top-level boxes of an open binary file
+    """
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    boxes = []
+    offset = 0
+    while offset < file_size:
+        file.seek(offset)
+        box_type, _, size = _parse_header(file.read(16), offset, file_size)
+        boxes.append((box_type, offset, size))
+        offset += size
+    return boxes
+
+
+def _read_moov(file, boxes: list) -> Box:
+    moov = [(offset, size) for box_type, offset, size in boxes if box_type == b"moov"]
+    if len(moov) != 1:
+        raise Mp4Error("Expected exactly one moov box")
+    offset, size = moov[0]
+    if size > MAX_MOOV_BYTES:
+        raise Mp4Error(f"moov box is {size} bytes (limit {MAX_MOOV_BYTES})")
+    file.seek(offset)
+    return parse_tree(file.read(size))
+
+
+@_reports_malformed
+def probe(path: Path) -> dict:
+    """
+    Container facts from the moov box (no sample data is read)
+
+    Returns:
+        Dict with duration (seconds), width, height, video_codec,
+        audio_codec and faststart (moov precedes the first mdat)
+    """
+    with open(path, "rb") as file:
+        boxes = top_level_boxes(file)
+        moov = _read_moov(file, boxes)
+
+    info = {"duration": None, "width": None, "height": None, "video_codec": None, "audio_codec": None}
+    for mvhd in moov.find(b"mvhd"):
+        timescale, duration = _timescale_and_duration(mvhd.payload)
+        if timescale:
+            info["duration"] = round(duration / timescale, 3)
+
+    for trak in moov.find(b"trak"):
+        handler = next((hdlr.payload[8:12] for hdlr in trak.find(b"mdia", b"hdlr")), None)
+        codec = next((_sample_entry_format(stsd.payload) for stsd in trak.find(b"mdia", b"minf", b"stbl", b"stsd")), None)
+        if handler == b"vide" and info["video_codec"] is None:
+            info["video_codec"] = codec
+            for tkhd in trak.find(b"tkhd"):
+                width, height = struct.unpack_from(">II", tkhd.payload, len(tkhd.payload) - 8)
+                info["width"], info["height"] = width >> 16, height >> 16
+        elif handler == b"soun" and info["audio_codec"] is None:
+            info["audio_codec"] = codec
+
+    positions = {box_type: offset for box_type, offset, _ in reversed(boxes)}
+    info["faststart"] = b"mdat" not in positions or positions[b"moov"] < positions[b"mdat"]
+    return info
+
+
+def request_mismatches(info: dict, resolution: str = None, duration: float = None) -> list:
+    """
+    Requested resolution/duration that probed facts contradict
+
+    Resolution compares the short side, so portrait output matches too,
+    with slack for encoders padding to 16-pixel macroblocks (1080 -> 1088).
+
+    Returns:
+        Human-readable mismatch descriptions (empty when consistent)
+    """
+    mismatches = []
+    expected_lines = {"720p": 720, "1080p": 1080}.get(resolution)
+    if expected_lines and info["width"] and info["height"]:
+        if abs(min(info["width"], info["height"]) - expected_lines) > 16:
+            mismatches.append(f"resolution {resolution} requested, got {info['width']}x{info['height']}")
+    if duration and info["duration"] is not None and abs(info["duration"] - duration) > 0.5:
+        mismatches.append(f"duration {duration}s requested, got {info['duration']}s")
+    return mismatches
+
+
+def _timescale_and_duration(payload: bytes):
+    # mvhd / mdhd: version 1 uses 64-bit times and duration
+    if payload[0] == 1:
+        return struct.unpack_from(">IQ", payload, 20)
+    return struct.unpack_from(">II", payload, 12)
+
+
+def _sample_entry_format(payload: bytes):
+    # stsd: version/flags, entry_count, then entries starting with (size, format)
+    if len(payload) < 16 or struct.unpack_from(">I", payload, 4)[0] == 0:
+        return None
+    return payload[12:16].decode("latin-1").strip()
+
+
+@_reports_malformed
+def faststart(source: Path, destination: Path, chunk_size: int = 1024 * 1024):
+    """
+    Rewrite an MP4 so moov precedes mdat, streaming the media data
+
+    Boxes before the first mdat keep their place, the patched moov
+    follows, then every remaining box in original order. Chunk offsets
+    (stco/co64) are shifted by where their bytes moved to; stco tables
+    that would overflow 32 bits are widened to co64. Memory is bounded by
+    the moov size plus one chunk.
+
+    Returns:
+        SHA-256 hex digest of the written file, or None if source
+        already had moov first (nothing is written then)
+    """
+    with open(source, "rb") as file:
+        boxes = top_level_boxes(file)
+        moov = _read_moov(file, boxes)
+        first_mdat = next((offset for box_type, offset, _ in boxes if box_type == b"mdat"), None)
+        moov_offset, moov_size = next((offset, size) for box_type, offset, size in boxes if box_type == b"moov")
+        if first_mdat is None or moov_offset < first_mdat:
+            return None
+        if any(box_type == b"moof" for box_type, _, _ in boxes):
+            raise Mp4Error("Fragmented MP4 has no global chunk offsets to move")
+
+        new_moov = _relocate_chunk_offsets(moov, first_mdat, moov_offset, moov_size)
+        head = [(offset, size) for box_type, offset, size in boxes if offset < first_mdat and box_type != b"moov"]
+        tail = [(offset, size) for box_type, offset, size in boxes if offset >= first_mdat and box_type != b"moov"]
+
+        sha256 = hashlib.sha256()
+        with open(destination, "wb") as output:
+            def write(data):
+                output.write(data)
+                sha256.update(data)
+
+            for offset, size in head:
+                _copy_range(file, offset, size, write, chunk_size)
+            write(new_moov)
+            for offset, size in tail:
+                _copy_range(file, offset, size, write, chunk_size)
+            output.flush()
+            os.fsync(output.fileno())
+    return sha256.hexdigest()
+
+
+def _relocate_chunk_offsets(moov: Box, first_mdat: int, moov_offset: int, moov_size: int) -> bytes:
+    """
+    Serialized moov with every chunk offset moved for the faststart layout
+    """
+    tables = []  # (box, entries)
+    for stbl in moov.find(b"trak", b"mdia", b"minf", b"stbl"):
+        for child in stbl.children:
+            if child.type in (b"stco", b"co64"):
+                payload = child.payload
+                count = struct.unpack_from(">I", payload, 4)[0]
+                fmt = ">%dI" % count if child.type == b"stco" else ">%dQ" % count
+                tables.append((child, payload[:4], list(struct.unpack_from(fmt, payload, 8))))
+
+    while True:
+        new_size = len(moov.serialize())
+
+        def moved(position):
+            if position < first_mdat:
+                return position
+            if position < moov_offset:
+                return position + new_size
+            return position + new_size - moov_size
+
+        needs_widening = False
+        for box, version_flags, entries in tables:
+            shifted = [moved(position) for position in entries]
+            if box.type == b"stco" and shifted and max(shifted) > 0xFFFFFFFF:
+                box.type = b"co64"
+                needs_widening = True
+            fmt = ">%dI" % len(shifted) if box.type == b"stco" else ">%dQ" % len(shifted)
+            body = version_flags + struct.pack(">I", len(shifted)) + struct.pack(fmt, *shifted)
+            box.raw = _box_header(box.type, len(body)) + body
+        # Widening grows moov, which moves mdat again: recompute until the size is stable
+        if not needs_widening and len(moov.serialize()) == new_size:
+            return moov.serialize()
+
+
+def _copy_range(file, offset: int, size: int, write, chunk_size: int):
+    file.seek(offset)
+    remaining = size
+    while remaining > 0:
+        chunk = file.read(min(chunk_size, remaining))
+        if not chunk:
+            raise Mp4Error(f"File ended {remaining} bytes early")
+        write(chunk)
+        remaining -= len(chunk)
+
+
+def ingest(path: Path, chunk_size: int = 1024 * 1024) -> dict:
+    """
+    Make a freshly downloaded MP4 streamable and describe it
+
+    Rewrites path in place (via a sibling temp file and atomic rename)
+    when moov is not already first.
+
+    Returns:
+        probe() facts plus remuxed (bool) and sha256 of the rewritten
+        file (None when it was not rewritten)
+    """
+    path = Path(path)
+    temporary = path.with_name(path.name + ".faststart")
+    try:
+        sha256 = faststart(path, temporary, chunk_size)
+        if sha256 is not None:
+            os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+    info = probe(path)
+    info["remuxed"] = sha256 is not None
+    info["sha256"] = sha256
+    return info
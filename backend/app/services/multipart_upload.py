@@ -0,0 +1,118 @@
+import multipart
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from starlette.requests import Request
+
+# Room for boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class MalformedUpload(Exception):
+    """The body is not multipart/form-data or has no usable file field"""
+
+
+class UploadTooLarge(Exception):
+    """The body is larger than any accepted upload"""
+
+
+class MultipartFileReader:
+    """
+    Streams one file field out of a multipart/form-data request body
+
+    Parses request.stream() incrementally instead of letting the form
+    parser spool the whole body to a temp file first, so the caller sees
+    file bytes as they arrive and can stop reading (dropping the rest of
+    the body) as soon as a limit is crossed. Other fields are skipped
+    without being buffered; reading stops at the end of the file field.
+    """
+
+    def __init__(self, request: Request, field: str, max_body_bytes: int):
+        self.request = request
+        self.field = field
+        self.max_body_bytes = max_body_bytes
+        self.filename = None  # Set once the field's part headers are parsed
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_field = False
+        self._finished = False
+        self._pending = []
+
+    async def chunks(self):
+        """
+        Async iterator over the file field's data, chunked as it arrives
+
+        Raises:
+            MalformedUpload: Not multipart, unparsable, or no such field
+            UploadTooLarge: Content-Length or bytes received exceed max_body_bytes
+        """
+        content_type, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise MalformedUpload("Expected a multipart/form-data body")
+
+        # Reject before reading anything when the declared size is already too big
+        declared = self.request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > self.max_body_bytes:
+            raise UploadTooLarge(f"Request body is {declared} bytes")
+
+        parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        received = 0
+        async for data in self.request.stream():
+            received += len(data)
+            if received > self.max_body_bytes:
+                raise UploadTooLarge(f"Request body exceeds {self.max_body_bytes} bytes")
+            try:
+                parser.write(data)
+            except MultipartParseError as e:
+                raise MalformedUpload(f"Malformed multipart body: {e}") from e
+            if self._pending:
+                chunk = b"".join(self._pending)
+                self._pending.clear()
+                yield chunk
+            if self._finished:
+                return
+
+        if self.filename is None:
+            raise MalformedUpload(f"Missing form field '{self.field}'")
+        raise MalformedUpload("Multipart body ended inside the file field")
+
+    def _on_part_begin(self):
+        self._disposition = b""
+        self._in_field = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        # The first part with the field's name is the file; later ones are ignored
+        if name == self.field and self.filename is None:
+            self._in_field = True
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_field:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._in_field:
+            self._in_field = False
+            self._finished = True
@@ -0,0 +1,232 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    operation_id TEXT PRIMARY KEY,
+    operation_name TEXT,
+    status TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    video_id TEXT,
+    error TEXT,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_operations_status ON operations (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS operation_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    detail TEXT,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_operation_events_operation ON operation_events (operation_id);
+"""
+
+
+class OperationJournal:
+    """
+    Durable SQLite (WAL) journal of video generation operations
+
+    record() only appends to an in-memory buffer; a writer thread flushes the
+    buffer in a single transaction every journal_flush_interval seconds, so
+    submits never wait on disk. On startup, load() replays the journal so
+    in-flight Veo operations survive restarts.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float):
+        self.db_path = Path(db_path)
+        self.flush_interval = flush_interval
+        self._conn = None
+        self._db_lock = threading.Lock()  # Serializes use of the connection
+        self._buffer_lock = threading.Lock()
+        self._buffer = []  # Pending (snapshot, event) pairs
+        self._stop = threading.Event()
+        self._thread = None
+
+    def open(self):
+        """
+        Open the database, create the schema and start the writer thread
+        """
+        if self._conn is not None:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="operation-journal", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop the writer thread, flush anything still buffered and close the database
+        """
+        if self._conn is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+            self._conn = None
+
+    def record(self, operation_id: str, op_data: dict, detail: str = None):
+        """
+        Buffer the current state of an operation plus a state-transition event
+
+        Args:
+            operation_id: Our operation ID
+            op_data: The service's in-memory operation entry
+            detail: Optional free-form note stored with the event
+        """
+        now = time.time()
+        operation = op_data.get("operation")
+        snapshot = (
+            operation_id,
+            getattr(operation, "name", None),
+            op_data["status"],
+            json.dumps(op_data["metadata"]),
+            op_data.get("video_id"),
+            op_data.get("error"),
+            op_data["started_at"],
+            now,
+        )
+        event = (operation_id, op_data["status"], detail or op_data.get("error"), now)
+        with self._buffer_lock:
+            self._buffer.append((snapshot, event))
+
+    def flush(self) -> int:
+        """
+        Write all buffered records in one transaction
+
+        Every worker journals to the same database, so a snapshot only
+        replaces a row recorded no later than itself, and never turns a
+        finished operation back into a pending one: a stale "queued" copy
+        flushed late by another worker cannot resurrect a job that was
+        already submitted or finished (replay would submit it again).
+        Events are always appended.
+
+        Returns:
+            Number of records written
+        """
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+
+        with self._db_lock:
+            if self._conn is None:
+                return 0
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO operations
+                        (operation_id, operation_name, status, metadata, video_id, error, started_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(operation_id) DO UPDATE SET
+                        operation_name = excluded.operation_name,
+                        status = excluded.status,
+                        metadata = excluded.metadata,
+                        video_id = excluded.video_id,
+                        error = excluded.error,
+                        updated_at = excluded.updated_at
+                    WHERE excluded.updated_at >= operations.updated_at
+                        AND (operations.status IN ('queued', 'submitting', 'processing')
+                             OR excluded.status NOT IN ('queued', 'submitting', 'processing'))
+                    """,
+                    [snapshot for snapshot, _ in batch]
+                )
+                self._conn.executemany(
+                    "INSERT INTO operation_events (operation_id, status, detail, at) VALUES (?, ?, ?, ?)",
+                    [event for _, event in batch]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # Put the batch back so the next flush retries it
+                with self._buffer_lock:
+                    self._buffer[:0] = batch
+                raise
+        return len(batch)
+
+    def load(self, since: float) -> list:
+        """
+        Return journaled operations that are still pending or finished after `since`
+
+        Returns:
+            List of dicts with operation_id, operation_name, status, metadata,
+            video_id, error, started_at and updated_at
+        """
+        with self._db_lock:
+            rows = self._conn.execute(
+                """
+                SELECT operation_id, operation_name, status, metadata, video_id, error, started_at, updated_at
+                FROM operations
+                WHERE status IN ('queued', 'submitting', 'processing') OR updated_at >= ?
+                ORDER BY started_at
+                """,
+                (since,)
+            ).fetchall()
+
+        return [
+            {
+                "operation_id": row[0],
+                "operation_name": row[1],
+                "status": row[2],
+                "metadata": json.loads(row[3]),
+                "video_id": row[4],
+                "error": row[5],
+                "started_at": row[6],
+                "updated_at": row[7],
+            }
+            for row in rows
+        ]
+
+    def compact(self, before: float) -> int:
+        """
+        Delete finished operations (and their events) last updated before `before`
+
+        Returns:
+            Number of operations removed
+        """
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    """
+                    DELETE FROM operation_events WHERE operation_id IN (
+                        SELECT operation_id FROM operations
+                        WHERE status NOT IN ('queued', 'submitting', 'processing') AND updated_at < ?
+                    )
+                    """,
+                    (before,)
+                )
+                removed = self._conn.execute(
+                    "DELETE FROM operations WHERE status NOT IN ('queued', 'submitting', 'processing') AND updated_at < ?",
+                    (before,)
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception("Journal flush failed")
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+import time
+from app.config import get_settings
+from app.services.cache import LRUCache, SingleFlight
+from app.services.ai_clients import ai_clients
+from app.services.metrics import gemini_request_seconds
+
+settings = get_settings()
+
+
+OPTIMIZER_SYSTEM_INSTRUCTION = """You are an expert video generation prompt engineer specializing in Google Veo 3.1.
+Your task is to enhance video prompts to maximize quality and cinematic appeal.
+
+Guidelines:
+1. Enhance prompts with vivid, specific details about:
+   - Subject description and appearance
+   - Actions and movements
+   - Visual style and aesthetics
+   - Camera angles, movements, and framing
+   - Lighting and atmosphere
+   - Audio elements and soundscape
+   - Color palette and mood
+
+2. Keep prompts under 4096 characters (Veo 3.1 maximum)
+3. Be specific and descriptive
+4. Use cinematic language
+5. Focus on visual and audio details that Veo 3.1 can generate
+6. Maintain the original intent while enhancing quality
+7. Incorporate user's additional requirements seamlessly
+
+Return ONLY the optimized prompt, nothing else."""
+
+
+class PromptOptimizer:
+    """
+    Gemini prompt optimization with memoization and request coalescing
+
+    Results are cached per model in an LRU+TTL cache bounded by
+    optimize_cache_bytes (per model), keyed on the whitespace-normalized
+    request. Identical requests that arrive while one is already in
+    flight share its upstream call.
+    """
+
+    def __init__(self):
+        self._caches = {}  # model name -> LRUCache
+        self._flights = SingleFlight()
+
+    async def optimize(self, request) -> str:
+        """
+        Return the optimized prompt for a PromptOptimizationRequest
+
+        Args:
+            request: PromptOptimizationRequest
+
+        Returns:
+            Optimized prompt (at most 4096 characters)
+        """
+        model_name = settings.optimize_model
+        key = self.cache_key(request)
+        cache = self._cache_for(model_name)
+
+        optimized = cache.get(key)
+        if optimized is not None:
+            return optimized
+
+        async def call_upstream():
+            async with ai_clients.limit(model_name):
+                started = time.perf_counter()
+                result = await asyncio.to_thread(self._generate, model_name, self.build_prompt(request))
+                gemini_request_seconds.labels(model_name, "optimize").observe(time.perf_counter() - started)
+            cache.put(key, result, size=len(result.encode()) + len(key))
+            return result
+
+        return await self._flights.do((model_name, key), call_upstream)
+
+    @staticmethod
+    def cache_key(request) -> str:
+        """
+        Fingerprint of the normalized request fields
+        """
+        def normalize(text):
+            return " ".join(text.split()) if text else None
+
+        fields = {
+            "original_prompt": normalize(request.original_prompt),
+            "additional_details": normalize(request.additional_details),
+            "mood": normalize(request.mood),
+            "camera_style": normalize(request.camera_style),
+            "audio_style": normalize(request.audio_style),
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def build_prompt(request) -> str:
+        """
+        Build the user prompt sent to Gemini
+        """
+        user_context_parts = [f"Original prompt: {request.original_prompt}"]
+
+        if request.additional_details:
+            user_context_parts.append(f"Additional requirements: {request.additional_details}")
+        if request.mood:
+            user_context_parts.append(f"Desired mood/tone: {request.mood}")
+        if request.camera_style:
+            user_context_parts.append(f"Camera style: {request.camera_style}")
+        if request.audio_style:
+            user_context_parts.append(f"Audio style: {request.audio_style}")
+
+        user_context = "\n\n".join(user_context_parts)
+        return user_context + "\n\nEnhance this prompt for optimal Veo 3.1 video generation:"
+
+    def stats(self) -> dict:
+        """
+        Per-model cache statistics plus the number of coalesced calls
+        """
+        return {
+            "models": {model_name: cache.stats() for model_name, cache in self._caches.items()},
+            "in_flight": len(self._flights),
+            "coalesced": self._flights.shared,
+        }
+
+    def _cache_for(self, model_name: str) -> LRUCache:
+        cache = self._caches.get(model_name)
+        if cache is None:
+            cache = LRUCache(settings.optimize_cache_bytes, ttl=settings.optimize_cache_ttl)
+            self._caches[model_name] = cache
+        return cache
+
+    def _generate(self, model_name: str, full_prompt: str) -> str:
+        """
+        Call Gemini (blocking; runs in a worker thread)
+        """
+        model = ai_clients.model(model_name, OPTIMIZER_SYSTEM_INSTRUCTION)
+        response = model.generate_content(full_prompt)
+        optimized = response.text.strip()
+
+        # Ensure it's within Veo 3.1 character limit
+        if len(optimized) > 4096:
+            optimized = optimized[:4093] + "..."
+        return optimized
+
+
+# Singleton instance
+prompt_optimizer = PromptOptimizer()
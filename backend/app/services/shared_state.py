@@ -0,0 +1,511 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlparse
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class SharedState:
+    """
+    Key-value state shared by every API worker process
+
+    Backends implement plain keys with optional TTL, atomic counters,
+    append-only logs (change feeds other workers follow with a cursor)
+    and leases (used for leader election). Values are strings; the
+    *_json helpers wrap them. `shared` is False for the in-process
+    backend, letting callers skip cross-worker bookkeeping entirely.
+    """
+
+    shared = True
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def get_many(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: str, ttl: float = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def append(self, log: str, value: str) -> int:
+        """
+        Append to a log
+
+        Returns:
+            Sequence number of the new entry (1-based, increasing)
+        """
+        raise NotImplementedError
+
+    def read_since(self, log: str, cursor: int):
+        """
+        Read log entries after `cursor`
+
+        Returns:
+            (new_cursor, [values])
+        """
+        raise NotImplementedError
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew a lease; True if `owner` holds it for the next ttl seconds
+        """
+        raise NotImplementedError
+
+    def release_lease(self, name: str, owner: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def get_json(self, key: str):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def get_many_json(self, keys: list) -> list:
+        return [json.loads(value) if value is not None else None for value in self.get_many(keys)]
+
+    def set_json(self, key: str, value, ttl: float = None):
+        self.set(key, json.dumps(value), ttl)
+
+
+class LocalSharedState(SharedState):
+    """
+    In-process backend for single-worker deployments (the default)
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # key -> (value, expires_at)
+        self._logs = {}  # log -> [values]
+        self._leases = {}  # name -> (owner, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            item = self._values.get(key)
+            if item is None or (item[1] is not None and item[1] <= time.time()):
+                return None
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def append(self, log, value):
+        with self._lock:
+            entries = self._logs.setdefault(log, [])
+            entries.append(value)
+            return len(entries)
+
+    def read_since(self, log, cursor):
+        with self._lock:
+            entries = self._logs.get(log, [])
+            return len(entries), entries[cursor:]
+
+    def acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder is None or holder[0] == owner or holder[1] <= now:
+                self._leases[name] = (owner, now + ttl)
+                return True
+            return False
+
+    def release_lease(self, name, owner):
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_name ON log (name, seq);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteSharedState(SharedState):
+    """
+    Backend for several workers on one host, backed by one SQLite (WAL) file
+
+    SQLite's file lock serializes writers across processes; leases are
+    taken inside BEGIN IMMEDIATE transactions so only one worker can win.
+    Log sequence numbers are global (shared by all logs) but increase
+    within each log, which is all read_since needs.
+    """
+
+    PURGE_EVERY = 500  # Writes between purges of expired keys and old log entries
+
+    def __init__(self, db_path: str, retention: float):
+        self.db_path = Path(db_path)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+    def _connection(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SQLITE_SCHEMA)
+        return self._conn
+
+    def _write(self, sql: str, params: tuple = ()):
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(sql, params)
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                now = time.time()
+                conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                conn.execute("DELETE FROM log WHERE at < ?", (now - self.retention,))
+            return cursor
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT key, value FROM kv WHERE key IN ({', '.join('?' for _ in keys)}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (*keys, time.time())
+            ).fetchall()
+        values = dict(rows)
+        return [values.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        self._write(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+
+    def delete(self, key):
+        self._write("DELETE FROM kv WHERE key = ?", (key,))
+
+    def append(self, log, value):
+        return self._write("INSERT INTO log (name, value, at) VALUES (?, ?, ?)", (log, value, time.time())).lastrowid
+
+    def read_since(self, log, cursor):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT seq, value FROM log WHERE name = ? AND seq > ? ORDER BY seq", (log, cursor)
+            ).fetchall()
+        if not rows:
+            return cursor, []
+        return rows[-1][0], [value for _, value in rows]
+
+    def acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                held = row is None or row[0] == owner or row[1] <= now
+                if held:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, owner, now + ttl)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return held
+
+    def release_lease(self, name, owner):
+        self._write("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+# Assigns the next sequence number and stores the entry in one atomic step,
+# so readers never see seq N+1 before N; keeps the newest max_entries and
+# lets an idle log expire (the counter has no TTL, so numbering continues)
+APPEND_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], seq, seq .. ':' .. ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -(tonumber(ARGV[2]) + 1))
+redis.call('PEXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+# Take a free lease or renew our own, as one compare-and-set: a lease that
+# expired and was taken by another worker is never extended by its old owner
+LEASE_ACQUIRE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder == false or holder == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Drop the lease only if we still hold it
+LEASE_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisSharedState(SharedState):
+    """
+    Backend for a Redis-protocol (RESP2) server
+
+    Speaks the wire protocol directly over one socket, using only GET,
+    MGET, SET (PX), DEL, EVAL and ZRANGEBYSCORE, so any Redis-compatible
+    server with Lua scripting can serve it. Log appends and lease
+    changes are scripts, so each is one atomic step. Each log is
+    a sorted set scored by a per-log INCR counter: sequence numbers never
+    restart when old entries are trimmed (newest max_log_entries kept) or
+    the set expires after a quiet retention period, so followers' cursors
+    stay valid.
+    """
+
+    def __init__(self, url: str, retention: float, max_log_entries: int, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.retention = retention
+        self.max_log_entries = max_log_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args):
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(payload))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+    def command(self, *args):
+        """
+        Run one command, reconnecting once if the connection dropped
+        """
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(*args)
+                except (ConnectionError, OSError):
+                    self._disconnect()
+                    if attempt == 2:
+                        raise
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def get(self, key):
+        return self.command("GET", key)
+
+    def get_many(self, keys):
+        return self.command("MGET", *keys) if keys else []
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.command("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self.command("SET", key, value)
+
+    def delete(self, key):
+        self.command("DEL", key)
+
+    def append(self, log, value):
+        return self.command(
+            "EVAL", APPEND_SCRIPT, 2, f"logseq:{log}", f"log:{log}",
+            value, self.max_log_entries, int(self.retention * 1000)
+        )
+
+    def read_since(self, log, cursor):
+        head = int(self.command("GET", f"logseq:{log}") or 0)
+        if head < cursor:
+            # The counter went backwards (Redis lost its data): start over
+            # rather than skip everything up to the stale cursor
+            logger.warning("Shared log %s restarted at %d (cursor was %d)", log, head, cursor)
+            cursor = 0
+        if head == cursor:
+            return cursor, []
+        members = self.command("ZRANGEBYSCORE", f"log:{log}", f"({cursor}", head) or []
+        values = [member.split(":", 1)[1] for member in members]
+        return head, values
+
+    def acquire_lease(self, name, owner, ttl):
+        return self.command("EVAL", LEASE_ACQUIRE_SCRIPT, 1, f"lease:{name}", owner, int(ttl * 1000)) == 1
+
+    def release_lease(self, name, owner):
+        self.command("EVAL", LEASE_RELEASE_SCRIPT, 1, f"lease:{name}", owner)
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+class LeaderElection:
+    """
+    Lease-based leader election among API workers
+
+    The leader renews its lease every ttl/3 seconds (see refresh). A worker
+    that has not renewed within ttl stops considering itself leader even
+    before another worker takes over, so two workers never both act on a
+    stale lease for long.
+    """
+
+    def __init__(self, state: SharedState, name: str, ttl: float):
+        self.state = state
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held = False
+        self._renewed_at = 0.0
+        self.elections_won = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._held and time.monotonic() - self._renewed_at < self.ttl
+
+    def due(self) -> bool:
+        """
+        True when the lease should be renewed (or contested) again
+        """
+        return time.monotonic() - self._renewed_at >= self.ttl / 3
+
+    def refresh(self) -> bool:
+        """
+        Take or renew the lease (blocking)
+
+        Returns:
+            True if this worker is the leader
+        """
+        started = time.monotonic()
+        try:
+            held = self.state.acquire_lease(self.name, self.owner, self.ttl)
+        except Exception as e:
+            logger.warning("Lease refresh failed: %s: %s", type(e).__name__, e)
+            held = False
+        if held and not self.is_leader:
+            self.elections_won += 1
+        self._held = held
+        if held:
+            self._renewed_at = started
+        return held
+
+    def resign(self):
+        if self._held:
+            try:
+                self.state.release_lease(self.name, self.owner)
+            except Exception:
+                pass
+        self._held = False
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "is_leader": self.is_leader,
+            "elections_won": self.elections_won
+        }
+
+
+def create_shared_state(backend: str) -> SharedState:
+    """
+    Build the configured backend: "local", "sqlite" or "redis"
+    """
+    if backend == "sqlite":
+        return SQLiteSharedState(settings.shared_state_path, settings.journal_retention)
+    if backend == "redis":
+        return RedisSharedState(settings.redis_url, settings.journal_retention, settings.shared_log_max_entries)
+    if backend == "local":
+        return LocalSharedState()
+    raise ValueError(f"Unknown shared_state_backend: {backend}")
+
+
+# Global instances
+shared_state = create_shared_state(settings.shared_state_backend)
+leader_election = LeaderElection(shared_state, "video-service", settings.leader_lease_ttl)
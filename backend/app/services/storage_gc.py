@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from app.config import get_settings
+from app.services.video_service import video_service
+from app.services.video_catalog import video_catalog
+from app.services.metadata_store import metadata_store
+from app.services.upload_store import upload_store
+from app.services.video_downloader import video_downloader
+from app.services.derivatives import derivative_service
+from app.services.metrics import gc_removed, gc_reclaimed_bytes
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Operations in these states will still read their reference image
+ACTIVE_STATUSES = ("queued", "submitting", "processing")
+
+# Report order; each has a _remove_<category> method
+CATEGORIES = (
+    "expired_uploads",
+    "orphan_upload_blobs",
+    "temp_files",
+    "orphan_sidecars",
+    "orphan_metadata",
+    "orphan_derivatives",
+    "evicted_videos",
+)
+
+
+class StorageGC:
+    """
+    Retention policies for stored videos, uploads and leftover files
+
+    A collection is a planning pass (one scan of each storage directory
+    plus index queries, no side effects) followed by deletions that
+    re-check every candidate, so the dry-run report and a real run pick
+    the same files. Video plays are buffered in memory and flushed to the
+    metadata store in batches; over the byte budget, private videos are
+    evicted least recently watched first. Only the authoritative worker
+    collects.
+    """
+
+    def __init__(self, storage_path: Path, upload_path: Path):
+        self.storage_path = Path(storage_path)
+        self.upload_path = Path(upload_path)
+        self._accessed = {}  # video_id -> last play, not yet flushed
+        self._task = None
+        self.runs = 0
+        self.last_run_at = None
+        self.last_removed = {}
+        self.reclaimed_bytes = 0
+
+    def record_access(self, video_id: str):
+        """
+        Note that a video was played (a dict write; persisted by flush_access)
+        """
+        self._accessed[video_id] = time.time()
+
+    def flush_access(self) -> int:
+        """
+        Persist buffered play times (blocking)
+
+        Returns:
+            Number of videos written
+        """
+        accessed, self._accessed = self._accessed, {}
+        try:
+            return metadata_store.record_access(accessed)
+        except Exception:
+            # Put them back for the next flush, keeping any newer plays
+            for video_id, accessed_at in accessed.items():
+                self._accessed[video_id] = max(accessed_at, self._accessed.get(video_id, 0))
+            raise
+
+    def plan(self, active_images: set = frozenset(), now: float = None) -> dict:
+        """
+        Decide what a collection would remove (blocking; no side effects)
+
+        Args:
+            active_images: image_ids that queued or running operations still need
+            now: Reference time for every age check (default: current time)
+
+        Returns:
+            Dict with planned_at, usage (current totals) and actions
+            (category -> candidate dicts with id, path and bytes)
+        """
+        now = now or time.time()
+        temp_cutoff = now - settings.temp_file_ttl
+        actions = {category: [] for category in CATEGORIES}
+
+        # Uploads: expired index records, blobs no record points at, abandoned .part files
+        records = upload_store.records()
+        expired = []
+        if settings.upload_ttl > 0:
+            cutoff = now - settings.upload_ttl
+            expired = [
+                record for record in records
+                if record["created_at"] < cutoff and record["image_id"] not in active_images
+            ]
+        expired_ids = {record["image_id"] for record in expired}
+        kept_files = {record["filename"] for record in records if record["image_id"] not in expired_ids}
+        freed_files = set()
+        for record in expired:
+            # A blob shared with a kept record is not freed; a shared one is counted once
+            freed = record["filename"] not in kept_files and record["filename"] not in freed_files
+            freed_files.add(record["filename"])
+            actions["expired_uploads"].append({
+                "id": record["image_id"],
+                "path": str(self.upload_path / record["filename"]),
+                "bytes": record["size"] if freed else 0,
+                "age": round(now - record["created_at"])
+            })
+
+        for entry in self._scan(self.upload_path):
+            if entry.name.startswith(".") and entry.name.endswith(".part"):
+                stat = entry.stat()
+                if stat.st_mtime < temp_cutoff:
+                    actions["temp_files"].append(self._file_item(entry, stat, now))
+        indexed_files = {record["filename"] for record in records}
+        upload_bytes = 0
+        for entry in upload_store.layout.entries():
+            stat = entry.stat()
+            if entry.name in indexed_files:
+                upload_bytes += stat.st_size
+            elif stat.st_mtime < temp_cutoff:
+                actions["orphan_upload_blobs"].append({**self._file_item(entry, stat, now), "id": entry.name})
+
+        # Part files stay resumable for as long as their operation is journaled
+        partial_cutoff = now - max(settings.temp_file_ttl, settings.journal_retention)
+        for entry in self._scan(video_downloader.partial_dir):
+            stat = entry.stat()
+            if stat.st_mtime < partial_cutoff:
+                actions["temp_files"].append(self._file_item(entry, stat, now))
+
+        # Legacy sidecars and metadata rows whose MP4 is gone
+        for entry in self._scan(self.storage_path):
+            if entry.name.endswith(".json"):
+                video_id = entry.name[:-len(".json")]
+                stat = entry.stat()
+                if stat.st_mtime < temp_cutoff and not self._video_exists(video_id):
+                    actions["orphan_sidecars"].append({**self._file_item(entry, stat, now), "id": video_id})
+        for metadata in metadata_store.all():
+            if metadata["created_at"] < temp_cutoff and not self._video_exists(metadata["video_id"]):
+                actions["orphan_metadata"].append({
+                    "id": metadata["video_id"],
+                    "path": None,
+                    "bytes": 0,
+                    "age": round(now - metadata["created_at"])
+                })
+
+        # Derivatives: half-written outputs and directories of deleted videos
+        derivative_bytes = {}
+        for directory in derivative_service.layout.entries():
+            total = 0
+            for entry in self._scan(Path(directory.path)):
+                stat = entry.stat()
+                if entry.name.startswith(".tmp-"):
+                    if stat.st_mtime < temp_cutoff:
+                        actions["temp_files"].append(self._file_item(entry, stat, now))
+                else:
+                    total += stat.st_size
+            if self._video_exists(directory.name):
+                derivative_bytes[directory.name] = total
+            else:
+                actions["orphan_derivatives"].append({"id": directory.name, "path": directory.path, "bytes": total})
+
+        # Byte budget: evict private videos, least recently watched first
+        videos = video_catalog.list_videos()
+        sizes = {video["id"]: video["size"] + derivative_bytes.get(video["id"], 0) for video in videos}
+        video_bytes = sum(sizes.values())
+        if settings.video_storage_max_bytes > 0 and video_bytes > settings.video_storage_max_bytes:
+            last_access = metadata_store.last_access()
+            for video_id, accessed_at in list(self._accessed.items()):
+                last_access[video_id] = max(accessed_at, last_access.get(video_id, 0))
+            candidates = sorted(
+                (
+                    video for video in videos
+                    if not video.get("is_public") and now - video["created_at"] >= settings.video_min_age
+                ),
+                key=lambda video: last_access.get(video["id"], video["created_at"])
+            )
+            excess = video_bytes - settings.video_storage_max_bytes
+            for video in candidates:
+                if excess <= 0:
+                    break
+                actions["evicted_videos"].append({
+                    "id": video["id"],
+                    "path": str(video_service.get_video_path(video["id"])),
+                    "bytes": sizes[video["id"]],
+                    "last_accessed_at": last_access.get(video["id"]),
+                    "age": round(now - video["created_at"])
+                })
+                excess -= sizes[video["id"]]
+
+        return {
+            "planned_at": now,
+            "usage": {
+                "videos": len(videos),
+                "video_bytes": video_bytes,
+                "uploads": len(records),
+                "upload_bytes": upload_bytes
+            },
+            "actions": actions
+        }
+
+    def apply(self, plan: dict) -> dict:
+        """
+        Carry out a plan (blocking)
+
+        Each candidate is re-checked first: a video that became public or
+        was played, a file written to, or an orphan whose video reappeared
+        since planning is left alone.
+
+        Returns:
+            The plan with actions reduced to what was actually removed
+        """
+        removed = {}
+        for category, items in plan["actions"].items():
+            remover = getattr(self, f"_remove_{category}")
+            done = []
+            for item in items:
+                try:
+                    if remover(item, plan["planned_at"]):
+                        done.append(item)
+                except OSError as e:
+                    logger.warning("GC could not remove %s %s: %s", category, item["id"], e)
+            removed[category] = done
+            gc_removed.labels(category).inc(len(done))
+            gc_reclaimed_bytes.labels(category).inc(sum(item["bytes"] for item in done))
+        return {**plan, "actions": removed}
+
+    def run(self, active_images: set = frozenset(), dry_run: bool = True, limit: int = 100) -> dict:
+        """
+        Plan a collection and, unless dry_run, carry it out (blocking)
+
+        Returns:
+            Report: policies, usage, and per category the count, bytes and
+            up to `limit` of the affected items
+        """
+        plan = self.plan(active_images)
+        if not dry_run:
+            plan = self.apply(plan)
+            self.runs += 1
+            self.last_run_at = plan["planned_at"]
+            self.last_removed = {category: len(items) for category, items in plan["actions"].items()}
+            reclaimed = sum(item["bytes"] for items in plan["actions"].values() for item in items)
+            self.reclaimed_bytes += reclaimed
+            if any(self.last_removed.values()):
+                logger.info("Storage GC reclaimed %d bytes", reclaimed, extra={"fields": self.last_removed})
+        return self._report(plan, dry_run, limit)
+
+    async def collect(self, dry_run: bool = False, limit: int = 100) -> dict:
+        """
+        run() off the event loop, protecting images of active operations
+        """
+        active_images = {
+            op_data["metadata"].get("image_id")
+            for op_data in list(video_service.operations.values())
+            if op_data["status"] in ACTIVE_STATUSES
+        }
+        active_images.discard(None)
+        return await asyncio.to_thread(self.run, active_images, dry_run, limit)
+
+    def start(self):
+        """
+        Start the background flush / collection loop
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """
+        Cancel the loop and flush any buffered play times
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush_access)
+        except Exception:
+            logger.exception("Final access-time flush failed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.gc_enabled,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_removed": self.last_removed,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "unflushed_accesses": len(self._accessed)
+        }
+
+    async def _loop(self):
+        last_run = None
+        while True:
+            await asyncio.sleep(settings.access_flush_interval)
+            try:
+                await asyncio.to_thread(self.flush_access)
+                due = last_run is None or time.monotonic() - last_run >= settings.gc_interval
+                if settings.gc_enabled and due and video_service.authoritative:
+                    last_run = time.monotonic()
+                    await self.collect(limit=0)
+            except Exception:
+                logger.exception("Storage GC failed")
+
+    def _report(self, plan: dict, dry_run: bool, limit: int) -> dict:
+        categories = {
+            category: {
+                "count": len(items),
+                "bytes": sum(item["bytes"] for item in items),
+                "items": items[:limit]
+            }
+            for category, items in plan["actions"].items()
+        }
+        return {
+            "dry_run": dry_run,
+            "generated_at": plan["planned_at"],
+            "policies": {
+                "gc_enabled": settings.gc_enabled,
+                "gc_interval": settings.gc_interval,
+                "upload_ttl": settings.upload_ttl,
+                "video_storage_max_bytes": settings.video_storage_max_bytes,
+                "video_min_age": settings.video_min_age,
+                "temp_file_ttl": settings.temp_file_ttl
+            },
+            "usage": plan["usage"],
+            "bytes": sum(category["bytes"] for category in categories.values()),
+            "categories": categories
+        }
+
+    def _video_exists(self, video_id: str) -> bool:
+        return video_service.get_video_path(video_id).exists()
+
+    @staticmethod
+    def _scan(directory: Path) -> list:
+        # Files of one directory in a single os.scandir pass; stat results are cached on the entries
+        try:
+            with os.scandir(directory) as entries:
+                return [entry for entry in entries if entry.is_file()]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _file_item(entry, stat, now: float) -> dict:
+        return {
+            "id": entry.name,
+            "path": entry.path,
+            "bytes": stat.st_size,
+            "age": round(now - stat.st_mtime),
+            "modified_at": stat.st_mtime
+        }
+
+    @staticmethod
+    def _unchanged(item: dict) -> bool:
+        try:
+            return os.stat(item["path"]).st_mtime == item["modified_at"]
+        except FileNotFoundError:
+            return False
+
+    def _remove_expired_uploads(self, item: dict, planned_at: float) -> bool:
+        upload_store.remove([item["id"]])
+        return True
+
+    def _remove_orphan_upload_blobs(self, item: dict, planned_at: float) -> bool:
+        return self._unchanged(item) and upload_store.remove_blob(item["id"])
+
+    def _remove_temp_files(self, item: dict, planned_at: float) -> bool:
+        if not self._unchanged(item):
+            return False
+        Path(item["path"]).unlink(missing_ok=True)
+        return True
+
+    def _remove_orphan_sidecars(self, item: dict, planned_at: float) -> bool:
+        if self._video_exists(item["id"]) or not self._unchanged(item):
+            return False
+        Path(item["path"]).unlink(missing_ok=True)
+        return True
+
+    def _remove_orphan_metadata(self, item: dict, planned_at: float) -> bool:
+        return not self._video_exists(item["id"]) and metadata_store.delete(item["id"])
+
+    def _remove_orphan_derivatives(self, item: dict, planned_at: float) -> bool:
+        if self._video_exists(item["id"]):
+            return False
+        derivative_service.remove(item["id"])
+        return True
+
+    def _remove_evicted_videos(self, item: dict, planned_at: float) -> bool:
+        video = video_catalog.get(item["id"])
+        if video is None or video.get("is_public") or self._accessed.get(item["id"], 0) > planned_at:
+            return False
+        if not video_service.delete_video(item["id"]):
+            return False
+        logger.info("Evicted video %s (%d bytes, last played %s)", item["id"], item["bytes"], item["last_accessed_at"])
+        return True
+
+
+# Global collector instance
+storage_gc = StorageGC(Path(settings.video_storage_path), Path(settings.upload_storage_path))
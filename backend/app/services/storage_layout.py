@@ -0,0 +1,206 @@
+import os
+import shutil
+import time
+from pathlib import Path
+from app.config import get_settings
+
+settings = get_settings()
+
+SHARD_WIDTH = 2  # Key characters per prefix directory
+
+
+class StorageLayout:
+    """
+    Where items keyed by an id live under a storage root
+
+    "sharded" fans items out into prefix directories taken from the key
+    (ab/<name> at depth 1, ab/cd/<name> at depth 2), so at 100k items no
+    directory holds more than a few hundred entries; "flat" keeps them
+    directly in the root. New
+    items go to the configured layout and lookups fall back to the other
+    one, so both are served while migrate() moves items across. The key
+    is the name without its suffix (video id, upload sha256); keys that
+    are too short or not alphanumeric stay flat, so an id can never name
+    a path outside the root.
+    """
+
+    def __init__(self, root: Path, sharded: bool, depth: int, suffix: str = "", directories: bool = False):
+        self.root = Path(root)
+        self.sharded = sharded and depth > 0
+        self.depth = depth
+        self.suffix = suffix  # Only names ending with it are items (e.g. ".mp4", not legacy sidecars)
+        self.directories = directories  # Items are directories (derivatives), not files
+
+    def path(self, name: str) -> Path:
+        """
+        Location of an item in the configured layout (where new items go)
+        """
+        return self._sharded_path(name) if self.sharded else self.root / name
+
+    def other_path(self, name: str) -> Path:
+        """
+        Location of an item in the layout that is not configured
+        """
+        return self.root / name if self.sharded else self._sharded_path(name)
+
+    def locate(self, name: str) -> Path:
+        """
+        Existing location of an item, checking the configured layout first
+
+        Returns:
+            The path it exists at, or path(name) if it exists in neither
+        """
+        preferred = self.path(name)
+        if preferred.exists():
+            return preferred
+        fallback = self.other_path(name)
+        return fallback if fallback.exists() else preferred
+
+    def prepare(self, name: str) -> Path:
+        """
+        path(name) with its prefix directories created
+        """
+        target = self.path(name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target
+
+    def entries(self) -> list:
+        """
+        os.DirEntry for every item in either layout (hidden names skipped)
+
+        Items at any prefix depth are included, so migrate() also picks up
+        ones left behind by a change of storage_shard_depth.
+        """
+        found = []
+        pending = [(self.root, 0)]
+        while pending:
+            directory, level = pending.pop()
+            for entry in self._scandir(directory):
+                if entry.name.startswith("."):
+                    continue
+                is_dir = entry.is_dir()
+                if is_dir and level < self.depth and self._is_shard(entry.name):
+                    pending.append((entry.path, level + 1))
+                elif is_dir == self.directories and entry.name.endswith(self.suffix):
+                    found.append(entry)
+        return found
+
+    def directory_mtimes(self) -> dict:
+        """
+        mtime of the root and of every prefix directory
+
+        Adding or removing an item changes the mtime of the directory
+        holding it, so comparing two results detects changes without
+        listing any items (apart from flat ones left in the root). The
+        flat layout only reports the root: a single stat, as before
+        sharding; leftovers in prefix directories are static once a
+        migration back to flat has run.
+        """
+        mtimes = {}
+        pending = [(str(self.root), 0)]
+        while pending:
+            directory, level = pending.pop()
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime
+            except FileNotFoundError:
+                continue
+            if self.sharded and level < self.depth:
+                for entry in self._scandir(directory):
+                    if entry.is_dir() and self._is_shard(entry.name):
+                        pending.append((entry.path, level + 1))
+        return mtimes
+
+    def misplaced(self) -> list:
+        """
+        Paths of items stored in the layout that is not configured
+        """
+        return [Path(entry.path) for entry in self.entries() if Path(entry.path) != self.path(entry.name)]
+
+    def migrate(self, batch_size: int = 500, grace: float = 2.0, progress=None) -> int:
+        """
+        Move every misplaced item into the configured layout, online
+
+        Files are hard-linked to their new path and the old name is only
+        removed grace seconds later, so a request that resolved the old
+        path just before the link still opens it. Directories (and files
+        on filesystems without hard links) are renamed. An item already
+        present at its new path is kept there and the old copy dropped.
+
+        Args:
+            batch_size: Items linked before each grace pause
+            grace: Seconds between linking a batch and unlinking the old names
+            progress: Optional callback(moved_so_far, total)
+
+        Returns:
+            Number of items moved
+        """
+        misplaced = self.misplaced()
+        moved = 0
+        for start in range(0, len(misplaced), max(1, batch_size)):
+            batch = misplaced[start:start + batch_size]
+            linked = []
+            for source in batch:
+                target = self.prepare(source.name)
+                if self.directories:
+                    if target.exists():
+                        shutil.rmtree(source, ignore_errors=True)
+                    else:
+                        os.replace(source, target)
+                    moved += 1
+                    continue
+                try:
+                    os.link(source, target)
+                except FileExistsError:
+                    pass  # Left by an interrupted run, or written since in the configured layout
+                except FileNotFoundError:
+                    continue  # Deleted meanwhile
+                except OSError:
+                    os.replace(source, target)
+                    moved += 1
+                    continue
+                linked.append(source)
+            if linked:
+                time.sleep(grace)
+                for source in linked:
+                    source.unlink(missing_ok=True)
+                    moved += 1
+            if progress is not None:
+                progress(moved, len(misplaced))
+        return moved
+
+    def _sharded_path(self, name: str) -> Path:
+        key = name.split(".", 1)[0]
+        prefix = key[:self.depth * SHARD_WIDTH]
+        if len(prefix) < self.depth * SHARD_WIDTH or not prefix.isalnum() or not prefix.isascii():
+            return self.root / name
+        shards = [prefix[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(self.depth)]
+        return self.root.joinpath(*shards, name)
+
+    @staticmethod
+    def _is_shard(name: str) -> bool:
+        return len(name) == SHARD_WIDTH and name.isalnum() and name.isascii()
+
+    @staticmethod
+    def _scandir(directory) -> list:
+        try:
+            with os.scandir(directory) as entries:
+                return list(entries)
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+
+def layout_for(root: Path, suffix: str = "", directories: bool = False) -> StorageLayout:
+    """
+    StorageLayout for a storage root using the configured layout settings
+    """
+    return StorageLayout(
+        root,
+        sharded=settings.storage_layout == "sharded",
+        depth=settings.storage_shard_depth,
+        suffix=suffix,
+        directories=directories
+    )
+
+
+# Stored MP4s (uploads and derivatives keep their layouts in their own services)
+video_layout = layout_for(Path(settings.video_storage_path), suffix=".mp4")
@@ -0,0 +1,241 @@
+import hashlib
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from app.config import get_settings
+from app.services.cache import LRUCache
+from app.services.storage_layout import layout_for
+
+settings = get_settings()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    image_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images (sha256);
+
+CREATE TABLE IF NOT EXISTS store_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Legacy uploads were stored as {uuid}.{ext}
+LEGACY_UPLOAD = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.(png|jpe?g)$")
+
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded reference images
+
+    Blobs are stored once per SHA-256 as {sha256}.{ext} (sharded by hash
+    prefix, see StorageLayout), so re-uploading an identical image costs
+    no extra disk. An SQLite index maps each
+    image_id to its blob (replacing the directory glob), and a bounded LRU
+    cache keeps recently used image bytes in memory so repeated
+    generations from the same image skip the disk entirely.
+    """
+
+    def __init__(self, upload_dir: str, db_path: str, cache_bytes: int):
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(exist_ok=True)
+        self.layout = layout_for(self.upload_dir)
+        self.db_path = Path(db_path)
+        self._conn = None
+        self._lock = threading.Lock()
+        self._cache = LRUCache(cache_bytes)  # sha256 -> image bytes
+
+    def open(self):
+        """
+        Open the index and adopt any legacy {uuid}.{ext} uploads (once)
+
+        Returns:
+            Number of legacy uploads adopted
+        """
+        if self._conn is not None:
+            return 0
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        return self._adopt_legacy_uploads()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def temp_path(self, image_id: str) -> Path:
+        """
+        Path an in-progress upload should be streamed to
+        """
+        return self.upload_dir / f".{image_id}.part"
+
+    def add(self, image_id: str, tmp_path: Path, sha256: str, extension: str, size: int) -> dict:
+        """
+        Commit a fully written upload under image_id
+
+        If a blob with the same content already exists the temp file is
+        discarded; otherwise it is atomically renamed into place.
+
+        Returns:
+            The index record for image_id
+        """
+        filename = f"{sha256}.{extension}"
+        record = {
+            "image_id": image_id,
+            "sha256": sha256,
+            "filename": filename,
+            "mime_type": mimetypes.guess_type(filename)[0] or "image/jpeg",
+            "size": size,
+            "created_at": time.time(),
+        }
+        # Under the lock so remove_blob cannot delete the blob between the check and the insert
+        with self._lock:
+            if self.layout.locate(filename).exists():
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.layout.prepare(filename))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (image_id, sha256, filename, mime_type, size, created_at) "
+                "VALUES (:image_id, :sha256, :filename, :mime_type, :size, :created_at)",
+                record
+            )
+        return record
+
+    def resolve(self, image_id: str):
+        """
+        Look up an image_id in the index
+
+        Returns:
+            Index record dict (image_id, sha256, filename, mime_type, size,
+            created_at), or None if unknown or its blob is gone
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT image_id, sha256, filename, mime_type, size, created_at FROM images WHERE image_id = ?",
+                (image_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(("image_id", "sha256", "filename", "mime_type", "size", "created_at"), row))
+        if record["sha256"] not in self._cache and not self.blob_path(record).exists():
+            return None
+        return record
+
+    def records(self) -> list:
+        """
+        Return every index record (see resolve), oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT image_id, sha256, filename, mime_type, size, created_at FROM images ORDER BY created_at"
+            ).fetchall()
+        return [dict(zip(("image_id", "sha256", "filename", "mime_type", "size", "created_at"), row)) for row in rows]
+
+    def remove(self, image_ids: list) -> list:
+        """
+        Drop image_ids from the index, deleting blobs nothing references any more
+
+        Returns:
+            File names of the deleted blobs
+        """
+        with self._lock:
+            filenames = {
+                row[0] for image_id in image_ids
+                for row in self._conn.execute("SELECT filename FROM images WHERE image_id = ?", (image_id,))
+            }
+            self._conn.executemany("DELETE FROM images WHERE image_id = ?", [(image_id,) for image_id in image_ids])
+        return [filename for filename in sorted(filenames) if self.remove_blob(filename)]
+
+    def remove_blob(self, filename: str) -> bool:
+        """
+        Delete a blob file unless an index record still points at it
+
+        Returns:
+            True if the file was deleted
+        """
+        with self._lock:
+            referenced = self._conn.execute(
+                "SELECT 1 FROM images WHERE filename = ? LIMIT 1", (filename,)
+            ).fetchone()
+            if referenced:
+                return False
+            try:
+                self.layout.locate(filename).unlink()
+            except FileNotFoundError:
+                return False
+        self._cache.pop(Path(filename).stem)
+        return True
+
+    def blob_path(self, record: dict) -> Path:
+        return self.layout.locate(record["filename"])
+
+    def load_image(self, image_id: str):
+        """
+        Return (image_bytes, mime_type, sha256) for an image_id
+
+        Served from the LRU cache when possible. Blocking on a cache miss.
+
+        Raises:
+            FileNotFoundError: If the image_id is unknown
+        """
+        record = self.resolve(image_id)
+        if record is None:
+            raise FileNotFoundError(f"Image {image_id} not found")
+
+        image_bytes = self._cache.get(record["sha256"])
+        if image_bytes is None:
+            with open(self.blob_path(record), "rb") as f:
+                image_bytes = f.read()
+            self._cache.put(record["sha256"], image_bytes, size=len(image_bytes))
+
+        return image_bytes, record["mime_type"], record["sha256"]
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def _adopt_legacy_uploads(self) -> int:
+        """
+        Move legacy {uuid}.{ext} uploads into content-addressed blobs
+
+        The uuid stays valid as an image_id; duplicates collapse onto one blob.
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM store_info WHERE key = 'legacy_adopted'"
+            ).fetchone()
+        if done:
+            return 0
+
+        adopted = 0
+        for path in sorted(self.upload_dir.iterdir()):
+            if not path.is_file() or not LEGACY_UPLOAD.match(path.name):
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            extension = path.suffix.lstrip(".").lower()
+            self.add(path.stem, path, digest.hexdigest(), extension, path.stat().st_size)
+            adopted += 1
+
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO store_info (key, value) VALUES ('legacy_adopted', '1')")
+        return adopted
+
+
+# Singleton instance
+upload_store = UploadStore(settings.upload_storage_path, settings.upload_db_path, settings.upload_cache_bytes)
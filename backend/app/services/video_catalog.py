@@ -0,0 +1,393 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from app.config import get_settings
+from app.services.metadata_store import metadata_store
+from app.services.shared_state import shared_state
+from app.services.storage_layout import video_layout
+from app.services.media_response import file_version
+from app.services.derivatives import derivative_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class VideoCatalog:
+    """
+    In-memory index of stored videos behind /api/videos and /api/library
+
+    Loaded once at startup from the MP4s on disk and their rows in the
+    metadata store, then kept current by incremental updates from the
+    generation, delete and visibility paths, plus a periodic mtime rescan
+    that picks up out-of-band changes to the storage directory. With a
+    shared state backend, every change is also appended to the shared
+    "catalog" log so the other workers re-index the same video.
+    Entries are kept in newest-first order (one list for all videos, one
+    for public videos) so listings never touch the disk.
+    """
+
+    def __init__(self, storage_path: str):
+        self.storage_path = Path(storage_path)
+        self._lock = threading.Lock()
+        self._entries = {}  # video_id -> video data dict
+        self._signatures = {}  # video_id -> mp4 mtime when indexed
+        self._order = []  # Sorted (-created_at, video_id) for all videos
+        self._public_order = []  # Sorted (-created_at, video_id) for public videos
+        self._dir_mtimes = None  # Storage and shard directory mtimes at the last rescan
+        self._watcher_task = None
+        self._entry_digests = {}  # video_id -> digest of its indexed entry
+        self._digest = 0  # XOR of every entry digest (see etag)
+        self.version = 0  # Incremented on every change
+        self._sync_cursor = 0  # Position in the shared "catalog" log
+        # One writer thread keeps announcements ordered and off the event loop
+        self._announcer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-announce")
+
+    def load(self) -> int:
+        """
+        Build the index from a full scan of the storage directory
+
+        Returns:
+            Number of videos indexed
+        """
+        with self._lock:
+            self._entries.clear()
+            self._signatures.clear()
+            self._entry_digests.clear()
+            self._digest = 0
+            self._order.clear()
+            self._public_order.clear()
+        if shared_state.shared:
+            self._sync_cursor, _ = shared_state.read_since("catalog", self._sync_cursor)
+        self.rescan(force=True)
+        return len(self._entries)
+
+    def upsert(self, video_id: str):
+        """
+        (Re)index a single video from its MP4 and metadata sidecar
+        """
+        self._reindex(video_id)
+        self._announce(video_id)
+
+    def _reindex(self, video_id: str):
+        video_file = video_layout.locate(f"{video_id}.mp4")
+        loaded = self._read_entry(video_file)
+        with self._lock:
+            self._remove_locked(video_id)
+            if loaded is not None:
+                entry, signature = loaded
+                self._insert_locked(entry, signature)
+            self.version += 1
+
+    def remove(self, video_id: str):
+        """
+        Drop a video from the index
+        """
+        with self._lock:
+            if self._remove_locked(video_id):
+                self.version += 1
+        self._announce(video_id)
+
+    def set_public(self, video_id: str, is_public: bool):
+        """
+        Update a video's visibility without re-reading it from disk
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                return
+            signature = self._signatures[video_id]
+            self._remove_locked(video_id)
+            self._insert_locked({**entry, "is_public": is_public}, signature)
+            self.version += 1
+        self._announce(video_id)
+
+    def _announce(self, video_id: str):
+        # Tell the other workers to re-index this video (route handlers call
+        # this on the event loop, so the shared-state round-trip is queued)
+        if shared_state.shared:
+            self._announcer.submit(self._send_announcement, video_id)
+
+    @staticmethod
+    def _send_announcement(video_id: str):
+        try:
+            shared_state.append("catalog", video_id)
+        except Exception:
+            logger.exception("Could not announce catalog change for %s", video_id)
+
+    def sync(self) -> int:
+        """
+        Re-index videos other workers changed since the last sync (blocking)
+
+        Returns:
+            Number of videos re-indexed
+        """
+        self._sync_cursor, video_ids = shared_state.read_since("catalog", self._sync_cursor)
+        for video_id in set(video_ids):
+            self._reindex(video_id)
+        return len(set(video_ids))
+
+    def get(self, video_id: str):
+        """
+        Return the indexed data for one video, or None
+        """
+        return self._entries.get(video_id)
+
+    def list_videos(self) -> list:
+        """
+        All videos, newest first
+        """
+        with self._lock:
+            return [self._entries[video_id] for _, video_id in self._order]
+
+    def list_public(self) -> list:
+        """
+        Public videos, newest first
+        """
+        with self._lock:
+            return [self._entries[video_id] for _, video_id in self._public_order]
+
+    def query(
+        self,
+        public_only: bool = False,
+        filters: dict = None,
+        cursor: tuple = None,
+        limit: int = 50,
+        created_from: float = None,
+        created_to: float = None
+    ):
+        """
+        Return one page of videos, newest first, using keyset pagination
+
+        Args:
+            public_only: Only consider public videos
+            filters: Exact-match conditions on entry fields (e.g. {"resolution": "720p"})
+            cursor: (created_at, video_id) of the last item of the previous page
+            limit: Maximum number of items to return
+            created_from: Only videos created at or after this timestamp
+            created_to: Only videos created at or before this timestamp
+
+        Returns:
+            (items, next_cursor) where next_cursor is None on the last page
+        """
+        filters = filters or {}
+        with self._lock:
+            order = self._public_order if public_only else self._order
+
+            # Jump straight to the first candidate key
+            start = 0
+            if cursor is not None:
+                start = bisect.bisect_right(order, (-cursor[0], cursor[1]))
+            if created_to is not None:
+                start = max(start, bisect.bisect_left(order, (-created_to, "")))
+
+            items = []
+            next_cursor = None
+            for index in range(start, len(order)):
+                negative_created_at, video_id = order[index]
+                if created_from is not None and -negative_created_at < created_from:
+                    break
+                entry = self._entries[video_id]
+                if any(entry.get(field) != value for field, value in filters.items()):
+                    continue
+                if len(items) == limit:
+                    last = items[-1]
+                    next_cursor = (last["created_at"], last["id"])
+                    break
+                items.append(entry)
+
+        return items, next_cursor
+
+    @property
+    def etag(self) -> str:
+        """
+        Opaque tag that changes whenever the catalog's contents change
+
+        Derived from the indexed entries themselves rather than a local
+        counter, so every worker that has applied the same changes (from
+        the shared "catalog" log, its own updates and rescans) reports the
+        same tag, as does a restarted one. Kept up to date incrementally
+        as entries are inserted and removed.
+        """
+        return f"{self._digest:016x}"
+
+    def rescan(self, force: bool = False) -> bool:
+        """
+        Reconcile the index with the storage directory
+
+        Skipped unless the mtime of the storage directory or one of its
+        shard directories changed (or force is set). New, removed and
+        modified files are detected by comparing each video's MP4 mtime
+        with the value recorded when it was indexed.
+
+        Returns:
+            True if the index changed
+        """
+        if not self.storage_path.exists():
+            return False
+
+        dir_mtimes = video_layout.directory_mtimes()
+        if not force and dir_mtimes == self._dir_mtimes:
+            return False
+        self._dir_mtimes = dir_mtimes
+
+        on_disk = {entry.name[:-len(".mp4")]: Path(entry.path) for entry in video_layout.entries()}
+        changed = False
+
+        with self._lock:
+            known = set(self._entries)
+
+        # Every worker rescans on its own, so these changes are not announced
+        for video_id in known - set(on_disk):
+            self._reindex(video_id)
+            changed = True
+
+        for video_id, video_file in on_disk.items():
+            if self._signatures.get(video_id) == self._signature(video_file):
+                continue
+            self._reindex(video_id)
+            changed = True
+
+        return changed
+
+    def start_watcher(self):
+        """
+        Start the periodic background rescan (catalog_rescan_interval seconds)
+        """
+        if self._watcher_task is None or self._watcher_task.done():
+            self._watcher_task = asyncio.create_task(self._watch_loop())
+
+    async def stop_watcher(self):
+        """
+        Cancel the background rescan
+        """
+        if self._watcher_task is None:
+            return
+        self._watcher_task.cancel()
+        try:
+            await self._watcher_task
+        except asyncio.CancelledError:
+            pass
+        self._watcher_task = None
+
+    async def _watch_loop(self):
+        interval = settings.catalog_rescan_interval
+        if shared_state.shared:
+            interval = min(interval, settings.shared_state_sync_interval)
+        last_rescan = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if shared_state.shared:
+                    await asyncio.to_thread(self.sync)
+                if time.monotonic() - last_rescan >= settings.catalog_rescan_interval:
+                    last_rescan = time.monotonic()
+                    await asyncio.to_thread(self.rescan)
+            except Exception as e:
+                logger.exception("Catalog rescan failed")
+
+    def _signature(self, video_file: Path):
+        try:
+            return video_file.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _read_entry(self, video_file: Path):
+        """
+        Build the list_videos entry for one MP4
+
+        Metadata comes from the metadata store; a legacy sidecar dropped into
+        the storage directory is imported on the fly. created_at is the
+        metadata row's, since the file's ctime moves whenever the MP4 is
+        re-linked or rewritten (migrate-layout, remux-videos); ctime is only
+        used for files without metadata.
+
+        Returns:
+            (entry, signature), or None if the MP4 no longer exists
+        """
+        signature = self._signature(video_file)
+        if signature is None:
+            return None
+        stat = video_file.stat()
+        video_id = video_file.stem
+
+        metadata = metadata_store.get(video_id)
+        if metadata is None:
+            metadata_path = self.storage_path / f"{video_id}.json"
+            if metadata_path.exists():
+                metadata = metadata_store.read_sidecar(metadata_path)
+                if metadata is not None:
+                    metadata_store.put(metadata)
+
+        entry = {
+            "id": video_id,
+            "filename": video_file.name,
+            "size": stat.st_size,
+            "version": file_version(stat),  # ?v= of the immutable video URL
+            "poster_version": self._derivative_version(video_id, "poster"),
+            "preview_version": self._derivative_version(video_id, "preview"),
+            "created_at": (metadata or {}).get("created_at") or stat.st_ctime,
+            "modified_at": stat.st_mtime,
+            "has_image": False,
+            "is_public": False  # Videos without metadata are private, as new ones are
+        }
+
+        # Add metadata if available
+        if metadata:
+            entry["prompt"] = metadata.get("prompt")
+            entry["negative_prompt"] = metadata.get("negative_prompt")
+            entry["resolution"] = metadata.get("resolution")
+            entry["duration"] = metadata.get("duration")
+            entry["aspect_ratio"] = metadata.get("aspect_ratio")
+            entry["has_image"] = metadata.get("has_image", False)
+            entry["is_public"] = metadata.get("is_public", False)
+            entry["media"] = metadata.get("media")
+
+        return entry, signature
+
+    @staticmethod
+    def _derivative_version(video_id: str, kind: str):
+        # ?v= of the poster / preview URL, None until it is generated
+        try:
+            return file_version(derivative_service.path(video_id, kind).stat())
+        except FileNotFoundError:
+            return None
+
+    def _insert_locked(self, entry: dict, signature):
+        video_id = entry["id"]
+        key = (-entry["created_at"], video_id)
+        self._entries[video_id] = entry
+        self._signatures[video_id] = signature
+        digest = self._entry_digest(entry)
+        self._entry_digests[video_id] = digest
+        self._digest ^= digest
+        bisect.insort(self._order, key)
+        if entry.get("is_public"):
+            bisect.insort(self._public_order, key)
+
+    def _remove_locked(self, video_id: str) -> bool:
+        entry = self._entries.pop(video_id, None)
+        if entry is None:
+            return False
+        self._signatures.pop(video_id, None)
+        self._digest ^= self._entry_digests.pop(video_id)
+        key = (-entry["created_at"], video_id)
+        for order in (self._order, self._public_order):
+            index = bisect.bisect_left(order, key)
+            if index < len(order) and order[index] == key:
+                del order[index]
+        return True
+
+    @staticmethod
+    def _entry_digest(entry: dict) -> int:
+        encoded = json.dumps(entry, sort_keys=True, default=str).encode()
+        return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), "big")
+
+
+# Singleton instance
+video_catalog = VideoCatalog(settings.video_storage_path)
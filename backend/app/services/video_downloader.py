@@ -0,0 +1,336 @@
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import httpx
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".part"
+MAX_REDIRECTS = 5
+API_KEY_HEADER = "x-goog-api-key"
+
+
+class DownloadError(Exception):
+    """
+    A video could not be downloaded completely and intact
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _PartialFile:
+    """
+    A .part file plus running hashes of exactly the bytes it holds
+
+    offset and the hashes advance together after each chunk is written,
+    so a stream that fails mid-body leaves a consistent resume point.
+    """
+
+    def __init__(self, path: Path, chunk_size: int):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.sha256 = hashlib.sha256()
+        self.md5 = hashlib.md5()
+
+    def resume(self) -> int:
+        """
+        Re-hash bytes left by an earlier attempt or process
+
+        Returns:
+            Bytes already downloaded
+        """
+        if self.path.exists():
+            with open(self.path, "rb") as file:
+                while chunk := file.read(self.chunk_size):
+                    self._advance(chunk)
+        return self.offset
+
+    def append(self, chunks):
+        """
+        Write chunks after the current offset
+
+        Anything past the offset (e.g. half of a chunk whose write failed)
+        is truncated away first. Flushed and fsynced even on failure.
+        """
+        with open(self.path, "r+b" if self.path.exists() else "wb") as file:
+            file.seek(self.offset)
+            file.truncate()
+            try:
+                for chunk in chunks:
+                    file.write(chunk)
+                    self._advance(chunk)
+            finally:
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _advance(self, chunk):
+        self.sha256.update(chunk)
+        self.md5.update(chunk)
+        self.offset += len(chunk)
+
+
+class VideoDownloader:
+    """
+    Stream generated videos to disk in fixed-size chunks
+
+    Bytes go straight from the response to a .part file in a hidden
+    directory next to the videos, so memory per download is one chunk and
+    the catalog (which only scans *.mp4) never sees an incomplete file.
+    SHA-256 and MD5 are computed while writing; a failed attempt is
+    retried with an HTTP Range request from the last written byte. Part
+    files are keyed by operation, so a download interrupted by a restart
+    resumes too. The caller publishes the finished file with commit(),
+    an atomic rename on the same filesystem.
+    """
+
+    def __init__(self, storage_path: Path, chunk_size: int, max_attempts: int, timeout: float):
+        self.partial_dir = Path(storage_path) / ".partial"
+        self.chunk_size = chunk_size
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self._http = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.resumed = 0
+        self.bytes_written = 0
+
+    def partial_path(self, key: str) -> Path:
+        """
+        .part file for a download key (e.g. the operation id)
+        """
+        return self.partial_dir / f"{hashlib.sha1(key.encode()).hexdigest()}{PARTIAL_SUFFIX}"
+
+    def download(self, video, key: str) -> dict:
+        """
+        Download a generated video into its .part file
+
+        Blocking; runs on the download lane.
+
+        Args:
+            video: types.Video from the finished operation (uri and/or video_bytes)
+            key: Stable identifier used to name (and resume) the part file
+
+        Returns:
+            Dict with path (the .part file), size and sha256
+        """
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        part_path = self.partial_path(key)
+
+        if getattr(video, "uri", None):
+            size, sha256 = self._stream(video.uri, part_path)
+        elif getattr(video, "video_bytes", None):
+            # Inline result: the SDK already holds the bytes, only the write is chunked
+            size, sha256 = self._write_bytes(video.video_bytes, part_path)
+        else:
+            raise DownloadError("Generated video has neither a download URI nor inline bytes", retryable=False)
+
+        self.completed += 1
+        return {"path": part_path, "size": size, "sha256": sha256}
+
+    def commit(self, part_path: Path, destination: Path):
+        """
+        Atomically move a finished .part file to its final name
+        """
+        os.replace(part_path, destination)
+        self._fsync_directory(destination.parent)
+
+    def discard(self, key: str):
+        """
+        Drop the part file for a download that will not be resumed
+        """
+        self.partial_path(key).unlink(missing_ok=True)
+
+    def purge_stale(self, max_age: float) -> int:
+        """
+        Remove part files untouched for max_age seconds
+
+        Returns:
+            Number of files removed
+        """
+        if not self.partial_dir.exists():
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for part_path in self.partial_dir.glob(f"*{PARTIAL_SUFFIX}"):
+            try:
+                if part_path.stat().st_mtime < cutoff:
+                    part_path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "resumed": self.resumed,
+            "bytes_written": self.bytes_written,
+            "partial_files": len(list(self.partial_dir.glob(f"*{PARTIAL_SUFFIX}"))) if self.partial_dir.exists() else 0
+        }
+
+    def _client(self) -> httpx.Client:
+        # One pooled client shared by the download lane threads
+        with self._lock:
+            if self._http is None:
+                # Redirects are followed by _open, which keeps the API key on its origin
+                self._http = httpx.Client(
+                    timeout=httpx.Timeout(self.timeout, connect=10.0),
+                    follow_redirects=False
+                )
+            return self._http
+
+    @contextmanager
+    def _open(self, url: str, headers: dict):
+        """
+        Streamed GET of url, following redirects by hand
+
+        httpx only strips Authorization on a cross-origin redirect, so with
+        automatic redirects the x-goog-api-key header would be forwarded to
+        whatever host the file URI redirects to. Once a redirect leaves the
+        original origin (scheme, host and port) the key is dropped for the
+        rest of the chain; other headers (e.g. Range) are kept.
+        """
+        client = self._client()
+        origin = httpx.URL(url)
+        request = client.build_request("GET", url, headers=headers)
+        for _ in range(MAX_REDIRECTS + 1):
+            response = client.send(request, stream=True)
+            if not response.is_redirect:
+                break
+            location = response.url.join(response.headers["location"])
+            response.close()
+            if (location.scheme, location.host, location.port) != (origin.scheme, origin.host, origin.port):
+                headers = {name: value for name, value in headers.items() if name != API_KEY_HEADER}
+            request = client.build_request("GET", location, headers=headers)
+        else:
+            raise DownloadError(f"Video download redirected more than {MAX_REDIRECTS} times", retryable=False)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def _stream(self, url: str, part_path: Path):
+        """
+        GET url into part_path, resuming from the bytes already on disk
+
+        Returns:
+            (size, sha256 hex digest)
+        """
+        partial = _PartialFile(part_path, self.chunk_size)
+        if partial.resume():
+            self.resumed += 1
+        expected_md5 = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                headers = {API_KEY_HEADER: settings.gemini_api_key}
+                if partial.offset:
+                    headers["range"] = f"bytes={partial.offset}-"
+                with self._open(url, headers) as response:
+                    if response.status_code == 416 and partial.offset:
+                        # Everything was already written before the interruption
+                        break
+                    if response.status_code >= 400:
+                        raise DownloadError(
+                            f"Video download returned HTTP {response.status_code}",
+                            retryable=response.status_code in (408, 429) or response.status_code >= 500
+                        )
+                    if partial.offset and response.status_code != 206:
+                        # Range ignored: start over from the first byte
+                        partial.reset()
+                    total = self._total_size(response, partial.offset)
+                    expected_md5 = self._header_md5(response) or expected_md5
+                    before = partial.offset
+                    try:
+                        partial.append(response.iter_bytes(self.chunk_size))
+                    finally:
+                        self.bytes_written += partial.offset - before
+                if total is not None and partial.offset != total:
+                    raise DownloadError(f"Video download stopped at {partial.offset} of {total} bytes")
+                break
+            except (httpx.TransportError, DownloadError) as e:
+                if (isinstance(e, DownloadError) and not e.retryable) or attempt == self.max_attempts:
+                    raise
+                logger.warning(
+                    "Download attempt %d/%d failed at byte %d: %s; retrying",
+                    attempt, self.max_attempts, partial.offset, e
+                )
+                time.sleep(min(2 ** attempt, 30))
+
+        if expected_md5 is not None and partial.md5.digest() != expected_md5:
+            part_path.unlink(missing_ok=True)
+            raise DownloadError("Downloaded video failed its MD5 check", retryable=False)
+        return partial.offset, partial.sha256.hexdigest()
+
+    def _write_bytes(self, data: bytes, part_path: Path):
+        partial = _PartialFile(part_path, self.chunk_size)
+        view = memoryview(data)
+        partial.append(view[start:start + self.chunk_size] for start in range(0, len(view), self.chunk_size))
+        self.bytes_written += partial.offset
+        return partial.offset, partial.sha256.hexdigest()
+
+    @staticmethod
+    def _total_size(response, offset: int):
+        """
+        Full object size from Content-Range (206) or Content-Length (200)
+        """
+        content_range = response.headers.get("content-range")
+        if content_range:
+            match = re.search(r"/(\d+)$", content_range)
+            return int(match.group(1)) if match else None
+        length = response.headers.get("content-length")
+        return offset + int(length) if length and "content-encoding" not in response.headers else None
+
+    @staticmethod
+    def _header_md5(response):
+        # x-goog-hash: crc32c=...,md5=<base64>, describing the whole object
+        for item in response.headers.get("x-goog-hash", "").split(","):
+            name, _, value = item.strip().partition("=")
+            if name == "md5" and value:
+                try:
+                    return base64.b64decode(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+# Global downloader instance
+video_downloader = VideoDownloader(
+    storage_path=Path(settings.video_storage_path),
+    chunk_size=settings.download_chunk_size,
+    max_attempts=settings.download_max_attempts,
+    timeout=settings.download_timeout
+)
@@ -1,61 +1,342 @@
 import os
 import time
+import asyncio
 import uuid
 import mimetypes
 import base64
 import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from google import genai
 from google.genai import types
 from app.config import get_settings
+from app.services.executor import blocking_executor
+from app.services.operation_journal import OperationJournal
+from app.services.video_catalog import video_catalog
+from app.services.metadata_store import metadata_store
+from app.services.upload_store import upload_store
+from app.services.cache import LRUCache
+from app.services.ai_clients import ai_clients
+from app.services.event_bus import status_events
+from app.services.video_downloader import video_downloader
+from app.services.derivatives import derivative_service
+from app.services.storage_layout import video_layout
+from app.services import mp4
+from app.services.metrics import (
+    veo_submit_seconds, queue_wait_seconds, operation_seconds, download_seconds, download_bytes
+)
+from app.services.job_queue import GenerationQueue, is_quota_error
+from app.services.shared_state import shared_state, leader_election
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Error for jobs found mid-submit on replay (never retried automatically)
+SUBMIT_INTERRUPTED_ERROR = (
+    "Video generation was interrupted while being submitted and was not retried, "
+    "because it may already be running upstream. Check for a duplicate before resubmitting."
+)
 
 
 class VideoGenerationService:
     """Service for handling Veo 3.1 video generation"""
 
     def __init__(self):
-        self.client = genai.Client(api_key=settings.gemini_api_key)
+        self.client = ai_clients.video_client
         self.storage_path = Path(settings.video_storage_path)
         self.storage_path.mkdir(exist_ok=True)
         self.operations = {}  # Store operation states in-memory
+        self._poller_task = None  # Background refresh loop (see start_poller)
+        self._downloads = {}  # operation_id -> task downloading its finished video
+        self.journal = OperationJournal(settings.operation_journal_path, settings.journal_flush_interval)
+
+        # Generation result cache: request fingerprint -> video_id
+        self.result_cache = LRUCache(settings.generation_cache_max_entries, ttl=settings.generation_cache_ttl)
+        self._inflight = {}  # fingerprint -> Future resolving to the upstream operation_id
+        self.cache_counters = {"hits": 0, "misses": 0, "coalesced": 0}
+
+        # Admission queue in front of the Veo API (see start_dispatcher)
+        self.queue = GenerationQueue(settings.queue_backoff_initial, settings.queue_backoff_max)
+        self._dispatcher_task = None
+        self._dispatch_wakeup = asyncio.Event()
+        self._submitting = set()  # Submit tasks currently calling generate_videos
+        self.batches = {}  # batch_id -> {"created_at", "operation_ids"}
+
+        # Multi-worker mode: the leader owns the queue, poller and downloads;
+        # every worker mirrors operation records into shared_state
+        self._share_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._jobs_cursor = 0  # Position in the shared "jobs" log adopted so far
+        self._leading = False  # Leadership as of the last dispatcher tick
+        self._queue_snapshot_nonempty = False
 
     async def generate_video(
         self,
-        image_path: str,
+        image_id: str,
         prompt: str,
         negative_prompt: str = None,
         resolution: str = "720p",
         duration: int = 8,
-        aspect_ratio: str = "16:9"
+        aspect_ratio: str = "16:9",
+        priority: int = 0,
+        batch_id: str = None,
+        batch_index: int = None
     ) -> str:
         """
-        Initiate video generation and return operation ID
+        Queue a video generation and return its operation ID
+
+        The job is submitted to Veo by the dispatcher once an upstream slot
+        is free (see start_dispatcher); until then its status is "queued".
 
         Args:
-            image_path: Path to the uploaded image file
+            image_id: Optional uploaded image ID (see upload_store)
             prompt: Text description for video generation
             negative_prompt: Optional elements to exclude
             resolution: "720p" or "1080p"
             duration: 4, 6, or 8 seconds
             aspect_ratio: "16:9" or "9:16"
+            priority: Higher values are dispatched first
+            batch_id: Batch this job belongs to (see generate_batch)
+            batch_index: Position of the job within its batch
 
         Returns:
             operation_id: Unique ID for polling status
         """
 
+        metadata = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "resolution": resolution,
+            "duration": duration,
+            "aspect_ratio": aspect_ratio,
+            "has_image": image_id is not None,
+            "image_id": image_id,
+            "priority": priority,
+            "is_public": False  # Default to private, can be changed later
+        }
+        if batch_id is not None:
+            metadata["batch_id"] = batch_id
+            metadata["batch_index"] = batch_index
+
+        # Opt-in generation cache: reuse a finished video or join a pending operation
+        if settings.generation_cache_enabled:
+            fingerprint = self.fingerprint(metadata)
+            metadata["fingerprint"] = fingerprint
+
+            cached_operation_id = self._cached_operation(fingerprint, metadata)
+            if cached_operation_id:
+                return cached_operation_id
+
+            if fingerprint in self._inflight:
+                pending_operation_id = await asyncio.shield(self._inflight[fingerprint])
+                # Another worker may have finished (or failed) it meanwhile
+                pending_op = await self._load(pending_operation_id)
+                if pending_op is not None and not pending_op.get("error"):
+                    self.cache_counters["coalesced"] += 1
+                    return pending_operation_id
+                del self._inflight[fingerprint]
+
+            self.cache_counters["misses"] += 1
+
+        # Generate unique operation ID and queue the job
+        operation_id = str(uuid.uuid4())
+        started_at = time.time()
+        self.operations[operation_id] = {
+            "operation": None,
+            "status": "queued",
+            "started_at": started_at,
+            "video_id": None,
+            "poll_interval": settings.poll_interval_min,
+            "next_poll_at": started_at,
+            "poll_errors": 0,
+            "metadata": metadata
+        }
+        self._record(operation_id, self.operations[operation_id], detail="queued", announce=True)
+        if self.authoritative:
+            self._enqueue(operation_id, priority)
+
+        if settings.generation_cache_enabled:
+            pending = asyncio.get_running_loop().create_future()
+            pending.set_result(operation_id)
+            self._inflight[metadata["fingerprint"]] = pending
+
+        return operation_id
+
+    async def generate_batch(self, items: list) -> str:
+        """
+        Queue a batch of generations under one batch ID
+
+        Every item goes through the same queue as single requests, so the
+        batch is submitted concurrently up to max_concurrent_operations.
+
+        Args:
+            items: List of generate_video keyword-argument dicts
+
+        Returns:
+            batch_id: ID for GET /api/batches/{batch_id}
+        """
+        batch_id = str(uuid.uuid4())
+        batch = {"created_at": time.time(), "operation_ids": []}
+        self.batches[batch_id] = batch
+        for index, item in enumerate(items):
+            operation_id = await self.generate_video(**item, batch_id=batch_id, batch_index=index)
+            batch["operation_ids"].append(operation_id)
+        if shared_state.shared:
+            self._share_writer.submit(
+                shared_state.set_json, f"batch:{batch_id}", batch, settings.journal_retention
+            )
+        return batch_id
+
+    async def batch_status(self, batch_id: str):
+        """
+        Aggregate progress and per-item status of a batch
+
+        Returns:
+            dict with counts per state, done, progress (0-1) and items,
+            or None if the batch is unknown
+        """
+        batch = self.batches.get(batch_id)
+        if batch is None and shared_state.shared:
+            batch = await asyncio.to_thread(shared_state.get_json, f"batch:{batch_id}")
+        if batch is None:
+            return None
+
+        counts = {"queued": 0, "processing": 0, "completed": 0, "failed": 0}
+        items = []
+        op_datas = await self._load_many(batch["operation_ids"])
+        for index, (operation_id, op_data) in enumerate(zip(batch["operation_ids"], op_datas)):
+            status = self._status(operation_id, op_data, estimate=False)
+            state = op_data["status"] if op_data else "failed"
+            counts[state if state in counts else "processing"] += 1
+            items.append({
+                "index": index,
+                "operation_id": operation_id,
+                "done": status["done"] or op_data is None,
+                "status": status["status"],
+                "video_url": status.get("video_url"),
+                "error": status.get("error"),
+                "queue_position": status.get("queue_position")
+            })
+
+        total = len(items)
+        finished = counts["completed"] + counts["failed"]
+        return {
+            "batch_id": batch_id,
+            "created_at": batch["created_at"],
+            "total": total,
+            **counts,
+            "done": finished == total,
+            "progress": round(finished / total, 4) if total else 1.0,
+            "items": items
+        }
+
+    def _enqueue(self, operation_id: str, priority: int, seq: int = None):
+        self.queue.push(operation_id, priority, seq)
+        self._dispatch_wakeup.set()
+
+    def fingerprint(self, metadata: dict) -> str:
+        """
+        Normalized fingerprint of a generation request
+
+        Covers the model, whitespace-normalized prompt and negative prompt,
+        resolution, duration, aspect ratio and the reference image's
+        content hash (so re-uploads of the same image still match).
+        """
+        image_sha256 = None
+        if metadata["image_id"]:
+            record = upload_store.resolve(metadata["image_id"])
+            image_sha256 = record["sha256"] if record else metadata["image_id"]
+
+        def normalize(text):
+            return " ".join(text.split()) if text else None
+
+        key = {
+            "model": settings.video_model,
+            "prompt": normalize(metadata["prompt"]),
+            "negative_prompt": normalize(metadata["negative_prompt"]),
+            "resolution": metadata["resolution"],
+            "duration": metadata["duration"],
+            "aspect_ratio": metadata["aspect_ratio"],
+            "image_sha256": image_sha256,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _cached_operation(self, fingerprint: str, metadata: dict):
+        """
+        Create an already-completed operation pointing at a cached video
+
+        Returns:
+            operation_id, or None on a cache miss (or if the video was deleted)
+        """
+        video_id = self.result_cache.get(fingerprint)
+        if video_id is None:
+            return None
+        if video_catalog.get(video_id) is None:
+            self.result_cache.pop(fingerprint)
+            return None
+
+        self.cache_counters["hits"] += 1
+        operation_id = str(uuid.uuid4())
+        now = time.time()
+        self.operations[operation_id] = {
+            "operation": None,
+            "status": "completed",
+            "started_at": now,
+            "video_id": video_id,
+            "poll_interval": settings.poll_interval_min,
+            "next_poll_at": now,
+            "poll_errors": 0,
+            "metadata": metadata
+        }
+        self._record(operation_id, self.operations[operation_id], detail="cache hit")
+        return operation_id
+
+    def _release_fingerprint(self, operation_id: str, op_data: dict):
+        """
+        Finish an operation's cache bookkeeping once it completes or fails
+        """
+        fingerprint = op_data["metadata"].get("fingerprint")
+        if not fingerprint:
+            return
+        pending = self._inflight.get(fingerprint)
+        if pending is not None and pending.done() and not pending.exception() and pending.result() == operation_id:
+            del self._inflight[fingerprint]
+        if op_data.get("video_id"):
+            self.result_cache.put(fingerprint, op_data["video_id"])
+
+    def cache_stats(self) -> dict:
+        """
+        Generation cache counters and size
+        """
+        return {
+            "enabled": settings.generation_cache_enabled,
+            "ttl": settings.generation_cache_ttl,
+            "entries": len(self.result_cache),
+            "in_flight": len(self._inflight),
+            **self.cache_counters
+        }
+
+    def _submit_generation(
+        self,
+        image_id: str,
+        prompt: str,
+        negative_prompt: str,
+        resolution: str,
+        duration: int,
+        aspect_ratio: str
+    ):
+        """
+        Build the Veo request and submit it (blocking; runs on the submit lane)
+
+        Returns:
+            The upstream operation returned by generate_videos
+        """
+
         # Handle optional image
         image_obj = None
-        if image_path:
-            # Read image file as bytes
-            with open(image_path, 'rb') as f:
-                image_bytes = f.read()
-
-            # Determine MIME type from file extension
-            mime_type, _ = mimetypes.guess_type(image_path)
-            if not mime_type:
-                mime_type = 'image/jpeg'  # Default fallback
+        if image_id:
+            # Image bytes and MIME type, usually straight from the LRU cache
+            image_bytes, mime_type, _ = upload_store.load_image(image_id)
 
             # Create Image object with proper structure for Veo 3.1
             image_obj = types.Image(
@@ -90,31 +371,14 @@ class VideoGenerationService:
             generate_params["image"] = image_obj
 
         # Call the Veo API
-        operation = self.client.models.generate_videos(**generate_params)
-
-        # Generate unique operation ID and store operation info
-        operation_id = str(uuid.uuid4())
-        self.operations[operation_id] = {
-            "operation": operation,
-            "status": "processing",
-            "started_at": time.time(),
-            "video_id": None,
-            "metadata": {
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "resolution": resolution,
-                "duration": duration,
-                "aspect_ratio": aspect_ratio,
-                "has_image": image_path is not None,
-                "is_public": False  # Default to private, can be changed later
-            }
-        }
-
-        return operation_id
+        return self.client.models.generate_videos(**generate_params)
 
     async def check_status(self, operation_id: str) -> dict:
         """
-        Check video generation status and download when ready
+        Report video generation status from the in-memory operation state
+
+        The background poller (see start_poller) owns all upstream refreshes
+        and downloads, so this never touches the Google API.
 
         Args:
             operation_id: The operation ID returned from generate_video
@@ -123,17 +387,18 @@ class VideoGenerationService:
             dict with keys: done, status, video_url (if done), error (if failed)
         """
 
+        return self._status(operation_id, await self._load(operation_id))
+
+    def _status(self, operation_id: str, op_data: dict, estimate: bool = True) -> dict:
         # Check if operation exists
-        if operation_id not in self.operations:
+        if op_data is None:
             return {
                 "done": False,
                 "status": "not_found",
                 "error": "Operation not found"
             }
 
-        op_data = self.operations[operation_id]
-
-        # If already completed, return cached result
+        # Completed - video already downloaded by the poller
         if op_data.get("video_id"):
             return {
                 "done": True,
@@ -141,7 +406,7 @@ class VideoGenerationService:
                 "video_url": f"/api/videos/{op_data['video_id']}"
             }
 
-        # If already failed, return cached error
+        # Failed - return cached error
         if op_data.get("error"):
             return {
                 "done": True,
@@ -149,88 +414,748 @@ class VideoGenerationService:
                 "error": op_data["error"]
             }
 
+        elapsed = time.time() - op_data["started_at"]
+        if op_data["status"] == "queued" and "queue_position" in op_data:
+            # Record mirrored from the leader (see _load)
+            return {
+                "done": False,
+                "status": f"queued ({int(elapsed)}s elapsed)",
+                "video_url": None,
+                "queue_position": op_data["queue_position"],
+                "estimated_start_at": op_data["estimated_start_at"] if estimate else None
+            }
+        if op_data["status"] == "queued":
+            position = self.queue.position(operation_id)
+            return {
+                "done": False,
+                "status": f"queued ({int(elapsed)}s elapsed)",
+                "video_url": None,
+                "queue_position": position,
+                "estimated_start_at": self._estimate_start(operation_id) if position and estimate else None
+            }
+        return {
+            "done": False,
+            "status": f"processing ({int(elapsed)}s elapsed)",
+            "video_url": None
+        }
+
+    def _estimate_start(self, operation_id: str):
+        running_since = [
+            op_data.get("submitted_at", op_data["started_at"])
+            for op_data in self.operations.values()
+            if op_data["status"] in ("submitting", "processing")
+        ]
+        return self.queue.estimate_start(
+            operation_id,
+            running_since,
+            settings.max_concurrent_operations,
+            settings.queue_default_run_seconds
+        )
+
+    async def status_event(self, operation_id: str) -> dict:
+        """
+        Current status of an operation as a push event
+
+        Returns:
+            check_status fields plus operation_id, event
+            ("progress", "completed", "failed" or "not_found") and elapsed seconds
+        """
+        return self._event(operation_id, await self._load(operation_id))
+
+    def _event(self, operation_id: str, op_data: dict) -> dict:
+        status = self._status(operation_id, op_data)
+        if op_data is None:
+            event = "not_found"
+        elif status["done"]:
+            event = status["status"]
+        else:
+            event = "progress"
+        return {
+            "operation_id": operation_id,
+            "event": event,
+            "elapsed": round(time.time() - op_data["started_at"], 1) if op_data else None,
+            **status
+        }
+
+    def _publish(self, operation_id: str):
+        """
+        Push an operation's current status to its watchers
+        """
+        status_events.publish(self._event(operation_id, self.operations.get(operation_id)))
+
+    @property
+    def authoritative(self) -> bool:
+        """
+        True when this worker's in-memory operations are the source of truth
+
+        Always true with the local backend; otherwise only on the leader.
+        """
+        return not shared_state.shared or leader_election.is_leader
+
+    def _record(self, operation_id: str, op_data: dict, detail: str = None, announce: bool = False):
+        """
+        Journal an operation's state and mirror it to the other workers
+
+        Args:
+            announce: Also append it to the shared "jobs" log so the
+                leader adopts it (new jobs submitted to any worker)
+        """
+        self.journal.record(operation_id, op_data, detail=detail)
+        if not shared_state.shared:
+            return
+        record = {
+            "status": op_data["status"],
+            "started_at": op_data["started_at"],
+            "submitted_at": op_data.get("submitted_at"),
+            "video_id": op_data.get("video_id"),
+            "error": op_data.get("error"),
+            "metadata": op_data["metadata"]
+        }
+        # One writer thread keeps updates ordered and off the event loop
+        self._share_writer.submit(shared_state.set_json, f"op:{operation_id}", record, settings.journal_retention)
+        if announce:
+            self._share_writer.submit(shared_state.append, "jobs", operation_id)
+
+    async def _load(self, operation_id: str):
+        return (await self._load_many([operation_id]))[0]
+
+    async def _load_many(self, operation_ids: list) -> list:
+        """
+        Operation entries for status answers
+
+        The authoritative worker answers from memory; other workers read
+        the leader's mirrored records (plus its queue snapshot for queued
+        jobs), falling back to their own copy for records not written yet.
+        """
+        if self.authoritative:
+            return [self.operations.get(operation_id) for operation_id in operation_ids]
+
+        keys = [f"op:{operation_id}" for operation_id in operation_ids]
+        *records, snapshot = await asyncio.to_thread(shared_state.get_many_json, keys + ["queue:snapshot"])
+        positions = (snapshot or {}).get("positions", {})
+        op_datas = []
+        for operation_id, record in zip(operation_ids, records):
+            if record is None:
+                op_datas.append(self.operations.get(operation_id))
+                continue
+            if record["status"] == "queued":
+                position, estimated_start_at = positions.get(operation_id, (None, None))
+                record["queue_position"] = position
+                record["estimated_start_at"] = estimated_start_at
+            op_datas.append(record)
+        return op_datas
+
+    def restore_operations(self) -> int:
+        """
+        Open the operation journal and replay it into memory
+
+        Pending operations are scheduled for an immediate refresh so the
+        poller resumes them; queued jobs go back into the queue in their
+        original order; recently finished ones are restored so their
+        status keeps answering after a restart (and re-seed the generation
+        cache). Old finished entries are compacted away first. Must be
+        called from the running event loop.
+
+        With a shared state backend only the elected leader replays; other
+        workers take over later if the leader goes away (see _take_over).
+
+        Returns:
+            Number of pending (queued or running) operations resumed
+        """
+        self.journal.open()
+        now = time.time()
+        self.journal.compact(before=now - settings.journal_retention)
+        if shared_state.shared:
+            self._leading = leader_election.refresh()
+            if not self._leading:
+                return 0
+        return self._replay_journal(overwrite=False)
+
+    def _replay_journal(self, overwrite: bool) -> int:
+        """
+        Load journaled operations into memory and re-queue the pending ones
+
+        Jobs journaled as "submitting" were interrupted mid-call and may
+        exist upstream, so they are marked failed (for review) instead of
+        being re-queued.
+
+        Args:
+            overwrite: Replace entries already in memory (on leader takeover,
+                when the local copies are stale mirrors)
+
+        Returns:
+            Number of pending (queued or running) operations resumed
+        """
+        now = time.time()
+        resumed = 0
+        interrupted = []
+        for row in self.journal.load(since=now - settings.journal_retention):
+            if row["operation_id"] in self.operations and not overwrite:
+                continue
+            if row["status"] == "processing" and not row["operation_name"]:
+                continue
+            if row["status"] == "submitting":
+                # The submit call may have been accepted (and billed) upstream
+                # before its operation name was journaled; never re-submit it
+                row["status"] = "failed"
+                row["error"] = SUBMIT_INTERRUPTED_ERROR
+                interrupted.append(row["operation_id"])
+            queued = row["status"] == "queued"
+            self.operations[row["operation_id"]] = {
+                "operation": None if queued else types.GenerateVideosOperation(name=row["operation_name"]),
+                "status": row["status"],
+                "started_at": row["started_at"],
+                "video_id": row["video_id"],
+                "error": row["error"],
+                "poll_interval": settings.poll_interval_min,
+                "next_poll_at": now,
+                "poll_errors": 0,
+                "metadata": row["metadata"]
+            }
+            if queued:
+                self._enqueue(row["operation_id"], row["metadata"].get("priority", 0))
+
+            # Rebuild batches from their members (rows come back in submit order)
+            batch_id = row["metadata"].get("batch_id")
+            if batch_id and row["operation_id"] not in self.batches.get(batch_id, {}).get("operation_ids", ()):
+                batch = self.batches.setdefault(batch_id, {"created_at": row["started_at"], "operation_ids": []})
+                batch["operation_ids"].append(row["operation_id"])
+            if row["status"] in ("queued", "processing"):
+                resumed += 1
+
+            # Re-seed the generation cache and in-flight map from the journal
+            fingerprint = row["metadata"].get("fingerprint")
+            if fingerprint and row["video_id"]:
+                self.result_cache.put(fingerprint, row["video_id"])
+            elif fingerprint and row["status"] in ("queued", "processing"):
+                pending = asyncio.get_running_loop().create_future()
+                pending.set_result(row["operation_id"])
+                self._inflight[fingerprint] = pending
+
+        for operation_id in interrupted:
+            self._record(operation_id, self.operations[operation_id], detail="submit interrupted; needs review")
+        if interrupted:
+            logger.warning(
+                "%d generation(s) were interrupted while being submitted and were not retried; "
+                "check the Veo console for duplicates before resubmitting: %s",
+                len(interrupted), ", ".join(interrupted)
+            )
+        return resumed
+
+    def close_journal(self):
+        """
+        Flush and close the operation journal
+        """
+        self.journal.close()
+
+    def close_shared_state(self):
+        """
+        Finish pending shared-state writes, hand over leadership and disconnect
+        """
+        self._share_writer.shutdown(wait=True)
+        leader_election.resign()
+        shared_state.close()
+
+    def start_poller(self):
+        """
+        Start the background task that refreshes pending operations
+
+        Must be called from a running event loop (the FastAPI startup hook).
+        """
+        if self._poller_task is None or self._poller_task.done():
+            self._poller_task = asyncio.create_task(self._poll_loop())
+
+    async def stop_poller(self):
+        """
+        Cancel the background poller and wait for it to exit
+        """
+        if self._poller_task is None:
+            return
+        self._poller_task.cancel()
+        try:
+            await self._poller_task
+        except asyncio.CancelledError:
+            pass
+        self._poller_task = None
+        # Let running downloads finish recording their result
+        await asyncio.gather(*self._downloads.values(), return_exceptions=True)
+
+    def start_dispatcher(self):
+        """
+        Start the background task that submits queued jobs to Veo
+
+        Must be called from a running event loop (the FastAPI startup hook).
+        """
+        if self._dispatcher_task is None or self._dispatcher_task.done():
+            self._dispatcher_task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop_dispatcher(self):
+        """
+        Cancel the dispatcher and wait for it to exit
+
+        Jobs still queued stay journaled as "queued" and resume on restart.
+        """
+        if self._dispatcher_task is None:
+            return
+        self._dispatcher_task.cancel()
+        try:
+            await self._dispatcher_task
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher_task = None
+
+    async def _dispatch_loop(self):
+        """
+        Dispatch queued jobs whenever a job arrives or an upstream slot frees up
+        """
+        while True:
+            self._dispatch_wakeup.clear()
+            try:
+                if shared_state.shared:
+                    await self._sync_leadership()
+                if self.authoritative:
+                    self.dispatch_pending()
+                    if shared_state.shared:
+                        await self._sync_shared_queue()
+            except Exception as e:
+                logger.exception("Dispatcher error")
+            try:
+                await asyncio.wait_for(self._dispatch_wakeup.wait(), timeout=settings.poller_tick_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _sync_leadership(self):
+        """
+        Renew or contest the leader lease and handle takeover / step-down
+        """
+        if leader_election.due():
+            await asyncio.to_thread(leader_election.refresh)
+        leading = leader_election.is_leader
+        if leading and not self._leading:
+            await self._take_over()
+        elif self._leading and not leading:
+            self._step_down()
+        self._leading = leading
+
+    async def _take_over(self):
+        """
+        Become the worker that queues, polls and downloads
+
+        Replays the journal (which every worker writes) over the stale local
+        copies and resumes the shared job log where the last leader stopped.
+        """
+        await asyncio.to_thread(self.journal.flush)
+        self._jobs_cursor = int(await asyncio.to_thread(shared_state.get, "jobs:adopted") or 0)
+        resumed = self._replay_journal(overwrite=True)
+        logger.info("%s took over as leader (%d pending operations resumed)", leader_election.owner, resumed)
+
+    def _step_down(self):
+        """
+        Stop dispatching after losing the lease; the new leader re-queues the jobs
+        """
+        while self.queue.pop() is not None:
+            pass
+        logger.warning("%s lost the leader lease; stopped dispatching", leader_election.owner)
+
+    async def _sync_shared_queue(self):
+        """
+        Leader side of multi-worker mode
+
+        Adopts jobs other workers appended to the shared "jobs" log and
+        publishes the queue snapshot (positions and estimated starts) that
+        other workers use to answer status requests.
+        """
+        cursor, operation_ids = await asyncio.to_thread(shared_state.read_since, "jobs", self._jobs_cursor)
+        new_ids = [operation_id for operation_id in operation_ids if operation_id not in self.operations]
+        if new_ids:
+            records = await asyncio.to_thread(shared_state.get_many_json, [f"op:{i}" for i in new_ids])
+            now = time.time()
+            for operation_id, record in zip(new_ids, records):
+                if record is None:
+                    continue
+                self.operations[operation_id] = {
+                    "operation": None,
+                    "status": record["status"],
+                    "started_at": record["started_at"],
+                    "video_id": record["video_id"],
+                    "error": record["error"],
+                    "poll_interval": settings.poll_interval_min,
+                    "next_poll_at": now,
+                    "poll_errors": 0,
+                    "metadata": record["metadata"]
+                }
+                if record["status"] == "queued":
+                    self._enqueue(operation_id, record["metadata"].get("priority", 0))
+            self.dispatch_pending()
+        if cursor != self._jobs_cursor:
+            self._jobs_cursor = cursor
+            await asyncio.to_thread(shared_state.set, "jobs:adopted", str(cursor))
+
+        if len(self.queue) or self._queue_snapshot_nonempty:
+            running_since = [
+                op_data.get("submitted_at", op_data["started_at"])
+                for op_data in self.operations.values()
+                if op_data["status"] in ("submitting", "processing")
+            ]
+            positions = self.queue.snapshot(
+                running_since, settings.max_concurrent_operations, settings.queue_default_run_seconds
+            )
+            await asyncio.to_thread(
+                shared_state.set_json, "queue:snapshot", {"at": time.time(), "positions": positions}
+            )
+            self._queue_snapshot_nonempty = bool(positions)
+
+    def running_upstream(self) -> int:
+        """
+        Operations occupying an upstream slot (being submitted or running)
+        """
+        return sum(1 for op_data in self.operations.values() if op_data["status"] in ("submitting", "processing"))
+
+    def dispatch_pending(self) -> int:
+        """
+        Start submit tasks for queued jobs, highest priority first, while
+        fewer than max_concurrent_operations are running upstream and the
+        queue is not backing off after a quota error
+
+        Returns:
+            Number of jobs dispatched
+        """
+        dispatched = 0
+        free_slots = settings.max_concurrent_operations - self.running_upstream()
+        while free_slots > 0 and len(self.queue) and not self.queue.throttled():
+            operation_id, seq = self.queue.pop()
+            op_data = self.operations.get(operation_id)
+            if op_data is None or op_data["status"] != "queued":
+                continue
+            op_data["status"] = "submitting"
+            task = asyncio.create_task(self._submit_job(operation_id, op_data, seq))
+            self._submitting.add(task)
+            task.add_done_callback(self._submitting.discard)
+            free_slots -= 1
+            dispatched += 1
+        return dispatched
+
+    async def _submit_job(self, operation_id: str, op_data: dict, seq: int):
+        """
+        Submit one queued job to Veo
+
+        The "submitting" state is flushed to the journal before the call,
+        so a crash mid-submit is replayed as interrupted rather than queued.
+        Quota errors (429 / RESOURCE_EXHAUSTED) put the job back in its
+        original queue slot and throttle the queue with exponential backoff;
+        any other error fails the job.
+        """
+        metadata = op_data["metadata"]
+
+        # Make the attempt durable before calling Veo: if the process dies after
+        # the API accepts the job but before its operation name is journaled,
+        # replay must not find the job still "queued" and bill it a second time
+        attempt = uuid.uuid4().hex
+        self._record(operation_id, op_data, detail=f"submit attempt {attempt}")
+        try:
+            await asyncio.to_thread(self.journal.flush)
+        except Exception as e:
+            logger.exception("Could not journal submit attempt for %s", operation_id)
+            self._fail_operation(operation_id, op_data, f"Video generation failed: could not journal the submission: {e}")
+            self._dispatch_wakeup.set()
+            return
+
+        submit_started = time.time()
+        try:
+            # Read the image and call the Veo API off the event loop
+            operation = await blocking_executor.run(
+                "submit",
+                self._submit_generation,
+                metadata["image_id"],
+                metadata["prompt"],
+                metadata["negative_prompt"],
+                metadata["resolution"],
+                metadata["duration"],
+                metadata["aspect_ratio"]
+            )
+        except Exception as e:
+            quota_error = is_quota_error(e)
+            veo_submit_seconds.labels("quota" if quota_error else "error").observe(time.time() - submit_started)
+            if quota_error:
+                delay = self.queue.throttle()
+                logger.warning("Upstream quota exhausted; backing off %.1fs (%d queued)", delay, len(self.queue) + 1)
+                op_data["status"] = "queued"
+                # Rejected upstream, so nothing was created: safe to replay as queued
+                self._record(operation_id, op_data, detail=f"submit attempt {attempt} rejected: quota")
+                self._enqueue(operation_id, metadata.get("priority", 0), seq)
+            else:
+                self._fail_operation(operation_id, op_data, f"Video generation failed: {str(e)}")
+            return
+        finally:
+            self._dispatch_wakeup.set()
+
+        self.queue.note_success()
+        now = time.time()
+        veo_submit_seconds.labels("ok").observe(now - submit_started)
+        queue_wait_seconds.observe(submit_started - op_data["started_at"])
+        op_data.update({
+            "operation": operation,
+            "status": "processing",
+            "submitted_at": now,
+            "poll_interval": settings.poll_interval_min,
+            "next_poll_at": now + settings.poll_interval_min
+        })
+        self._record(operation_id, op_data, detail="submitted")
+        self._publish(operation_id)
+
+    async def _poll_loop(self):
+        """
+        Refresh due operations forever, one batch at a time
+        """
+        while True:
+            try:
+                if self.authoritative:
+                    await self.poll_pending()
+            except Exception as e:
+                logger.exception("Poller error")
+            await asyncio.sleep(settings.poller_tick_seconds)
+
+    async def poll_pending(self) -> int:
+        """
+        Refresh every pending operation whose backoff has expired
+
+        Due operations are refreshed in batches of poll_batch_size, oldest
+        deadline first, so a burst of submissions never fans out into
+        hundreds of simultaneous upstream calls. Finished videos download
+        in their own tasks, so a slow download never holds up a batch or
+        the next tick.
+
+        Returns:
+            Number of operations refreshed
+        """
+        now = time.time()
+        due = [
+            (operation_id, op_data)
+            for operation_id, op_data in self.operations.items()
+            if op_data["status"] == "processing" and op_data["next_poll_at"] <= now
+            and operation_id not in self._downloads
+        ]
+        due.sort(key=lambda item: item[1]["next_poll_at"])
+
+        batch_size = max(1, settings.poll_batch_size)
+        for start in range(0, len(due), batch_size):
+            batch = due[start:start + batch_size]
+            await asyncio.gather(
+                *(self._refresh_operation(operation_id, op_data) for operation_id, op_data in batch)
+            )
+
+        return len(due)
+
+    async def _refresh_operation(self, operation_id: str, op_data: dict):
+        """
+        Refresh one operation from the Google API and download it when done
+
+        Unfinished operations back off geometrically up to poll_interval_max;
+        transient refresh errors back off the same way and only fail the
+        operation after poll_max_errors consecutive failures.
+        """
         operation = op_data["operation"]
 
         # Refresh operation status from Google API
         try:
-            operation = self.client.operations.get(operation)
+            operation = await blocking_executor.run("poll", self.client.operations.get, operation)
         except Exception as e:
-            error_msg = f"Failed to check operation status: {str(e)}"
-            op_data["error"] = error_msg
-            return {
-                "done": True,
-                "status": "failed",
-                "error": error_msg
-            }
+            op_data["poll_errors"] += 1
+            if op_data["poll_errors"] >= settings.poll_max_errors:
+                self._fail_operation(operation_id, op_data, f"Failed to check operation status: {str(e)}")
+            else:
+                self._schedule_next_poll(op_data)
+            return
 
         # Update operation reference
         op_data["operation"] = operation
+        op_data["poll_errors"] = 0
 
-        # Check if still processing
+        # Still processing - back off before the next refresh
         if not operation.done:
-            elapsed = time.time() - op_data["started_at"]
-            return {
-                "done": False,
-                "status": f"processing ({int(elapsed)}s elapsed)",
-                "video_url": None
-            }
+            self._schedule_next_poll(op_data)
+            self._publish(operation_id)
+            return
+
+        # Upstream finished with an error instead of a video
+        if getattr(operation, "error", None):
+            self._fail_operation(operation_id, op_data, f"Video generation failed: {operation.error}")
+            return
 
-        # Video is ready - download and save
+        # Video is ready - download and save on the download lane
+        task = asyncio.create_task(self._finish_download(operation_id, op_data, operation))
+        self._downloads[operation_id] = task
+        task.add_done_callback(lambda _: self._downloads.pop(operation_id, None))
+
+    async def _finish_download(self, operation_id: str, op_data: dict, operation):
+        """
+        Download a finished operation's video and mark it completed (or failed)
+        """
         try:
-            # Get the generated video from response
-            video = operation.response.generated_videos[0]
+            op_data["video_id"] = await blocking_executor.run(
+                "download", self._download_video, op_data, operation
+            )
+            op_data["status"] = "completed"
+            run_seconds = time.time() - op_data.get("submitted_at", op_data["started_at"])
+            self.queue.record_run_time(run_seconds)
+            operation_seconds.labels("completed").observe(run_seconds)
+            self._record(operation_id, op_data)
+            self._release_fingerprint(operation_id, op_data)
+            self._publish(operation_id)
+            # Post-download stage: gallery poster and preview clip
+            self.schedule_derivatives(op_data["video_id"])
+        except Exception as e:
+            # Every retry is used up; the partial file will not be resumed
+            video_downloader.discard(operation.name)
+            self._fail_operation(operation_id, op_data, f"Failed to download video: {str(e)}")
+
+    def _schedule_next_poll(self, op_data: dict):
+        """
+        Push an operation's next refresh out by its current interval, then grow it
+        """
+        op_data["next_poll_at"] = time.time() + op_data["poll_interval"]
+        op_data["poll_interval"] = min(
+            op_data["poll_interval"] * settings.poll_backoff_factor,
+            settings.poll_interval_max
+        )
+
+    def _fail_operation(self, operation_id: str, op_data: dict, error_msg: str):
+        """
+        Mark an operation as permanently failed
+        """
+        if op_data.get("submitted_at"):
+            operation_seconds.labels("failed").observe(time.time() - op_data["submitted_at"])
+        op_data["status"] = "failed"
+        op_data["error"] = error_msg
+        self._record(operation_id, op_data)
+        self._release_fingerprint(operation_id, op_data)
+        self._publish(operation_id)
+
+    def _download_video(self, op_data: dict, operation) -> str:
+        """
+        Download a finished operation's video and record its metadata
+
+        Blocking; runs on the download lane. The video is streamed to a
+        .part file (resuming one left by an earlier attempt) and renamed
+        into place, so the catalog never lists a truncated MP4; its
+        metadata row is only written once the rename succeeded, so no row
+        ever points at an MP4 that was not published.
+
+        Returns:
+            video_id of the stored video
+        """
+        # Get the generated video from response
+        video = operation.response.generated_videos[0]
+
+        # Generate unique video ID
+        video_id = str(uuid.uuid4())
+        video_path = video_layout.prepare(f"{video_id}.mp4")
 
-            # Generate unique video ID
-            video_id = str(uuid.uuid4())
-            video_path = self.storage_path / f"{video_id}.mp4"
+        # Stream from Google servers to a part file keyed by the operation
+        download_started = time.time()
+        downloaded = video_downloader.download(video.video, key=operation.name)
+        download_seconds.observe(time.time() - download_started)
+        download_bytes.observe(downloaded["size"])
 
-            # Download video from Google servers
-            self.client.files.download(file=video.video)
+        # Remux to faststart and read the real container facts before publishing
+        media, sha256 = self._ingest_media(downloaded["path"], op_data["metadata"], video_id)
 
-            # Save to local storage
-            video.video.save(str(video_path))
+        # Atomic rename publishes the complete file
+        video_downloader.commit(downloaded["path"], video_path)
 
-            # Save metadata alongside video
-            metadata_path = self.storage_path / f"{video_id}.json"
-            metadata = {
+        # Then save metadata to the metadata store (single atomic statement)
+        try:
+            metadata_store.put({
                 **op_data["metadata"],
                 "video_id": video_id,
                 "created_at": time.time(),
-                "filename": f"{video_id}.mp4"
-            }
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+                "filename": f"{video_id}.mp4",
+                "size": video_path.stat().st_size,  # Widened chunk offsets can grow a remuxed file
+                "sha256": sha256 or downloaded["sha256"],
+                "media": media
+            })
+        except Exception:
+            # Unpublish rather than leave a video nobody owns metadata for
+            video_path.unlink(missing_ok=True)
+            raise
 
-            # Update operation status
-            op_data["status"] = "completed"
-            op_data["video_id"] = video_id
+        # Make the new video visible to the listing endpoints
+        video_catalog.upsert(video_id)
 
-            return {
-                "done": True,
-                "status": "completed",
-                "video_url": f"/api/videos/{video_id}"
-            }
+        return video_id
 
-        except Exception as e:
-            error_msg = f"Failed to download video: {str(e)}"
-            op_data["error"] = error_msg
-            return {
-                "done": True,
-                "status": "failed",
-                "error": error_msg
-            }
+    def _ingest_media(self, part_path: Path, metadata: dict, video_id: str):
+        """
+        Rewrite a downloaded MP4 to faststart and probe its container
+
+        A file the parser cannot handle is stored exactly as downloaded.
+
+        Returns:
+            (media facts or None, sha256 of the rewritten file or None)
+        """
+        try:
+            if settings.faststart_enabled:
+                info = mp4.ingest(part_path, settings.download_chunk_size)
+            else:
+                info = {**mp4.probe(part_path), "remuxed": False, "sha256": None}
+        except (mp4.Mp4Error, OSError) as e:
+            logger.warning("Could not inspect MP4 for %s, storing as downloaded: %s", video_id, e)
+            return None, None
+
+        sha256 = info.pop("sha256")
+        mismatches = mp4.request_mismatches(info, metadata.get("resolution"), metadata.get("duration"))
+        if mismatches:
+            info["mismatches"] = mismatches
+            logger.warning("Video %s does not match its request: %s", video_id, "; ".join(mismatches))
+        return info, sha256
+
+    def schedule_derivatives(self, video_id: str):
+        """
+        Generate a video's missing poster and preview clip in the background
+
+        The video is re-indexed once they exist, so listings carry their
+        versions (the ?v= of the immutable derivative URLs).
+        """
+        task = derivative_service.schedule(video_id, self.get_video_path(video_id))
+        if task is not None:
+            task.add_done_callback(lambda _: video_catalog.upsert(video_id))
 
     def get_video_path(self, video_id: str) -> Path:
         """
         Get path to stored video file
 
+        Resolves either storage layout (sharded or flat), so videos are
+        found before, during and after manage.py migrate-layout.
+
         Args:
             video_id: The unique video identifier
 
         Returns:
             Path object to the video file
         """
-        return self.storage_path / f"{video_id}.mp4"
+        return video_layout.locate(f"{video_id}.mp4")
+
+    def delete_video(self, video_id: str) -> bool:
+        """
+        Remove a stored video with its metadata, legacy sidecar and derivatives
+
+        Blocking. Used by DELETE /api/videos/{video_id} and storage GC.
+
+        Returns:
+            False if the video file did not exist
+        """
+        try:
+            self.get_video_path(video_id).unlink()
+        except FileNotFoundError:
+            return False
+
+        # Also delete metadata (and any legacy sidecar)
+        metadata_store.delete(video_id)
+        (self.storage_path / f"{video_id}.json").unlink(missing_ok=True)
+
+        video_catalog.remove(video_id)
+        derivative_service.remove(video_id)
+        return True
 
 
 # Singleton instance
@@ -0,0 +1,147 @@
+"""
+Time-to-first-token benchmark for POST /api/chat/stream
+Usage: python -m benchmarks.chat_stream_ttft [--requests N] [--first-token-delay S]
+
+Drives the ASGI app directly against a fake streaming Gemini model (no
+network), timestamps every SSE event as the server sends it, and reports
+time to first content token and total stream time. While the streams
+run, /api/health is hit repeatedly to show the event loop stays free.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.main import app  # noqa: E402
+from app.services.ai_clients import ai_clients  # noqa: E402
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChat:
+    """Blocking streaming chat that behaves like the SDK's ChatSession"""
+
+    def __init__(self, first_token_delay, token_delay, tokens):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+
+    def send_message(self, message, stream=False):
+        time.sleep(self.first_token_delay)
+        for index in range(self.tokens):
+            if index:
+                time.sleep(self.token_delay)
+            yield FakeChunk(f"token{index} ")
+
+
+class FakeModel:
+    def __init__(self, **chat_options):
+        self.chat_options = chat_options
+
+    def start_chat(self, history=None):
+        return FakeChat(**self.chat_options)
+
+
+async def call(method, path, body=b""):
+    """
+    Run one request through the ASGI app, returning (status, [(timestamp, chunk)])
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    finished = asyncio.Event()
+    chunks = []
+    status = None
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append((time.perf_counter(), message.get("body", b"")))
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status, chunks
+
+
+async def one_stream():
+    start = time.perf_counter()
+    _, chunks = await call("POST", "/api/chat/stream", json.dumps({"message": "hi"}).encode())
+    first_token = None
+    for timestamp, body in chunks:
+        for line in body.decode().splitlines():
+            if line.startswith("data: ") and json.loads(line[6:])["type"] == "content":
+                first_token = timestamp
+                break
+        if first_token:
+            break
+    return first_token - start, chunks[-1][0] - start
+
+
+async def health_probe(stop):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await call("GET", "/api/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def main(args):
+    fake = FakeModel(first_token_delay=args.first_token_delay, token_delay=args.token_delay, tokens=args.tokens)
+    ai_clients.model = lambda model_name, system_instruction=None: fake
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(health_probe(stop))
+    results = await asyncio.gather(*(one_stream() for _ in range(args.requests)))
+    stop.set()
+    health = await probe
+
+    ttft = [first for first, _ in results]
+    total = [whole for _, whole in results]
+    print(f"requests:            {args.requests}")
+    print(f"upstream first token {args.first_token_delay * 1000:.0f} ms, then {args.token_delay * 1000:.0f} ms/token x {args.tokens}")
+    print(f"TTFT      p50 {statistics.median(ttft) * 1000:8.1f} ms   max {max(ttft) * 1000:8.1f} ms")
+    print(f"total     p50 {statistics.median(total) * 1000:8.1f} ms   max {max(total) * 1000:8.1f} ms")
+    print(f"/api/health during streams: {len(health)} probes, max {max(health) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat stream time-to-first-token benchmark")
+    parser.add_argument("--requests", type=int, default=8, help="Concurrent streams")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Fake upstream delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Fake upstream delay between tokens (s)")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per reply")
+    main_args = parser.parse_args()
+    asyncio.run(main(main_args))
@@ -0,0 +1,92 @@
+"""
+Per-request overhead of the access-log / Server-Timing / metrics middleware
+Usage: python -m benchmarks.logging_overhead [--requests N]
+
+Wraps a trivial ASGI app (no routing, no I/O) in RequestLoggingMiddleware
+under several configurations and reports the mean time per request, so
+the difference from the bare app is the middleware's own cost. Log
+records go through the real queue handler; the listener writes them to
+os.devnull so terminal speed does not skew the numbers.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.logging_config import setup_logging  # noqa: E402
+from app.middleware import RequestLoggingMiddleware, timed  # noqa: E402
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/api/health",
+    "headers": [],
+    "client": ("127.0.0.1", 0),
+}
+
+
+async def bare_app(scope, receive, send):
+    with timed("work"):
+        pass
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def configured(access_log, server_timing, sample_rate=1.0, metrics=False):
+    middleware = RequestLoggingMiddleware(bare_app)
+    middleware.access_log = access_log
+    middleware.server_timing = server_timing
+    middleware.metrics = metrics
+    middleware.sample_rate = sample_rate
+    return middleware
+
+
+async def measure(app, requests):
+    for _ in range(min(1000, requests)):
+        await app(SCOPE, receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(SCOPE, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(args):
+    listener = setup_logging()
+    for handler in listener.handlers:
+        handler.setStream(open(os.devnull, "w"))
+
+    cases = [
+        ("bare app", bare_app),
+        ("middleware, all disabled", configured(False, False)),
+        ("server timing only", configured(False, True)),
+        ("metrics only", configured(False, False, metrics=True)),
+        ("access log only", configured(True, False)),
+        ("access log + server timing", configured(True, True)),
+        ("access log sampled 1%", configured(True, True, sample_rate=0.01)),
+        ("everything enabled", configured(True, True, metrics=True)),
+    ]
+    baseline = None
+    print(f"requests per case: {args.requests}")
+    for name, app in cases:
+        per_request = await measure(app, args.requests)
+        baseline = per_request if baseline is None else baseline
+        print(f"{name:28} {per_request:7.2f} us/request   overhead {per_request - baseline:+7.2f} us")
+    listener.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request logging middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per configuration")
+    main_args = parser.parse_args()
+    asyncio.run(main(main_args))
@@ -0,0 +1,72 @@
+"""
+Flat vs sharded storage layout at a large file count
+Usage: python -m benchmarks.storage_layout [--files N] [--lookups N] [--dir PATH]
+
+Creates N empty {uuid}.mp4 files in a flat and in a sharded StorageLayout
+under a scratch directory, then times what the backend does against
+them: locate() of random ids (every video request), create + remove
+(download commit, delete), a full listing (catalog rescan) and the
+unchanged-directory check the catalog runs every rescan interval. Use
+--dir to measure on the filesystem that actually holds ./videos.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.storage_layout import StorageLayout  # noqa: E402
+
+
+def timed(function, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def populate(layout: StorageLayout, names: list):
+    for name in names:
+        layout.prepare(name).touch()
+
+
+def measure(label: str, layout: StorageLayout, names: list, lookups: int):
+    sample = random.sample(names, min(lookups, len(names)))
+    locate = timed(lambda: [layout.locate(name) for name in sample]) / len(sample)
+    fresh = [f"{uuid.uuid4()}.mp4" for _ in range(min(lookups, 1000))]
+    churn = timed(lambda: [layout.prepare(name).touch() or layout.path(name).unlink() for name in fresh]) / len(fresh)
+    listing = timed(layout.entries)
+    check = timed(layout.directory_mtimes, repeat=3)
+    print(
+        f"{label:8} locate {locate * 1e6:7.1f} us   create+remove {churn * 1e6:7.1f} us   "
+        f"list {listing * 1e3:8.1f} ms   unchanged check {check * 1e3:7.2f} ms"
+    )
+
+
+def main(args):
+    scratch = Path(tempfile.mkdtemp(prefix="layout-bench-", dir=args.dir))
+    names = [f"{uuid.uuid4()}.mp4" for _ in range(args.files)]
+    try:
+        print(f"files: {args.files}   scratch: {scratch}")
+        for label, sharded in (("flat", False), ("sharded", True)):
+            layout = StorageLayout(scratch / label, sharded=sharded, depth=args.depth, suffix=".mp4")
+            layout.root.mkdir()
+            populate(layout, names)
+            measure(label, layout, names, args.lookups)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage layout benchmark")
+    parser.add_argument("--files", type=int, default=100000, help="Files per layout")
+    parser.add_argument("--lookups", type=int, default=10000, help="Random locate() calls")
+    parser.add_argument("--depth", type=int, default=1, help="Shard depth of the sharded layout")
+    parser.add_argument("--dir", help="Parent of the scratch directory (default: system temp)")
+    main(parser.parse_args())
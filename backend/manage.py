@@ -0,0 +1,182 @@
+"""
+Maintenance commands for the backend's local storage
+Usage: python manage.py <command> [options]
+
+Commands:
+    import-sidecars   Import legacy {video_id}.json sidecars into the metadata store
+    export-sidecars   Write the metadata store back out as JSON sidecars
+    backfill-derivatives  Generate missing posters and preview clips for stored videos
+    remux-videos      Rewrite stored videos to faststart and record their container facts
+    gc                Report (or with --apply, remove) what the storage retention policies reclaim
+    migrate-layout    Move stored files into the configured storage layout while the server runs
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+from app.config import get_settings
+from app.services.metadata_store import metadata_store
+from app.services.upload_store import upload_store
+from app.services.video_catalog import video_catalog
+from app.services.video_service import video_service
+from app.services.storage_gc import storage_gc
+from app.services.storage_layout import video_layout
+from app.services.derivatives import derivative_service
+from app.services import mp4
+
+settings = get_settings()
+
+
+def import_sidecars(args):
+    metadata_store.open()
+    imported = metadata_store.import_sidecars(Path(settings.video_storage_path), force=True)
+    print(f"Imported {imported} sidecars into {settings.metadata_db_path}")
+
+
+def export_sidecars(args):
+    metadata_store.open()
+    directory = Path(args.dir or settings.video_storage_path)
+    exported = metadata_store.export_sidecars(directory)
+    print(f"Exported {exported} sidecars to {directory}")
+
+
+def backfill_derivatives(args):
+    if not derivative_service.available:
+        print(f"Extractor {settings.derivative_extractor!r} is not available (ffmpeg_path: {settings.ffmpeg_path})")
+        return
+
+    metadata_store.open()
+    videos = sorted(Path(entry.path) for entry in video_layout.entries())
+    futures = {}
+    for video_path in videos:
+        future = derivative_service.submit(video_path.stem, video_path, force=args.force)
+        if future is not None:
+            futures[future] = video_path.stem
+
+    print(f"Generating derivatives for {len(futures)} of {len(videos)} videos")
+    failed = 0
+    for done, future in enumerate(as_completed(futures), start=1):
+        try:
+            future.result()
+            # Announce the new derivative versions (?v=) to workers sharing state
+            video_catalog.upsert(futures[future])
+        except Exception as e:
+            failed += 1
+            print(f"   [FAILED] {futures[future]}: {type(e).__name__}: {e}")
+        if done % 50 == 0:
+            print(f"   {done}/{len(futures)}")
+    derivative_service.shutdown()
+    print(f"Done: {len(futures) - failed} generated, {failed} failed")
+
+
+def remux_videos(args):
+    metadata_store.open()
+    videos = sorted(Path(entry.path) for entry in video_layout.entries())
+    remuxed = failed = 0
+    for video_path in videos:
+        try:
+            info = mp4.ingest(video_path, settings.download_chunk_size)
+        except (mp4.Mp4Error, OSError) as e:
+            failed += 1
+            print(f"   [FAILED] {video_path.stem}: {e}")
+            continue
+        remuxed += info["remuxed"]
+        sha256 = info.pop("sha256")
+        metadata = metadata_store.get(video_path.stem)
+        if metadata is None:
+            continue
+        mismatches = mp4.request_mismatches(info, metadata.get("resolution"), metadata.get("duration"))
+        if mismatches:
+            info["mismatches"] = mismatches
+            print(f"   [MISMATCH] {video_path.stem}: {'; '.join(mismatches)}")
+        metadata["media"] = info
+        if sha256 is not None:
+            metadata["size"] = video_path.stat().st_size
+            metadata["sha256"] = sha256
+        metadata_store.put(metadata)
+    print(f"Done: {remuxed} remuxed, {len(videos) - remuxed - failed} already faststart, {failed} failed")
+
+
+def gc(args):
+    upload_store.open()
+    metadata_store.open()
+    video_catalog.load()
+
+    # Images of queued or running operations are kept, as they are by the server
+    video_service.journal.open()
+    try:
+        active_images = {
+            op["metadata"].get("image_id") for op in video_service.journal.load(since=time.time())
+        } - {None}
+    finally:
+        video_service.journal.close()
+
+    report = storage_gc.run(active_images, dry_run=not args.apply, limit=args.limit)
+    print(json.dumps(report, indent=2))
+    upload_store.close()
+
+
+def migrate_layout(args):
+    # Adopt legacy {uuid}.{ext} uploads first, so they move under their content hash
+    upload_store.open()
+    layouts = {
+        "videos": video_layout,
+        "uploads": upload_store.layout,
+        "derivatives": derivative_service.layout,
+    }
+    print(f"Target layout: {settings.storage_layout} (depth {settings.storage_shard_depth})")
+    for name, layout in layouts.items():
+        if args.dry_run:
+            print(f"   {name}: {len(layout.misplaced())} to move")
+            continue
+
+        def progress(done, total, name=name):
+            print(f"   {name}: {done}/{total}")
+
+        moved = layout.migrate(batch_size=args.batch_size, grace=args.grace, progress=progress)
+        print(f"   {name}: moved {moved}")
+    upload_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CleverCreator.ai storage maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("import-sidecars", help="Import legacy JSON sidecars into the metadata store")
+
+    export_parser = commands.add_parser("export-sidecars", help="Export the metadata store as JSON sidecars")
+    export_parser.add_argument("--dir", help="Target directory (default: video storage path)")
+
+    backfill_parser = commands.add_parser("backfill-derivatives", help="Generate missing posters and preview clips")
+    backfill_parser.add_argument("--force", action="store_true", help="Regenerate existing derivatives too")
+
+    commands.add_parser("remux-videos", help="Rewrite stored videos to faststart and record container facts")
+
+    gc_parser = commands.add_parser("gc", help="Apply the storage retention policies (dry run by default)")
+    gc_parser.add_argument("--apply", action="store_true", help="Remove the reported files instead of only listing them")
+    gc_parser.add_argument("--limit", type=int, default=100, help="Items listed per category")
+
+    migrate_parser = commands.add_parser("migrate-layout", help="Move stored files into the configured storage layout")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Only count the files that would move")
+    migrate_parser.add_argument("--batch-size", type=int, default=500, help="Files linked before each grace pause")
+    migrate_parser.add_argument("--grace", type=float, default=2.0, help="Seconds before old names are removed")
+
+    args = parser.parse_args()
+    handlers = {
+        "import-sidecars": import_sidecars,
+        "export-sidecars": export_sidecars,
+        "backfill-derivatives": backfill_derivatives,
+        "remux-videos": remux_videos,
+        "gc": gc,
+        "migrate-layout": migrate_layout,
+    }
+    try:
+        handlers[args.command](args)
+    finally:
+        metadata_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,5 +14,6 @@ if __name__ == "__main__":
         host=settings.backend_host,
         port=settings.backend_port,
         reload=True,
-        log_level="info"
+        log_level="info",
+        access_log=False  # app.middleware writes the structured access log
     )
@@ -0,0 +1,8 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings require an API key; the tests never call the real API
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
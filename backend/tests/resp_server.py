@@ -0,0 +1,210 @@
+"""
+Local stand-in for a Redis-protocol server, for testing RedisSharedState
+
+Speaks RESP2 over TCP and implements the commands the backend sends
+(GET, MGET, SET with PX/EX/NX, DEL, PEXPIRE, INCR, ZADD, ZRANGEBYSCORE,
+EVAL). There is no Lua interpreter: EVAL runs a Python equivalent of each
+script RedisSharedState ships, under the server lock, so a script is
+atomic with respect to every other command, as it is in Redis.
+"""
+
+import socketserver
+import threading
+import time
+
+from app.services.shared_state import APPEND_SCRIPT, LEASE_ACQUIRE_SCRIPT, LEASE_RELEASE_SCRIPT
+
+
+class CommandError(Exception):
+    """Sent back to the client as a RESP error reply"""
+
+
+class RespStandIn:
+    """
+    In-memory Redis stand-in listening on 127.0.0.1 (random port)
+
+    before_command, if set, is called with each command's arguments before
+    it runs (still under the lock), so tests can interleave another
+    client's change at an exact point of a multi-command sequence.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}  # key -> str
+        self.zsets = {}  # key -> [(score, member)] sorted by score
+        self.expires = {}  # key -> time.time() deadline
+        self.commands = []  # Every command received, in order
+        self.before_command = None
+        self.scripts = {
+            APPEND_SCRIPT: self._append_script,
+            LEASE_ACQUIRE_SCRIPT: self._lease_acquire_script,
+            LEASE_RELEASE_SCRIPT: self._lease_release_script,
+        }
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    args = stand_in._read_command(self.rfile)
+                    if args is None:
+                        return
+                    with stand_in.lock:
+                        stand_in.commands.append(args)
+                        if stand_in.before_command is not None:
+                            stand_in.before_command(args)
+                        reply = stand_in._run(args)
+                    self.wfile.write(reply)
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.url = f"redis://127.0.0.1:{self.server.server_address[1]}/0"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def flush(self):
+        """Drop every key, like FLUSHALL (or a server restarted without persistence)"""
+        with self.lock:
+            self.values.clear()
+            self.zsets.clear()
+            self.expires.clear()
+
+    @staticmethod
+    def _read_command(reader):
+        line = reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(reader.readline()[1:])
+            args.append(reader.read(length + 2)[:-2].decode())
+        return args
+
+    def _expire(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+            del self.expires[key]
+
+    def _get(self, key):
+        self._expire(key)
+        return self.values.get(key)
+
+    def _set(self, key, value, px=None):
+        self.values[key] = value
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.time() + int(px) / 1000
+
+    def _run(self, args) -> bytes:
+        handler = getattr(self, f"_cmd_{args[0].lower()}", None)
+        try:
+            if handler is None:
+                raise CommandError(f"unknown command '{args[0]}'")
+            return self._encode(handler(*args[1:]))
+        except CommandError as e:
+            return f"-ERR {e}\r\n".encode()
+
+    def _encode(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, bool):
+            return b"+OK\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._encode(item) for item in value)
+        data = value.encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _cmd_get(self, key):
+        return self._get(key)
+
+    def _cmd_mget(self, *keys):
+        return [self._get(key) for key in keys]
+
+    def _cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        if "NX" in options and self._get(key) is not None:
+            return None
+        px = None
+        if "PX" in options:
+            px = options[options.index("PX") + 1]
+        elif "EX" in options:
+            px = int(options[options.index("EX") + 1]) * 1000
+        self._set(key, value, px)
+        return True
+
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            self._expire(key)
+            removed += (self.values.pop(key, None) is not None) + (self.zsets.pop(key, None) is not None)
+            self.expires.pop(key, None)
+        return removed
+
+    def _cmd_pexpire(self, key, milliseconds):
+        self._expire(key)
+        if key not in self.values and key not in self.zsets:
+            return 0
+        self.expires[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    def _cmd_incr(self, key):
+        value = int(self._get(key) or 0) + 1
+        self.values[key] = str(value)
+        return value
+
+    def _cmd_zadd(self, key, score, member):
+        self._expire(key)
+        zset = self.zsets.setdefault(key, [])
+        zset.append((float(score), member))
+        zset.sort()
+        return 1
+
+    def _cmd_zrangebyscore(self, key, low, high):
+        self._expire(key)
+        exclusive = low.startswith("(")
+        low, high = float(low.lstrip("(")), float(high)
+        return [
+            member for score, member in self.zsets.get(key, [])
+            if (score > low if exclusive else score >= low) and score <= high
+        ]
+
+    def _cmd_eval(self, script, key_count, *args):
+        handler = self.scripts.get(script)
+        if handler is None:
+            raise CommandError("script not supported by the stand-in")
+        key_count = int(key_count)
+        return handler(list(args[:key_count]), list(args[key_count:]))
+
+    def _append_script(self, keys, argv):
+        sequence_key, log_key = keys
+        value, max_entries, retention_ms = argv
+        seq = self._cmd_incr(sequence_key)
+        self._cmd_zadd(log_key, seq, f"{seq}:{value}")
+        del self.zsets[log_key][:-int(max_entries)]
+        self._cmd_pexpire(log_key, retention_ms)
+        return seq
+
+    def _lease_acquire_script(self, keys, argv):
+        owner, ttl_ms = argv
+        holder = self._get(keys[0])
+        if holder is None or holder == owner:
+            self._set(keys[0], owner, ttl_ms)
+            return 1
+        return 0
+
+    def _lease_release_script(self, keys, argv):
+        if self._get(keys[0]) == argv[0]:
+            return self._cmd_del(keys[0])
+        return 0
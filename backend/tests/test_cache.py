@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services.cache import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "optimized"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["optimized"] * 5
+    assert len(calls) == 1
+    assert flights.shared == 4
+    assert len(flights) == 0
+
+
+def test_leader_cancellation_does_not_fail_the_other_callers():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "optimized"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flights.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()  # The first client disconnects
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(scenario()) == ["optimized", "optimized"]
+
+
+def test_call_is_cancelled_once_every_caller_left():
+    flights = SingleFlight()
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "optimized"
+
+    async def scenario():
+        callers = [asyncio.ensure_future(flights.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        assert len(flights) == 0
+        # A new caller starts a fresh call instead of joining the cancelled one
+        result = await flights.do("key", fetch)
+        await asyncio.sleep(0.06)
+        return result
+
+    assert asyncio.run(scenario()) == "optimized"
+    assert finished == [1]
+
+
+def test_exceptions_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("quota exceeded")
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["quota exceeded"] * 3
@@ -0,0 +1,59 @@
+from app.services.chat_assistant import ChatSession, estimate_tokens
+
+BUDGET = 400
+
+
+def _texts(session: ChatSession) -> list:
+    return [entry["parts"][0] for entry in session.history]
+
+
+def _counted(session: ChatSession) -> int:
+    return sum(estimate_tokens(text) for text in _texts(session))
+
+
+def test_token_total_matches_the_kept_history_after_compaction():
+    session = ChatSession("s")
+    for turn in range(30):
+        session.add_turn(f"question {turn} " + "q" * 200, f"answer {turn} " + "a" * 300, BUDGET)
+        # Folded turns are only counted once, through the summary that holds them
+        assert session.tokens == _counted(session)
+        assert session.tokens <= BUDGET
+
+    texts = _texts(session)
+    assert texts[0].startswith(ChatSession.SUMMARY_PREFIX)
+    # The newest turns are kept verbatim and the one before them is summarized
+    first_kept = int(texts[2].split()[1])
+    assert f"question {first_kept - 1} " in texts[0]
+    assert texts[2:] == [
+        text for turn in range(first_kept, 30) for text in (f"question {turn} " + "q" * 200, f"answer {turn} " + "a" * 300)
+    ]
+    assert session.compacted_turns == first_kept
+
+
+def test_a_turn_over_the_budget_is_kept_truncated():
+    session = ChatSession("s")
+    session.add_turn("short question", "x" * 10 * BUDGET * 4, BUDGET)
+    texts = _texts(session)
+    # No empty summary, and the turn itself survives
+    assert len(texts) == 2
+    assert texts[0] == "short question"
+    assert texts[1].startswith("xxx") and texts[1].endswith(ChatSession.TRUNCATED_MARK)
+    assert session.tokens == _counted(session) <= BUDGET
+
+    # Earlier turns are summarized and the oversized newest one truncated
+    session.add_turn("y" * BUDGET * 8, "z" * BUDGET * 8, BUDGET)
+    texts = _texts(session)
+    assert texts[0].startswith(ChatSession.SUMMARY_PREFIX) and "short question" in texts[0]
+    assert texts[2].startswith("yyy") and texts[3].startswith("zzz")
+    assert session.tokens == _counted(session) <= BUDGET
+
+
+def test_seeded_history_is_compacted_on_creation():
+    history = [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": f"message {index} " + "m" * 400}
+        for index in range(10)
+    ]
+    session = ChatSession("s", history)
+    session.compact(BUDGET)
+    assert session.tokens == _counted(session) <= BUDGET
+    assert _texts(session)[-1].startswith("message 9")
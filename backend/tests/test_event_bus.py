@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services.event_bus import StatusEventBus, StatusSubscription
+
+
+def _event(operation_id: str, status: str = "processing", done: bool = False) -> dict:
+    event = status if done else "progress"
+    return {"operation_id": operation_id, "event": event, "status": status, "done": done}
+
+
+def _drain(subscription: StatusSubscription) -> list:
+    async def collect():
+        events = []
+        while True:
+            event = await subscription.next(timeout=0.01)
+            if event is None:
+                return events
+            events.append(event)
+    return asyncio.run(collect())
+
+
+def test_progress_collapses_per_operation():
+    subscription = StatusSubscription(max_pending=4)
+    for elapsed in range(10):
+        subscription.deliver({**_event("a"), "elapsed": elapsed})
+    subscription.deliver(_event("b"))
+
+    events = _drain(subscription)
+    assert [(e["operation_id"], e.get("elapsed")) for e in events] == [("a", 9), ("b", None)]
+
+
+def test_terminal_events_survive_a_full_inbox():
+    bus = StatusEventBus()
+    subscription = StatusSubscription(max_pending=3)
+    operations = [f"op{i}" for i in range(6)]
+    for operation_id in operations:
+        bus.subscribe(operation_id, subscription)
+
+    # A slow multiplexed watcher: every operation finishes before it reads anything
+    for operation_id in operations:
+        bus.publish(_event(operation_id))
+    for operation_id in operations:
+        bus.publish(_event(operation_id, "completed", done=True))
+        bus.publish(_event(operation_id))  # A late progress event never replaces it
+
+    events = _drain(subscription)
+    assert sorted(e["operation_id"] for e in events) == operations
+    assert all(e["done"] for e in events)
+
+
+def test_oldest_progress_is_dropped_when_full():
+    subscription = StatusSubscription(max_pending=2)
+    subscription.deliver(_event("a"))
+    subscription.deliver(_event("b", "failed", done=True))
+    subscription.deliver(_event("c"))
+
+    events = _drain(subscription)
+    assert [e["operation_id"] for e in events] == ["b", "c"]
+    assert subscription.dropped == 1
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.executor import BlockingCallExecutor
+
+CALL_SECONDS = 0.2
+
+
+class SleepingClient:
+    """
+    Stands in for genai.Client: generate_videos and operations.get block
+    the calling thread like the real SDK, and record their peak concurrency
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {"submit": 0, "poll": 0}
+        self.peak = {"submit": 0, "poll": 0}
+        self.models = SimpleNamespace(generate_videos=lambda **kwargs: self._call("submit", kwargs["prompt"]))
+        self.operations = SimpleNamespace(get=lambda operation: self._call("poll", operation))
+
+    def _call(self, lane: str, value):
+        with self._lock:
+            self._running[lane] += 1
+            self.peak[lane] = max(self.peak[lane], self._running[lane])
+        time.sleep(CALL_SECONDS)
+        with self._lock:
+            self._running[lane] -= 1
+        return value
+
+
+async def _max_loop_stall(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Longest gap between ticks of a coroutine that should wake every interval"""
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        worst = max(worst, now - last - interval)
+        last = now
+    return worst
+
+
+def test_slow_calls_run_on_bounded_lanes_without_blocking_the_loop():
+    executor = BlockingCallExecutor({"submit": 2, "poll": 3})
+    client = SleepingClient()
+    submits, polls = 6, 9
+
+    async def scenario():
+        stop = asyncio.Event()
+        watchdog = asyncio.create_task(_max_loop_stall(stop))
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(executor.run("submit", client.models.generate_videos, prompt=f"p{i}") for i in range(submits)),
+            *(executor.run("poll", client.operations.get, f"op{i}") for i in range(polls)),
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        return results, elapsed, await watchdog
+
+    try:
+        results, elapsed, stall = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert results == [f"p{i}" for i in range(submits)] + [f"op{i}" for i in range(polls)]
+    # Each lane is capped at its own size and both lanes ran side by side:
+    # 3 rounds per lane, not 15 serial calls or one unbounded round
+    assert client.peak == {"submit": 2, "poll": 3}
+    assert 3 * CALL_SECONDS <= elapsed < 5 * CALL_SECONDS
+    # The loop kept ticking while every worker thread was asleep
+    assert stall < CALL_SECONDS / 2
+    stats = executor.stats()
+    assert stats["submit"]["completed"] == submits
+    assert stats["poll"]["completed"] == polls
+    assert all(lane["queued"] == 0 and lane["active"] == 0 for lane in stats.values())
+
+
+def test_exceptions_propagate_and_free_the_worker():
+    executor = BlockingCallExecutor({"poll": 1})
+
+    def fail():
+        raise ValueError("upstream error")
+
+    async def scenario():
+        try:
+            await executor.run("poll", fail)
+        except ValueError as exc:
+            error = exc
+        return error, await executor.run("poll", lambda: "ok")
+
+    try:
+        error, result = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert str(error) == "upstream error"
+    assert result == "ok"
+    assert executor.stats()["poll"]["active"] == 0
+
+
+def test_cancelled_work_leaves_the_queued_gauge():
+    executor = BlockingCallExecutor({"download": 1})
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run("download", release.wait))
+        waiting = [asyncio.ensure_future(executor.run("download", time.sleep, 0)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()["download"]["queued"] == 3
+
+        # A caller giving up on a queued call takes it off the queue
+        waiting[0].cancel()
+        await asyncio.gather(waiting[0], return_exceptions=True)
+        assert executor.stats()["download"]["queued"] == 2
+
+        # Shutdown cancels the rest without running them
+        executor.shutdown()
+        await asyncio.gather(*waiting[1:], return_exceptions=True)
+        assert executor.stats()["download"]["queued"] == 0
+
+        release.set()
+        await running
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()  # Never leave the worker thread blocked
+        executor.shutdown()
+    stats = executor.stats()["download"]
+    assert stats == {**stats, "queued": 0, "active": 0, "completed": 1}
+
+
+def test_slow_download_does_not_hold_up_polls_or_status(monkeypatch):
+    from app.services import video_service as service_module
+    from app.services.video_service import video_service
+
+    executor = BlockingCallExecutor({"poll": 2, "download": 1})
+    release = threading.Event()
+    polled = []
+
+    def get(operation):
+        polled.append(operation.name)
+        return SimpleNamespace(name=operation.name, done=operation.name == "finished", error=None)
+
+    def slow_download(op_data, operation):
+        release.wait(timeout=5)
+        return "video-1"
+
+    monkeypatch.setattr(service_module, "blocking_executor", executor)
+    monkeypatch.setattr(service_module.derivative_service, "schedule", lambda *args: None)
+    monkeypatch.setattr(video_service, "client", SimpleNamespace(operations=SimpleNamespace(get=get)))
+    monkeypatch.setattr(video_service, "_download_video", slow_download)
+    monkeypatch.setattr(video_service, "operations", {
+        operation_id: {
+            "operation": SimpleNamespace(name=operation_id),
+            "status": "processing",
+            "started_at": time.time(),
+            "video_id": None,
+            "poll_interval": 0,
+            "next_poll_at": 0,
+            "poll_errors": 0,
+            "metadata": {},
+        }
+        for operation_id in ("finished", "running")
+    })
+
+    async def scenario():
+        # The first tick starts the download and returns without waiting for it
+        started = time.perf_counter()
+        assert await asyncio.wait_for(video_service.poll_pending(), timeout=1) == 2
+        download = video_service._downloads["finished"]
+
+        # Later ticks keep polling the other job, and never re-poll the downloading one
+        for _ in range(3):
+            assert await asyncio.wait_for(video_service.poll_pending(), timeout=1) == 1
+        status = await video_service.check_status("finished")
+        elapsed = time.perf_counter() - started
+
+        release.set()
+        await download
+        return elapsed, status, await video_service.check_status("finished")
+
+    try:
+        elapsed, during, after = asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert elapsed < 1
+    assert polled.count("finished") == 1 and polled.count("running") == 4
+    assert during["done"] is False and during["status"].startswith("processing")
+    assert after == {"done": True, "status": "completed", "video_url": "/api/videos/video-1"}
+    assert not video_service._downloads
@@ -0,0 +1,189 @@
+import asyncio
+import os
+from email.utils import formatdate
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.services.media_response import MAX_RANGES, VideoFileResponse, file_version, parse_range_header
+
+SIZE = 1000
+DATA = bytes(index % 251 for index in range(SIZE))
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    os.utime(path, (1_700_000_000, 1_700_000_000))
+
+    async def endpoint(request):
+        return VideoFileResponse(path, request.headers)
+
+    with TestClient(Starlette(routes=[Route("/clip", endpoint, methods=["GET", "HEAD"])])) as client:
+        client.etag = f'"{file_version(path.stat())}"'
+        client.last_modified = formatdate(1_700_000_000, usegmt=True)
+        yield client
+
+
+def _parts(response):
+    """Split a multipart/byteranges body into (content-range, body) pairs"""
+    boundary = response.headers["content-type"].split("boundary=")[1]
+    body = response.content
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+    parts = []
+    for chunk in body.split(f"\r\n--{boundary}".encode())[1:-1]:
+        head, _, payload = chunk.partition(b"\r\n\r\n")
+        headers = dict(line.split(": ", 1) for line in head.decode().strip().split("\r\n"))
+        parts.append((headers["Content-Range"], payload))
+    return parts
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=-100", [(900, 999)]),  # Suffix range
+    ("bytes=-5000", [(0, 999)]),  # Suffix longer than the file
+    ("bytes=990-", [(990, 999)]),
+    ("bytes=0-5000", [(0, 999)]),  # End clamped to the file
+    ("bytes=0-10,5-20,21-30,500-", [(0, 30), (500, 999)]),  # Overlapping and adjacent merged
+    ("bytes=500-599, 0-9", [(0, 9), (500, 599)]),  # Sorted
+    ("bytes=1000-", []),  # Past the end
+    ("bytes=-0", []),
+    ("bytes=5-2", None),  # Malformed headers are ignored
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+    ("bytes=", None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, SIZE) == expected
+
+
+def test_full_response(media):
+    response = media.get("/clip")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["content-length"] == str(SIZE)
+    assert response.headers["etag"] == media.etag
+    assert response.headers["last-modified"] == media.last_modified
+    assert response.headers["accept-ranges"] == "bytes"
+
+    head = media.head("/clip")
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == str(SIZE)
+
+
+def test_single_and_suffix_ranges(media):
+    response = media.get("/clip", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{SIZE}"
+    assert response.content == DATA[100:200]
+
+    response = media.get("/clip", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 990-999/{SIZE}"
+    assert response.content == DATA[-10:]
+
+    # Overlapping ranges collapse into one plain 206
+    response = media.get("/clip", headers={"Range": "bytes=0-49,25-99"})
+    assert response.headers["content-range"] == f"bytes 0-99/{SIZE}"
+    assert response.content == DATA[:100]
+
+
+def test_multipart_content_length_matches_the_body(media):
+    response = media.get("/clip", headers={"Range": "bytes=0-9,100-149,-5"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert _parts(response) == [
+        (f"bytes 0-9/{SIZE}", DATA[0:10]),
+        (f"bytes 100-149/{SIZE}", DATA[100:150]),
+        (f"bytes 995-999/{SIZE}", DATA[995:]),
+    ]
+
+
+def test_unsatisfiable_range(media):
+    response = media.get("/clip", headers={"Range": f"bytes={SIZE}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{SIZE}"
+    assert response.content == b""
+
+
+def test_too_many_or_malformed_ranges_get_the_full_file(media):
+    spec = ",".join(f"{index * 10}-{index * 10 + 1}" for index in range(MAX_RANGES + 1))
+    response = media.get("/clip", headers={"Range": f"bytes={spec}"})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+    response = media.get("/clip", headers={"Range": f"bytes={spec.rsplit(',', 1)[0]}"})
+    assert response.status_code == 206
+    assert len(_parts(response)) == MAX_RANGES
+
+    assert media.get("/clip", headers={"Range": "bytes=9-1"}).status_code == 200
+
+
+def test_if_range(media):
+    def ranged(if_range):
+        return media.get("/clip", headers={"Range": "bytes=0-9", "If-Range": if_range})
+
+    assert ranged(media.etag).status_code == 206
+    assert ranged(media.last_modified).status_code == 206
+    # A changed file, a weak tag or another date means the full new content
+    for stale in ('"0-0"', f"W/{media.etag}", formatdate(1_600_000_000, usegmt=True), "garbage"):
+        response = ranged(stale)
+        assert response.status_code == 200
+        assert response.content == DATA
+
+
+def test_conditional_requests(media):
+    for if_none_match in (media.etag, f"W/{media.etag}", f'"other", {media.etag}', "*"):
+        response = media.get("/clip", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == media.etag
+    assert media.get("/clip", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    assert media.get("/clip", headers={"If-Modified-Since": media.last_modified}).status_code == 304
+    earlier = formatdate(1_600_000_000, usegmt=True)
+    assert media.get("/clip", headers={"If-Modified-Since": earlier}).status_code == 200
+    # If-None-Match takes precedence over If-Modified-Since
+    response = media.get("/clip", headers={"If-None-Match": '"other"', "If-Modified-Since": media.last_modified})
+    assert response.status_code == 200
+
+
+def test_cache_control_follows_the_requested_version(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    version = file_version(path.stat())
+
+    def cache_control(**kwargs):
+        return VideoFileResponse(path, {}, **kwargs).headers["cache-control"]
+
+    assert "immutable" in cache_control()
+    assert "immutable" in cache_control(versioned=True, version=version)
+    assert cache_control(versioned=True, version="stale") == "public, no-cache"
+    assert cache_control(versioned=True) == "public, no-cache"
+
+
+def test_zero_copy_sends_the_same_ranges(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(DATA)
+    response = VideoFileResponse(path, {"range": "bytes=0-9,-5"})
+    scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            file = message["file"]
+            file.seek(message["offset"])
+            message = {**message, "body": file.read(message["count"])}
+        messages.append(message)
+
+    asyncio.run(response(scope, None, send))
+
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    assert messages[0]["status"] == 206
+    assert int(dict(messages[0]["headers"])[b"content-length"]) == len(body)
+    assert [message["more_body"] for message in messages[1:]] == [True] * 4 + [False]
+    assert body.count(DATA[:10]) == 1 and body.count(DATA[-5:]) == 1
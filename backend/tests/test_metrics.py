@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from app.services.metrics import MetricsRegistry
+
+
+def _samples(registry: MetricsRegistry) -> dict:
+    """Rendered sample lines as {"name{labels}": "value"}"""
+    lines = registry.render().splitlines()
+    return dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+
+
+def test_counter_render_and_label_escaping():
+    registry = MetricsRegistry()
+    served = registry.counter("bytes_total", "Bytes served", ("kind",))
+    served.labels("video").inc(100)
+    served.labels("video").inc(50)
+    served.labels('po"st\\er\nx').inc()
+
+    text = registry.render()
+    assert text.startswith("# HELP bytes_total Bytes served\n# TYPE bytes_total counter\n")
+    assert text.endswith("\n")
+    assert _samples(registry) == {
+        'bytes_total{kind="po\\"st\\\\er\\nx"}': "1",
+        'bytes_total{kind="video"}': "150",
+    }
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(1, 0.1, 0.5))
+    for value in (0.05, 0.1, 0.3, 0.5, 0.7, 2.0):
+        latency.labels("/a").observe(value)
+
+    samples = _samples(registry)
+    # Bounds are inclusive (le) and sorted; +Inf holds everything
+    assert samples == {
+        'latency_seconds_bucket{route="/a",le="0.1"}': "2",
+        'latency_seconds_bucket{route="/a",le="0.5"}': "4",
+        'latency_seconds_bucket{route="/a",le="1.0"}': "5",
+        'latency_seconds_bucket{route="/a",le="+Inf"}': "6",
+        'latency_seconds_sum{route="/a"}': repr(0.05 + 0.1 + 0.3 + 0.5 + 0.7 + 2.0),
+        'latency_seconds_count{route="/a"}': "6",
+    }
+
+
+def test_observations_from_many_threads_are_all_counted():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests")
+    sizes = registry.histogram("size_bytes", "Sizes", buckets=(10,))
+
+    def record():
+        for _ in range(1000):
+            requests.inc()
+            sizes.observe(5)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = _samples(registry)
+    assert samples["requests_total"] == "8000"
+    assert samples['size_bytes_bucket{le="10.0"}'] == "8000"
+    assert samples["size_bytes_sum"] == "40000.0"
+
+
+def test_callbacks_and_failures_only_drop_their_own_metric():
+    registry = MetricsRegistry()
+    registry.callback("queue_depth", "Jobs waiting", lambda: [(("submit",), 3)], labelnames=("lane",))
+
+    def broken():
+        raise RuntimeError("state unavailable")
+    registry.callback("broken", "Always fails", broken)
+    registry.counter("after_total", "Registered after the broken one").inc(2)
+
+    text = registry.render()
+    assert "# TYPE queue_depth gauge" in text
+    assert _samples(registry) == {'queue_depth{lane="submit"}': "3", "after_total": "2"}
+    assert "# HELP broken" not in text
+
+
+def test_registration_and_label_errors():
+    registry = MetricsRegistry()
+    counter = registry.counter("things_total", "Things", ("a", "b"))
+    with pytest.raises(ValueError):
+        registry.counter("things_total", "Again")
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    served = registry.counter("bytes_total", "Bytes served", ("kind",))
+    latency = registry.histogram("latency_seconds", "Latency")
+    served.labels("video").inc(100)
+    latency.observe(0.2)
+
+    assert _samples(registry) == {}
+    # Label mistakes are still reported
+    with pytest.raises(ValueError):
+        served.labels()
@@ -0,0 +1,223 @@
+import hashlib
+import struct
+
+import pytest
+
+from app.services import mp4
+from app.services.mp4 import Mp4Error
+
+VIDEO_CHUNKS = [b"video-chunk-one", b"video-chunk-two!"]
+AUDIO_CHUNKS = [b"audio-1", b"audio-22"]
+
+
+def box(box_type: bytes, *payloads: bytes) -> bytes:
+    body = b"".join(payloads)
+    return struct.pack(">I4s", len(body) + 8, box_type) + body
+
+
+def full_box(box_type: bytes, *payloads: bytes) -> bytes:
+    # Version 0, no flags
+    return box(box_type, b"\0\0\0\0", *payloads)
+
+
+def offset_table(offsets: list, wide: bool = False) -> bytes:
+    if wide:
+        return full_box(b"co64", struct.pack(">I%dQ" % len(offsets), len(offsets), *offsets))
+    return full_box(b"stco", struct.pack(">I%dI" % len(offsets), len(offsets), *offsets))
+
+
+def trak(handler: bytes, codec: bytes, offsets: list, wide: bool = False) -> bytes:
+    tkhd = full_box(b"tkhd", b"\0" * 76, struct.pack(">II", 1280 << 16, 720 << 16))
+    hdlr = full_box(b"hdlr", b"\0" * 4, handler, b"\0" * 12)
+    stsd = full_box(b"stsd", struct.pack(">I", 1), box(codec, b"\0" * 8))
+    stbl = box(b"stbl", stsd, offset_table(offsets, wide))
+    return box(b"trak", tkhd, box(b"mdia", hdlr, box(b"minf", stbl)))
+
+
+def moov(video_offsets: list, audio_offsets: list, wide: bool = False, *extra: bytes) -> bytes:
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, 8000), b"\0" * 80)
+    return box(
+        b"moov", mvhd,
+        trak(b"vide", b"avc1", video_offsets, wide),
+        trak(b"soun", b"mp4a", audio_offsets, wide),
+        *extra
+    )
+
+
+def make_mp4(moov_first: bool = False, wide: bool = False, between: bytes = b"", after: bytes = b"", moov_extra=()) -> bytes:
+    """
+    ftyp, then moov and an mdat with interleaved video/audio chunks in
+    either order (between goes after the first of the two, after at the end)
+    """
+    ftyp = box(b"ftyp", b"isom", b"\0\0\0\0", b"isommp41")
+    chunks = [chunk for pair in zip(VIDEO_CHUNKS, AUDIO_CHUNKS) for chunk in pair]
+    mdat = box(b"mdat", *chunks)
+
+    def build(mdat_offset):
+        positions, position = [], mdat_offset + 8
+        for chunk in chunks:
+            positions.append(position)
+            position += len(chunk)
+        return moov(positions[0::2], positions[1::2], wide, *moov_extra)
+
+    if moov_first:
+        moov_size = len(build(0))
+        return ftyp + build(len(ftyp) + moov_size + len(between)) + between + mdat + after
+    return ftyp + mdat + between + build(len(ftyp)) + after
+
+
+def chunks_at_offsets(data: bytes) -> tuple:
+    """
+    (video chunks, audio chunks) read back at each track's chunk offsets
+    """
+    start = data.index(b"moov") - 4
+    tree = mp4.parse_tree(data[start:start + struct.unpack_from(">I", data, start)[0]])
+    tracks = []
+    for stbl, expected in zip(tree.find(b"trak", b"mdia", b"minf", b"stbl"), (VIDEO_CHUNKS, AUDIO_CHUNKS)):
+        table = next(child for child in stbl.children if child.type in (b"stco", b"co64"))
+        count = struct.unpack_from(">I", table.payload, 4)[0]
+        fmt = ">%dI" % count if table.type == b"stco" else ">%dQ" % count
+        offsets = struct.unpack_from(fmt, table.payload, 8)
+        tracks.append([data[offset:offset + len(chunk)] for offset, chunk in zip(offsets, expected)])
+    return tuple(tracks)
+
+
+def top_level_types(path) -> list:
+    with open(path, "rb") as file:
+        return [box_type for box_type, _, _ in mp4.top_level_boxes(file)]
+
+
+def assert_untouched(path, data: bytes):
+    assert path.read_bytes() == data
+    assert sorted(entry.name for entry in path.parent.iterdir()) == [path.name]
+
+
+def test_moov_at_the_end_is_moved_before_mdat(tmp_path):
+    path = tmp_path / "video.mp4"
+    data = make_mp4(between=box(b"free", b"\0" * 5), after=box(b"udta", b"note"))
+    path.write_bytes(data)
+    assert chunks_at_offsets(data) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+
+    info = mp4.ingest(path, chunk_size=7)
+
+    assert info["remuxed"] and info["faststart"]
+    assert info["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert top_level_types(path) == [b"ftyp", b"moov", b"mdat", b"free", b"udta"]
+    assert path.stat().st_size == len(data)
+    assert chunks_at_offsets(path.read_bytes()) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+    assert (info["duration"], info["width"], info["height"]) == (8.0, 1280, 720)
+    assert (info["video_codec"], info["audio_codec"]) == ("avc1", "mp4a")
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["video.mp4"]
+
+
+def test_chunks_on_both_sides_of_moov_are_relocated(tmp_path):
+    # Video in an mdat before moov, audio in one after it
+    ftyp = box(b"ftyp", b"isom")
+    video_mdat = box(b"mdat", *VIDEO_CHUNKS)
+    video_offsets = [len(ftyp) + 8, len(ftyp) + 8 + len(VIDEO_CHUNKS[0])]
+    moov_size = len(moov(video_offsets, [0, 0]))
+    audio_start = len(ftyp) + len(video_mdat) + moov_size + 8
+    audio_offsets = [audio_start, audio_start + len(AUDIO_CHUNKS[0])]
+    data = ftyp + video_mdat + moov(video_offsets, audio_offsets) + box(b"mdat", *AUDIO_CHUNKS)
+    assert chunks_at_offsets(data) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(data)
+
+    assert mp4.ingest(path)["remuxed"]
+    assert top_level_types(path) == [b"ftyp", b"moov", b"mdat", b"mdat"]
+    assert chunks_at_offsets(path.read_bytes()) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+
+
+def test_co64_tables_are_moved_too(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(make_mp4(wide=True))
+    assert mp4.ingest(path)["remuxed"]
+    assert chunks_at_offsets(path.read_bytes()) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+
+
+def test_stco_offsets_past_4_gib_are_widened_to_co64():
+    # mdat at 40 runs to just past 4 GiB, where moov sits; the video chunk
+    # near the end of mdat no longer fits 32 bits once moov precedes it
+    first_mdat, moov_offset = 40, 0xFFFFFFFF + 100
+    video_offsets = [48, 0xFFFFFFFF - 20]
+    audio_offsets = [60]
+    original = moov(video_offsets, audio_offsets)
+
+    relocated = mp4._relocate_chunk_offsets(mp4.parse_tree(original), first_mdat, moov_offset, len(original))
+
+    tree = mp4.parse_tree(relocated)
+    assert len(relocated) == struct.unpack_from(">I", relocated)[0]
+    video, audio = (
+        next(child for child in stbl.children if child.type in (b"stco", b"co64"))
+        for stbl in tree.find(b"trak", b"mdia", b"minf", b"stbl")
+    )
+    # Every offset moves by the final (widened) moov size
+    assert video.type == b"co64"
+    assert struct.unpack_from(">I2Q", video.payload, 4) == (2, *(offset + len(relocated) for offset in video_offsets))
+    assert audio.type == b"stco"
+    assert struct.unpack_from(">2I", audio.payload, 4) == (1, audio_offsets[0] + len(relocated))
+    # Only the widened table changed size (4 more bytes per entry)
+    assert len(relocated) == len(original) + 4 * len(video_offsets)
+
+
+def test_faststart_file_is_left_alone(tmp_path):
+    path = tmp_path / "video.mp4"
+    data = make_mp4(moov_first=True)
+    path.write_bytes(data)
+    assert chunks_at_offsets(data) == (VIDEO_CHUNKS, AUDIO_CHUNKS)
+    mtime = path.stat().st_mtime_ns
+
+    info = mp4.ingest(path)
+
+    assert not info["remuxed"] and info["sha256"] is None and info["faststart"]
+    assert path.stat().st_mtime_ns == mtime
+    assert_untouched(path, data)
+
+
+def test_fragmented_files_are_left_alone(tmp_path):
+    fragment = box(b"moof", full_box(b"mfhd", struct.pack(">I", 1))) + box(b"mdat", b"fragment")
+    mvex = box(b"mvex", full_box(b"trex", b"\0" * 20))
+
+    # Usual fragmented layout: moov first, nothing to do
+    path = tmp_path / "video.mp4"
+    data = make_mp4(moov_first=True, after=fragment, moov_extra=(mvex,))
+    path.write_bytes(data)
+    assert not mp4.ingest(path)["remuxed"]
+    assert_untouched(path, data)
+
+    # moov after the fragments: sample offsets are relative to each moof, so
+    # moving moov would need rewriting them; refuse rather than guess
+    data = make_mp4(between=fragment, moov_extra=(mvex,))
+    path.write_bytes(data)
+    with pytest.raises(Mp4Error, match="Fragmented"):
+        mp4.ingest(path)
+    assert_untouched(path, data)
+
+
+def _corrupt_stco_count(data: bytes) -> bytes:
+    position = data.index(b"stco") + 8
+    return data[:position] + struct.pack(">I", 1000) + data[position + 4:]
+
+
+def _overrun_trak(data: bytes) -> bytes:
+    position = data.index(b"trak") - 4
+    size = struct.unpack_from(">I", data, position)[0]
+    return data[:position] + struct.pack(">I", size + 4096) + data[position + 4:]
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:-10],  # Download cut short inside moov
+    lambda data: data + b"\0\0\0",  # Trailing bytes too short for a box header
+    lambda data: data + struct.pack(">I4s", 4, b"free"),  # Box smaller than its header
+    lambda data: data + struct.pack(">I4sQ", 1, b"free", 4096),  # 64-bit size past the end
+    _corrupt_stco_count,  # More entries than the table holds
+    _overrun_trak,  # Child box larger than its parent
+], ids=["truncated", "short-header", "undersized-box", "oversized-largesize", "stco-count", "child-overrun"])
+def test_malformed_files_raise_without_touching_the_file(tmp_path, corrupt):
+    path = tmp_path / "video.mp4"
+    data = corrupt(make_mp4())
+    path.write_bytes(data)
+
+    with pytest.raises(Mp4Error):
+        mp4.ingest(path, chunk_size=7)
+    assert_untouched(path, data)
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.services.multipart_upload import MultipartFileReader, MalformedUpload, UploadTooLarge
+
+BOUNDARY = "testboundary"
+
+
+def _body(file_data: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\n'
+        f"hello\r\n"
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="cat.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode() + file_data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, chunk_size: int = 1000, content_length: bool = True, chunks: list = None):
+    """A Request whose body arrives in chunk_size pieces (or the given chunks), counting how many were received"""
+    chunks = chunks or [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    received = []
+
+    async def receive():
+        chunk = chunks[len(received)]
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(received) < len(chunks)}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive), received
+
+
+def _read(reader: MultipartFileReader) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in reader.chunks()])
+    return asyncio.run(collect())
+
+
+def test_streams_the_file_field_and_skips_other_fields():
+    data = bytes(range(256)) * 40
+    request, _ = _request(_body(data), chunk_size=333)
+    reader = MultipartFileReader(request, "file", max_body_bytes=1 << 20)
+    assert _read(reader) == data
+    assert reader.filename == "cat.png"
+
+
+def test_declared_oversize_body_is_rejected_before_reading():
+    request, received = _request(_body(b"x" * 50_000))
+    with pytest.raises(UploadTooLarge):
+        _read(MultipartFileReader(request, "file", max_body_bytes=10_000))
+    assert received == []
+
+
+def test_oversize_body_without_length_stops_at_the_limit():
+    request, received = _request(_body(b"x" * 50_000), content_length=False)
+    with pytest.raises(UploadTooLarge):
+        _read(MultipartFileReader(request, "file", max_body_bytes=10_000))
+    # Only the chunks up to the limit were pulled off the connection
+    assert len(received) == 11
+
+
+def test_missing_field_and_non_multipart_bodies_are_malformed():
+    request, _ = _request(_body(b"data", field="image"))
+    with pytest.raises(MalformedUpload):
+        _read(MultipartFileReader(request, "file", max_body_bytes=1 << 20))
+
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+    request = Request({"type": "http", "method": "POST", "headers": [(b"content-type", b"application/json")]}, receive)
+    with pytest.raises(MalformedUpload):
+        _read(MultipartFileReader(request, "file", max_body_bytes=1 << 20))
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+def _upload(monkeypatch, tmp_path, body: bytes, split_at: int):
+    """Run the upload route on a body whose first chunk ends at split_at"""
+    from app.routes import video_routes
+    from app.services.upload_store import UploadStore
+
+    store = UploadStore(str(tmp_path / "uploads"), str(tmp_path / "uploads.db"), 1 << 20)
+    store.open()
+    monkeypatch.setattr(video_routes, "upload_store", store)
+    request, _ = _request(body, chunks=[body[:split_at], body[split_at:split_at + 2], body[split_at + 2:]])
+    try:
+        return asyncio.run(video_routes.upload_image(request)), store
+    finally:
+        store.close()
+
+
+def test_upload_detects_the_type_when_the_signature_is_split(monkeypatch, tmp_path):
+    body = _body(PNG)
+    # The first file chunk holds only 3 bytes of the signature, the next one 2
+    result, store = _upload(monkeypatch, tmp_path, body, body.index(PNG) + 3)
+    assert result["size"] == len(PNG)
+    stored = store.layout.locate(f"{result['sha256']}.png")
+    assert stored.read_bytes() == PNG
+
+
+def test_upload_rejects_a_non_image_split_across_chunks(monkeypatch, tmp_path):
+    from fastapi import HTTPException
+
+    body = _body(b"GIF89a" + bytes(100))
+    with pytest.raises(HTTPException) as raised:
+        _upload(monkeypatch, tmp_path, body, body.index(b"GIF") + 2)
+    assert raised.value.status_code == 400
+    assert list((tmp_path / "uploads").iterdir()) == []
@@ -0,0 +1,72 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import operation_journal as journal_module
+from app.services.operation_journal import OperationJournal
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two workers' journals on the same database, flushed only by the test"""
+    journals = [OperationJournal(str(tmp_path / "operations.db"), flush_interval=3600) for _ in range(2)]
+    for journal in journals:
+        journal.open()
+    yield journals
+    for journal in journals:
+        journal.close()
+
+
+def _op(status: str, **fields) -> dict:
+    return {"status": status, "started_at": 1000.0, "metadata": {"prompt": "cat"}, **fields}
+
+
+def _status(journal: OperationJournal, operation_id: str = "op") -> str:
+    return {row["operation_id"]: row for row in journal.load(since=0)}[operation_id]["status"]
+
+
+def test_stale_snapshot_from_another_worker_does_not_overwrite(workers):
+    follower, leader = workers
+    follower.record("op", _op("queued"), detail="queued")
+    time.sleep(0.01)
+    leader.record("op", _op("submitting"), detail="submit attempt 1")
+    leader.flush()
+
+    # The follower's older "queued" copy arrives last and is ignored
+    follower.flush()
+    assert _status(leader) == "submitting"
+
+    # Events from both workers are kept
+    with leader._db_lock:
+        events = leader._conn.execute("SELECT status FROM operation_events ORDER BY at").fetchall()
+    assert [status for (status,) in events] == ["queued", "submitting"]
+
+
+def test_finished_rows_are_never_reopened(workers, monkeypatch):
+    follower, leader = workers
+    leader.record("op", _op("completed", video_id="v1"))
+    leader.flush()
+
+    # Even a pending snapshot stamped later (clock skew) cannot reopen it
+    monkeypatch.setattr(journal_module, "time", SimpleNamespace(time=lambda: 4e9))
+    follower.record("op", _op("processing"))
+    follower.flush()
+    assert _status(leader) == "completed"
+
+
+def test_newer_snapshots_win_including_backward_transitions(workers):
+    journal, _ = workers
+    journal.record("op", _op("queued"))
+    journal.record("op", _op("submitting"))
+    journal.flush()
+    assert _status(journal) == "submitting"
+
+    # A quota error puts the job back in the queue
+    journal.record("op", _op("queued"))
+    journal.flush()
+    assert _status(journal) == "queued"
+
+    journal.record("op", _op("failed", error="boom"))
+    journal.flush()
+    assert _status(journal) == "failed"
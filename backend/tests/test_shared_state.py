@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from app.services.shared_state import LeaderElection, LocalSharedState, RedisSharedState, SQLiteSharedState
+from resp_server import RespStandIn
+
+TTL = 0.3
+
+
+@pytest.fixture
+def redis_server():
+    server = RespStandIn().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(params=["local", "sqlite", "redis"])
+def workers(request, tmp_path):
+    """
+    Factory for per-worker clients of one shared backend (separate
+    connections, as separate processes would have)
+    """
+    clients = []
+    local = LocalSharedState()
+
+    def connect():
+        if request.param == "local":
+            return local
+        if request.param == "sqlite":
+            client = SQLiteSharedState(str(tmp_path / "shared.db"), retention=3600)
+        else:
+            client = RedisSharedState(request.getfixturevalue("redis_server").url, retention=3600, max_log_entries=1000)
+        clients.append(client)
+        return client
+
+    yield connect
+    for client in clients:
+        client.close()
+
+
+def test_lease_is_exclusive_until_it_expires(workers):
+    first, second = workers(), workers()
+    assert first.acquire_lease("leader", "a", TTL)
+    assert not second.acquire_lease("leader", "b", TTL)
+    assert first.acquire_lease("leader", "a", TTL)  # Renewal
+
+    time.sleep(TTL * 1.5)
+    assert second.acquire_lease("leader", "b", TTL)  # Takeover after expiry
+    # The old owner can neither renew nor release the new owner's lease
+    assert not first.acquire_lease("leader", "a", TTL)
+    first.release_lease("leader", "a")
+    assert not first.acquire_lease("leader", "a", TTL)
+
+    second.release_lease("leader", "b")
+    assert first.acquire_lease("leader", "a", TTL)
+
+
+def test_lease_renewal_never_extends_a_lease_taken_meanwhile(redis_server):
+    """
+    The lease expires and another worker takes it just as the old owner
+    renews; the renewal must fail instead of extending the new owner's lease
+    """
+    old, new = (RedisSharedState(redis_server.url, retention=3600, max_log_entries=1000) for _ in range(2))
+    try:
+        assert old.acquire_lease("leader", "old", TTL)
+
+        def takeover_before_renewal(args):
+            # Right before the command that extends the lease: the renewal
+            # script, or the PEXPIRE of a GET-then-PEXPIRE renewal
+            if args[:2] == ["PEXPIRE", "lease:leader"] or (args[0] == "EVAL" and "old" in args):
+                redis_server.values["lease:leader"] = "new"
+
+        redis_server.before_command = takeover_before_renewal
+        assert not old.acquire_lease("leader", "old", TTL)
+        redis_server.before_command = None
+        assert redis_server.values["lease:leader"] == "new"
+        assert not old.acquire_lease("leader", "old", TTL)
+        assert new.acquire_lease("leader", "new", TTL)
+
+        # Release is a compare-and-delete too
+        old.release_lease("leader", "old")
+        assert redis_server.values["lease:leader"] == "new"
+    finally:
+        old.close()
+        new.close()
+
+
+def test_read_since_returns_entries_in_sequence_order(workers):
+    writers = [workers() for _ in range(3)]
+    reader = workers()
+
+    def write(client, worker):
+        for index in range(50):
+            client.append("jobs", f"{worker}-{index}")
+
+    threads = [threading.Thread(target=write, args=(client, worker)) for worker, client in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+
+    # Follow the log while it is being written, resuming from the cursor
+    cursor, seen = 0, []
+    while any(thread.is_alive() for thread in threads) or cursor == 0:
+        cursor, values = reader.read_since("jobs", cursor)
+        seen += values
+    for thread in threads:
+        thread.join()
+    cursor, values = reader.read_since("jobs", cursor)
+    seen += values
+
+    assert sorted(seen) == sorted(f"{worker}-{index}" for worker in range(3) for index in range(50))
+    # Each writer's entries arrive in the order it appended them
+    for worker in range(3):
+        assert [value for value in seen if value.startswith(f"{worker}-")] == [f"{worker}-{index}" for index in range(50)]
+    assert reader.read_since("jobs", cursor) == (cursor, [])
+
+    # Logs are independent
+    writers[0].append("catalog", "video")
+    assert reader.read_since("catalog", 0)[1] == ["video"]
+
+
+def test_redis_log_numbering_survives_trimming_and_restarts(redis_server):
+    client = RedisSharedState(redis_server.url, retention=3600, max_log_entries=5)
+    try:
+        sequences = [client.append("jobs", f"job-{index}") for index in range(8)]
+        assert sequences == list(range(1, 9))
+
+        # Only the newest entries are kept, and numbering continues past them
+        assert client.read_since("jobs", 0) == (8, [f"job-{index}" for index in range(3, 8)])
+        assert client.read_since("jobs", 6) == (8, ["job-6", "job-7"])
+
+        # A server that lost its data restarts the log; followers start over
+        redis_server.flush()
+        client.append("jobs", "after-restart")
+        assert client.read_since("jobs", 8) == (1, ["after-restart"])
+    finally:
+        client.close()
+
+
+def test_leader_election_takeover_and_expiry(workers):
+    first = LeaderElection(workers(), "video-service", TTL)
+    second = LeaderElection(workers(), "video-service", TTL)
+
+    assert first.refresh() and first.is_leader
+    assert not second.refresh() and not second.is_leader
+
+    # Without renewals the leader stops acting as one after ttl, on its own
+    time.sleep(TTL * 1.2)
+    assert not first.is_leader
+    assert first.due()
+    assert second.refresh() and second.is_leader
+    assert not first.refresh() and not first.is_leader
+
+    # Resigning hands the lease over immediately
+    second.resign()
+    assert not second.is_leader
+    assert first.refresh() and first.is_leader
+    assert first.elections_won == 2 and second.elections_won == 1
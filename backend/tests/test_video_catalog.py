@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from app.routes.video_routes import _serve_derivative
+from app.services import video_catalog as catalog_module
+from app.services.derivatives import derivative_service
+from app.services.video_service import video_service
+from app.services.storage_layout import StorageLayout
+from app.services.video_catalog import VideoCatalog
+
+
+class MemoryMetadataStore:
+    """Stands in for the SQLite metadata store shared by every worker"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, video_id: str):
+        row = self.rows.get(video_id)
+        return dict(row) if row else None
+
+    def put(self, metadata: dict):
+        self.rows[metadata["video_id"]] = dict(metadata)
+
+    def read_sidecar(self, path):
+        return None
+
+
+def _catalogs(tmp_path, monkeypatch, count=2):
+    monkeypatch.setattr(catalog_module, "video_layout", StorageLayout(tmp_path, sharded=False, depth=0, suffix=".mp4"))
+    store = MemoryMetadataStore()
+    monkeypatch.setattr(catalog_module, "metadata_store", store)
+    return store, [VideoCatalog(str(tmp_path)) for _ in range(count)]
+
+
+def _add_video(tmp_path, store, video_id, created_at, **metadata):
+    (tmp_path / f"{video_id}.mp4").write_bytes(b"\0" * 16)
+    if created_at is not None:
+        store.put({"video_id": video_id, "created_at": created_at, "is_public": False, **metadata})
+
+
+def test_workers_with_the_same_videos_report_the_same_etag(tmp_path, monkeypatch):
+    store, (first, second) = _catalogs(tmp_path, monkeypatch)
+    _add_video(tmp_path, store, "a", time.time() - 60, prompt="cat")
+    _add_video(tmp_path, store, "b", time.time() - 30, prompt="dog")
+    first.load()
+    second.load()
+    assert first.etag == second.etag
+
+    # One worker's change shows up in its tag right away...
+    store.rows["a"]["is_public"] = True
+    first.set_public("a", True)
+    assert first.etag != second.etag
+
+    # ...and the other converges once it re-indexes the video (catalog log sync)
+    second._reindex("a")
+    assert first.etag == second.etag
+
+    # Undoing a change restores the earlier tag, as would a restart
+    etag = first.etag
+    first.set_public("a", False)
+    first.set_public("a", True)
+    assert first.etag == etag
+    restarted = VideoCatalog(str(tmp_path))
+    restarted.load()
+    assert restarted.etag == etag
+
+
+def test_videos_without_metadata_count_as_private(tmp_path, monkeypatch):
+    store, (catalog,) = _catalogs(tmp_path, monkeypatch, count=1)
+    _add_video(tmp_path, store, "stored", time.time(), prompt="cat")
+    _add_video(tmp_path, store, "bare", None)
+    catalog.load()
+
+    items, _ = catalog.query(filters={"is_public": False})
+    assert sorted(item["id"] for item in items) == ["bare", "stored"]
+    assert catalog.get("bare")["is_public"] is False
+
+
+def test_derivative_urls_are_versioned_like_the_video(tmp_path, monkeypatch):
+    store, (catalog,) = _catalogs(tmp_path, monkeypatch, count=1)
+    monkeypatch.setattr(derivative_service, "layout", StorageLayout(tmp_path / ".derivatives", sharded=False, depth=0, directories=True))
+    monkeypatch.setattr(video_service, "get_video_path", lambda video_id: tmp_path / f"{video_id}.mp4")
+    _add_video(tmp_path, store, "a", time.time(), prompt="cat")
+    catalog.load()
+    assert catalog.get("a")["poster_version"] is None
+
+    poster = derivative_service.path("a", "poster")
+    poster.parent.mkdir(parents=True)
+    poster.write_bytes(b"poster")
+    catalog.upsert("a")  # What schedule_derivatives does once generation finished
+    version = catalog.get("a")["poster_version"]
+    assert version is not None
+
+    def cache_control(v):
+        request = SimpleNamespace(headers={})
+        return asyncio.run(_serve_derivative("a", "poster", request, v)).headers["cache-control"]
+
+    assert "immutable" in cache_control(version)
+    assert cache_control(None) == "public, no-cache"
+
+    # backfill-derivatives --force rewrites the poster in place
+    etag = catalog.etag
+    poster.write_bytes(b"new poster")
+    os.utime(poster, ns=(time.time_ns() + 10**9,) * 2)
+    assert cache_control(version) == "public, no-cache"
+    catalog.upsert("a")
+    assert catalog.get("a")["poster_version"] not in (None, version)
+    assert catalog.etag != etag
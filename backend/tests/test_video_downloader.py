@@ -0,0 +1,50 @@
+import hashlib
+
+import httpx
+import pytest
+
+from app.services.video_downloader import VideoDownloader, DownloadError
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 64
+
+
+class _Video:
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.video_bytes = None
+
+
+def _downloader(tmp_path, handler) -> VideoDownloader:
+    downloader = VideoDownloader(tmp_path, chunk_size=1024, max_attempts=1, timeout=5)
+    downloader._http = httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=False)
+    return downloader
+
+
+def test_api_key_is_not_forwarded_across_origins(tmp_path):
+    seen = []
+
+    def handler(request: httpx.Request):
+        seen.append((request.url.host, request.headers.get("x-goog-api-key")))
+        if request.url.host == "generativelanguage.googleapis.com":
+            if request.url.path.endswith(":download"):
+                return httpx.Response(302, headers={"location": "/v1beta/files/abc:media"})
+            return httpx.Response(302, headers={"location": "https://storage.example.com/signed/abc"})
+        return httpx.Response(200, content=VIDEO)
+
+    downloader = _downloader(tmp_path, handler)
+    result = downloader.download(_Video("https://generativelanguage.googleapis.com/v1beta/files/abc:download"), "op1")
+
+    assert result["size"] == len(VIDEO)
+    assert result["sha256"] == hashlib.sha256(VIDEO).hexdigest()
+    # Kept on the same-origin hop, dropped once the chain leaves the origin
+    assert [key is not None for _, key in seen] == [True, True, False]
+    assert seen[-1][0] == "storage.example.com"
+
+
+def test_redirect_loops_are_not_followed_forever(tmp_path):
+    def handler(request: httpx.Request):
+        return httpx.Response(302, headers={"location": str(request.url)})
+
+    downloader = _downloader(tmp_path, handler)
+    with pytest.raises(DownloadError):
+        downloader.download(_Video("https://generativelanguage.googleapis.com/v1beta/files/abc:download"), "op2")
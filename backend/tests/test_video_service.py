@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import video_service as service_module
+from app.services.storage_layout import StorageLayout
+from app.services.video_service import video_service
+
+
+class RecordingMetadataStore:
+    """Notes whether each video's MP4 was already published when its row was written"""
+
+    def __init__(self, layout: StorageLayout, fail: bool):
+        self.layout = layout
+        self.fail = fail
+        self.rows = {}
+        self.published_at_put = {}
+
+    def put(self, metadata: dict):
+        video_id = metadata["video_id"]
+        self.published_at_put[video_id] = self.layout.locate(f"{video_id}.mp4").exists()
+        if self.fail:
+            raise OSError("disk full")
+        self.rows[video_id] = metadata
+
+
+@pytest.fixture
+def download(tmp_path, monkeypatch):
+    """Run _download_video against temp storage with a fake finished download"""
+    layout = StorageLayout(tmp_path / "videos", sharded=False, depth=0, suffix=".mp4")
+    layout.root.mkdir()
+    part = tmp_path / "operation.part"
+    upserted = []
+
+    def fake_download(video, key):
+        part.write_bytes(b"\0" * 64)
+        return {"path": part, "size": 64, "sha256": "abc"}
+
+    monkeypatch.setattr(service_module, "video_layout", layout)
+    monkeypatch.setattr(service_module.video_downloader, "download", fake_download)
+    monkeypatch.setattr(service_module.video_catalog, "upsert", upserted.append)
+    monkeypatch.setattr(video_service, "_ingest_media", lambda path, metadata, video_id: (None, None))
+
+    def run(fail: bool = False):
+        store = RecordingMetadataStore(layout, fail)
+        monkeypatch.setattr(service_module, "metadata_store", store)
+        operation = SimpleNamespace(
+            name="operations/1",
+            response=SimpleNamespace(generated_videos=[SimpleNamespace(video=object())])
+        )
+        try:
+            video_id = video_service._download_video({"metadata": {"prompt": "cat"}}, operation)
+        except OSError:
+            video_id = None
+        return video_id, store, sorted(path.name for path in layout.root.iterdir()), upserted
+
+    return run
+
+
+def test_metadata_row_is_written_after_the_video_is_published(download):
+    video_id, store, files, upserted = download()
+    assert store.published_at_put == {video_id: True}
+    assert store.rows[video_id]["size"] == 64
+    assert files == [f"{video_id}.mp4"]
+    assert upserted == [video_id]
+
+
+def test_failed_metadata_write_unpublishes_the_video(download):
+    video_id, store, files, upserted = download(fail=True)
+    assert video_id is None
+    assert list(store.published_at_put.values()) == [True]
+    assert files == [] and upserted == []
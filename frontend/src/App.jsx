@@ -7,7 +7,7 @@ import ProgressIndicator from './components/ProgressIndicator';
 import VideoGallery from './components/VideoGallery';
 import CommunityLibrary from './components/CommunityLibrary';
 import AIChatAssistant from './components/AIChatAssistant';
-import { uploadImage, generateVideo, checkVideoStatus, getVideoUrl } from './services/api';
+import { uploadImage, generateVideo, checkVideoStatus, getVideoUrl, getVideoStatusEventsUrl } from './services/api';
 
 function App() {
   // State management
@@ -87,35 +87,63 @@ function App() {
     }
   };
 
-  // Poll for video status
+  // Follow video status: pushed over SSE, polling only as a fallback
   useEffect(() => {
     if (generationStatus !== 'generating' || !operationId) return;
 
     const startTime = Date.now();
-    const interval = setInterval(async () => {
-      try {
-        setElapsedTime((Date.now() - startTime) / 1000);
+    let interval = null;
+    let source = null;
+    let finished = false;
 
-        const status = await checkVideoStatus(operationId);
+    const handleStatus = (status) => {
+      if (!status.done) return;
+      finished = true;
+      source?.close();
+      clearInterval(interval);
+      if (status.video_url) {
+        setVideoUrl(getVideoUrl(status.video_url));
+        setGenerationStatus('completed');
+      } else if (status.error) {
+        setError('Video generation failed: ' + status.error);
+        setGenerationStatus('idle');
+      }
+    };
 
-        if (status.done) {
+    const startPolling = () => {
+      interval = setInterval(async () => {
+        try {
+          setElapsedTime((Date.now() - startTime) / 1000);
+          handleStatus(await checkVideoStatus(operationId));
+        } catch (err) {
           clearInterval(interval);
-          if (status.video_url) {
-            setVideoUrl(getVideoUrl(status.video_url));
-            setGenerationStatus('completed');
-          } else if (status.error) {
-            setError('Video generation failed: ' + status.error);
-            setGenerationStatus('idle');
-          }
+          setError('Error checking status: ' + (err.response?.data?.detail || err.message));
+          setGenerationStatus('idle');
         }
-      } catch (err) {
-        clearInterval(interval);
-        setError('Error checking status: ' + (err.response?.data?.detail || err.message));
-        setGenerationStatus('idle');
-      }
-    }, 10000); // Poll every 10 seconds
+      }, 10000); // Poll every 10 seconds
+    };
+
+    if (window.EventSource) {
+      source = new EventSource(getVideoStatusEventsUrl(operationId));
+      const onStatus = (event) => {
+        const status = JSON.parse(event.data);
+        setElapsedTime(status.elapsed ?? (Date.now() - startTime) / 1000);
+        handleStatus(status);
+      };
+      ['progress', 'completed', 'failed'].forEach(type => source.addEventListener(type, onStatus));
+      source.onerror = () => {
+        // Stream unavailable (proxy, old backend) - fall back to polling
+        source.close();
+        if (!finished) startPolling();
+      };
+    } else {
+      startPolling();
+    }
 
-    return () => clearInterval(interval);
+    return () => {
+      source?.close();
+      clearInterval(interval);
+    };
   }, [generationStatus, operationId]);
 
   // Reset for new generation
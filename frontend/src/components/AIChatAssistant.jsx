@@ -8,6 +8,8 @@ const AIChatAssistant = ({ onUsePrompt }) => {
   const [inputMessage, setInputMessage] = useState('');
   const [isSending, setIsSending] = useState(false);
   const messagesEndRef = useRef(null);
+  // Server-side chat session; history stays on the backend
+  const sessionIdRef = useRef(null);
   const chatContainerRef = useRef(null);
 
   // Auto-scroll to bottom when new messages arrive
@@ -48,15 +50,32 @@ const AIChatAssistant = ({ onUsePrompt }) => {
 
       console.log('💬 Sending streaming chat request to:', endpoint);
 
-      const response = await fetch(endpoint, {
+      const sendMessage = () => fetch(endpoint, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           message: userMessage,
-          conversation_history: messages
+          session_id: sessionIdRef.current,
+          // Ask the server to start a session when we don't have one yet
+          session: !sessionIdRef.current
         })
       });
 
+      let response = await sendMessage();
+
+      if (response.status === 404 && sessionIdRef.current) {
+        // Session expired on the server - resume it from the local transcript
+        const sessionResponse = await fetch(`${backendUrl}/api/chat/sessions`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            conversation_history: messages.map(({ role, content }) => ({ role, content }))
+          })
+        });
+        sessionIdRef.current = sessionResponse.ok ? (await sessionResponse.json()).session_id : null;
+        response = await sendMessage();
+      }
+
       if (!response.ok) {
         throw new Error('Failed to get AI response');
       }
@@ -77,6 +96,11 @@ const AIChatAssistant = ({ onUsePrompt }) => {
             try {
               const data = JSON.parse(line.slice(6));
 
+              if (data.type === 'session') {
+                sessionIdRef.current = data.content;
+                continue;
+              }
+
               setMessages(prev =>
                 prev.map(msg =>
                   msg.id === thinkingMessageId
@@ -168,6 +192,12 @@ const AIChatAssistant = ({ onUsePrompt }) => {
   const clearChat = () => {
     if (confirm('Clear chat history?')) {
       setMessages([]);
+      if (sessionIdRef.current) {
+        const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:9000';
+        fetch(`${backendUrl}/api/chat/sessions/${sessionIdRef.current}`, { method: 'DELETE' })
+          .catch(() => {});
+        sessionIdRef.current = null;
+      }
     }
   };
 
@@ -2,12 +2,22 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
 const API_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:9000';
+// The listing's version makes the URL cacheable as immutable; it changes if the file is remuxed
+const videoFileUrl = (video) => `${API_URL}/api/videos/${video.id}?v=${encodeURIComponent(video.version)}`;
+// Posters and preview clips are versioned the same way once generated (backfill --force rewrites them)
+const derivativeUrl = (video, kind) => {
+  const version = video[`${kind}_version`];
+  return `${API_URL}/api/videos/${video.id}/${kind}${version ? `?v=${encodeURIComponent(version)}` : ''}`;
+};
+const PAGE_SIZE = 24;
 
 const CommunityLibrary = ({ onRemix }) => {
   const [videos, setVideos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedVideo, setSelectedVideo] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchPublicVideos();
@@ -16,8 +26,9 @@ const CommunityLibrary = ({ onRemix }) => {
   const fetchPublicVideos = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API_URL}/api/library`);
+      const response = await axios.get(`${API_URL}/api/library`, { params: { limit: PAGE_SIZE } });
       setVideos(response.data.videos || []);
+      setNextCursor(response.data.next_cursor || null);
       setError(null);
     } catch (err) {
       setError('Failed to load public videos: ' + (err.response?.data?.detail || err.message));
@@ -26,6 +37,22 @@ const CommunityLibrary = ({ onRemix }) => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API_URL}/api/library`, {
+        params: { limit: PAGE_SIZE, cursor: nextCursor },
+      });
+      setVideos((current) => [...current, ...(response.data.videos || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      setError('Failed to load public videos: ' + (err.response?.data?.detail || err.message));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (timestamp) => {
     if (!timestamp) return 'Unknown';
     const date = new Date(timestamp * 1000);
@@ -98,10 +125,19 @@ const CommunityLibrary = ({ onRemix }) => {
           >
             <div className="aspect-video bg-gray-900 relative group">
               <video
-                src={`${API_URL}/api/videos/${video.id}`}
+                src={derivativeUrl(video, 'preview')}
+                poster={derivativeUrl(video, 'poster')}
+                preload="none"
                 className="w-full h-full object-cover"
                 muted
-                onMouseEnter={(e) => e.target.play()}
+                loop
+                playsInline
+                onError={(e) => {
+                  // No preview clip yet: fall back to the full video
+                  const fullVideo = videoFileUrl(video);
+                  if (e.target.src !== fullVideo) e.target.src = fullVideo;
+                }}
+                onMouseEnter={(e) => e.target.play().catch(() => {})}
                 onMouseLeave={(e) => { e.target.pause(); e.target.currentTime = 0; }}
               />
               <div className="absolute inset-0 bg-black bg-opacity-0 group-hover:bg-opacity-30 flex items-center justify-center transition-all">
@@ -160,7 +196,7 @@ const CommunityLibrary = ({ onRemix }) => {
                   Remix This Prompt
                 </button>
                 <a
-                  href={`${API_URL}/api/videos/${video.id}`}
+                  href={videoFileUrl(video)}
                   download={`community_video_${video.id}.mp4`}
                   onClick={(e) => e.stopPropagation()}
                   className="w-full text-center px-3 py-2 bg-gray-200 text-gray-800 text-sm font-medium rounded hover:bg-gray-300 transition-all"
@@ -173,6 +209,18 @@ const CommunityLibrary = ({ onRemix }) => {
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="mt-2 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="inline-flex items-center px-4 py-2 border border-gray-300 rounded-lg text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 transition-all disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Video Modal */}
       {selectedVideo && (
         <div
@@ -198,7 +246,8 @@ const CommunityLibrary = ({ onRemix }) => {
             </div>
             <div className="bg-black">
               <video
-                src={`${API_URL}/api/videos/${selectedVideo.id}`}
+                src={videoFileUrl(selectedVideo)}
+                poster={derivativeUrl(selectedVideo, 'poster')}
                 controls
                 autoPlay
                 className="w-full"
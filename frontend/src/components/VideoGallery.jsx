@@ -2,12 +2,22 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
 const API_URL = import.meta.env.VITE_BACKEND_URL || 'http://localhost:9000';
+// The listing's version makes the URL cacheable as immutable; it changes if the file is remuxed
+const videoFileUrl = (video) => `${API_URL}/api/videos/${video.id}?v=${encodeURIComponent(video.version)}`;
+// Posters and preview clips are versioned the same way once generated (backfill --force rewrites them)
+const derivativeUrl = (video, kind) => {
+  const version = video[`${kind}_version`];
+  return `${API_URL}/api/videos/${video.id}/${kind}${version ? `?v=${encodeURIComponent(version)}` : ''}`;
+};
+const PAGE_SIZE = 24;
 
 const VideoGallery = ({ onRegenerate }) => {
   const [videos, setVideos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [selectedVideo, setSelectedVideo] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchVideos();
@@ -16,8 +26,9 @@ const VideoGallery = ({ onRegenerate }) => {
   const fetchVideos = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API_URL}/api/videos`);
+      const response = await axios.get(`${API_URL}/api/videos`, { params: { limit: PAGE_SIZE } });
       setVideos(response.data.videos || []);
+      setNextCursor(response.data.next_cursor || null);
       setError(null);
     } catch (err) {
       setError('Failed to load videos: ' + (err.response?.data?.detail || err.message));
@@ -26,6 +37,22 @@ const VideoGallery = ({ onRegenerate }) => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API_URL}/api/videos`, {
+        params: { limit: PAGE_SIZE, cursor: nextCursor },
+      });
+      setVideos((current) => [...current, ...(response.data.videos || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      setError('Failed to load videos: ' + (err.response?.data?.detail || err.message));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (videoId) => {
     if (!confirm('Are you sure you want to delete this video?')) return;
 
@@ -125,10 +152,19 @@ const VideoGallery = ({ onRegenerate }) => {
           >
             <div className="aspect-video bg-gray-900 relative group">
               <video
-                src={`${API_URL}/api/videos/${video.id}`}
+                src={derivativeUrl(video, 'preview')}
+                poster={derivativeUrl(video, 'poster')}
+                preload="none"
                 className="w-full h-full object-cover"
                 muted
-                onMouseEnter={(e) => e.target.play()}
+                loop
+                playsInline
+                onError={(e) => {
+                  // No preview clip yet: fall back to the full video
+                  const fullVideo = videoFileUrl(video);
+                  if (e.target.src !== fullVideo) e.target.src = fullVideo;
+                }}
+                onMouseEnter={(e) => e.target.play().catch(() => {})}
                 onMouseLeave={(e) => { e.target.pause(); e.target.currentTime = 0; }}
               />
               <div className="absolute inset-0 bg-black bg-opacity-0 group-hover:bg-opacity-30 flex items-center justify-center transition-all">
@@ -155,7 +191,7 @@ const VideoGallery = ({ onRegenerate }) => {
               <div className="flex flex-col gap-2">
                 <div className="flex gap-2">
                   <a
-                    href={`${API_URL}/api/videos/${video.id}`}
+                    href={videoFileUrl(video)}
                     download={`video_${video.id}.mp4`}
                     onClick={(e) => e.stopPropagation()}
                     className="flex-1 text-center px-3 py-2 bg-blue-600 text-white text-xs font-medium rounded hover:bg-blue-700 transition-all"
@@ -221,6 +257,18 @@ const VideoGallery = ({ onRegenerate }) => {
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="mt-2 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="inline-flex items-center px-4 py-2 border border-gray-300 rounded-lg text-sm font-medium text-gray-700 bg-white hover:bg-gray-50 transition-all disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Video Modal */}
       {selectedVideo && (
         <div
@@ -241,7 +289,8 @@ const VideoGallery = ({ onRegenerate }) => {
             </div>
             <div className="bg-black">
               <video
-                src={`${API_URL}/api/videos/${selectedVideo.id}`}
+                src={videoFileUrl(selectedVideo)}
+                poster={derivativeUrl(selectedVideo, 'poster')}
                 controls
                 autoPlay
                 className="w-full"
@@ -47,6 +47,15 @@ export const checkVideoStatus = async (operationId) => {
   return response.data;
 };
 
+/**
+ * Get the Server-Sent Events URL that pushes status updates for an operation
+ * @param {string} operationId - Operation ID from generateVideo
+ * @returns {string} Full event stream URL
+ */
+export const getVideoStatusEventsUrl = (operationId) => {
+  return `${API_BASE_URL}/api/video-status/${operationId}/events`;
+};
+
 /**
  * Get the full URL for a video
  * @param {string} videoUrl - Relative video URL from API